@@ -0,0 +1,273 @@
+"""
+Benchmark des étapes du pipeline sur des flux synthétiques de tailles croissantes.
+
+Pour chaque taille, un flux est généré (generer_gbfs.py) puis chaque étape est exécutée dans
+l'ordre, sans cache préexistant : chargement du JSON, triangulation, liste d'adjacence, indices de
+répartition, cellules de Voronoi, ACM et rendu HTML des cartes. La durée, le temps CPU et le pic
+de mémoire (tracemalloc) de chaque étape sont enregistrés dans un fichier JSON nommé d'après le
+commit, que `--comparer` met en regard d'un résultat précédent.
+
+Chaque taille est mesurée dans un processus neuf, pour que la mémoire d'une taille n'influe pas
+sur la suivante ; une étape qui échoue est notée « échec » et les étapes qui en dépendent « annulée ».
+"""
+import argparse  # Pour lire les options de la ligne de commande
+import gc  # Pour libérer la mémoire entre les étapes
+import json  # Pour écrire les résultats
+import os  # Pour connaître le nombre de processeurs
+import platform  # Pour décrire la machine
+import subprocess  # Pour lire le commit courant
+import sys  # Pour modifier le chemin Python
+import tempfile  # Pour le cache et les cartes de chaque mesure
+import time  # Pour mesurer les durées
+import tracemalloc  # Pour mesurer le pic de mémoire de chaque étape
+from concurrent.futures import ProcessPoolExecutor  # Pour mesurer chaque taille dans un processus neuf
+from multiprocessing import get_context  # Pour démarrer des processus neufs
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+# Ajout des répertoires src et benchmarks au chemin Python pour les imports
+RACINE = Path(__file__).resolve().parent.parent
+sys.path.append(str(RACINE / "src"))
+sys.path.append(str(RACINE / "benchmarks"))
+
+from generer_gbfs import ecrire_flux
+
+# Étapes mesurées et étapes dont elles dépendent
+ETAPES = {
+    "chargement_json": (),
+    "triangulation": ("chargement_json",),
+    "adjacence": ("triangulation",),
+    "indices": ("adjacence",),
+    "voronoi": ("chargement_json",),
+    "acm": ("adjacence",),
+    "rendu_html": ("indices", "voronoi", "acm"),
+}
+
+# Au-delà de ce nombre de stations, le rendu HTML (un marqueur par station) est ignoré par défaut
+RENDU_MAX = 20_000
+
+###################################################################################################
+###################################################################################################
+
+# Fonctions des étapes : chacune lit et complète le dictionnaire `etat`
+
+def _chargement_json(etat):
+    from data.station_table import StationTable
+    etat["table"] = StationTable.charger(etat["fichier"], etat["cache"])
+
+def _triangulation(etat):
+    from data.triangulation import charger_triangulation
+    etat["tri"] = charger_triangulation(etat["fichier"], etat["cache"])
+
+def _adjacence(etat):
+    from data.liste_adjacence import construire_adjacence
+    etat["indptr"], etat["voisins"] = construire_adjacence(etat["tri"])
+
+def _indices(etat):
+    import numpy as np
+    from data.indice_repartition import calculer_indices
+    etat["indices"] = calculer_indices(etat["table"], np.diff(etat["indptr"]))
+
+def _voronoi(etat):
+    from data.cellules_voronoi import charger_cellules
+    etat["cellules"] = charger_cellules(etat["fichier"], etat["cache"])
+
+def _acm(etat):
+    from visualization.arbre_couvrant import calculer_acm_geographique
+    table = etat["table"]
+    etat["acm"] = calculer_acm_geographique((table.station_id, etat["indptr"], etat["voisins"]), table)[:2]
+
+def _rendu_html(etat):
+    from data.indice_repartition import carte_indices
+    from visualization.arbre_couvrant import afficher_acm_folium
+    from visualization.map_triangulation import carte_triangulation
+    from visualization.view_map_stations import carte_stations
+    from visualization.voronoi_map import carte_voronoi
+
+    table, tri = etat["table"], etat["tri"]
+    cartes = {
+        "stations": carte_stations(table),
+        "triangulation": carte_triangulation(table, tri.points, tri.simplices),
+        "indices": carte_indices(table, tri.points, tri.simplices, etat["indices"]),
+        "voronoi": carte_voronoi(table, etat["cellules"], etat["indices"]),
+        "acm": afficher_acm_folium(etat["acm"], table),
+    }
+    for nom, carte in cartes.items():
+        carte.save(str(Path(etat["cache"]) / f"{nom}.html"))
+
+###################################################################################################
+###################################################################################################
+
+# Importer les bibliothèques lourdes avant les mesures, pour ne pas compter leur chargement
+def _prechauffer():
+    import folium  # noqa: F401
+    import scipy.sparse.csgraph  # noqa: F401
+    import scipy.spatial  # noqa: F401
+
+# Pic de mémoire résidente du processus, en Mo (None si indisponible)
+def _rss_max_mo():
+    try:
+        import resource  # Uniquement sous Unix
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024  # Octets sous macOS, Ko ailleurs
+
+# Mesurer une étape : durée, temps CPU et pic de mémoire alloué pendant l'étape
+def mesurer(fonction, etat, memoire=True):
+    gc.collect()
+    if memoire:
+        tracemalloc.start()
+    debut, debut_cpu = time.perf_counter(), time.process_time()
+    erreur = None
+    try:
+        fonction(etat)
+    except Exception as e:  # Noter l'échec sans interrompre le benchmark
+        erreur = f"{type(e).__name__}: {e}"
+    mesure = {
+        "statut": "échec" if erreur else "ok",
+        "duree_s": time.perf_counter() - debut,
+        "cpu_s": time.process_time() - debut_cpu,
+    }
+    if memoire:
+        mesure["memoire_max_mo"] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    mesure["rss_max_mo"] = _rss_max_mo()
+    if erreur:
+        mesure["erreur"] = erreur
+    return mesure
+
+# Mesurer toutes les étapes pour un fichier de stations (dans un processus dédié)
+def mesurer_taille(fichier, etapes=tuple(ETAPES), memoire=True, rendu=True):
+    _prechauffer()
+    resultats = {}
+    with tempfile.TemporaryDirectory(prefix="bench_velib_") as cache:
+        etat = {"fichier": str(fichier), "cache": cache}
+        for etape in ETAPES:
+            if etape not in etapes:
+                continue
+            if any(resultats.get(d, {}).get("statut") in ("échec", "annulée") for d in ETAPES[etape]):
+                resultats[etape] = {"statut": "annulée"}
+            elif etape == "rendu_html" and not rendu:
+                resultats[etape] = {"statut": "ignorée"}
+            else:
+                resultats[etape] = mesurer(globals()["_" + etape], etat, memoire)
+    return resultats
+
+###################################################################################################
+###################################################################################################
+
+# Décrire le code et la machine mesurés
+def decrire_environnement():
+    import numpy
+    import scipy
+
+    def git(*arguments):
+        try:
+            return subprocess.run(["git", *arguments], cwd=RACINE, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    statut = git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "modifie": bool(statut) if statut is not None else None,  # Modifications non committées
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "plateforme": platform.platform(),
+        "processeurs": os.cpu_count(),
+    }
+
+# Lancer le benchmark pour plusieurs tailles de réseau
+def lancer(tailles, dossier_donnees, graine=0, part_doublons=0.001, etapes=tuple(ETAPES), memoire=True,
+           rendu_max=RENDU_MAX):
+    """Retourne le rapport complet : environnement, paramètres et mesures par taille."""
+    rapport = {
+        "environnement": decrire_environnement(),
+        "parametres": {"graine": graine, "part_doublons": part_doublons, "memoire": memoire,
+                       "rendu_max": rendu_max},
+        "mesures": {},
+    }
+    for taille in tailles:
+        # Les flux générés sont conservés : une même taille n'est générée qu'une fois
+        fichier = Path(dossier_donnees) / f"stations_{taille}_{graine}_{part_doublons}.json"
+        if not fichier.exists():
+            print(f"Génération de {taille} stations...")
+            ecrire_flux(fichier, taille, graine, part_doublons=part_doublons)
+
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executeur:
+            resultats = executeur.submit(mesurer_taille, fichier, etapes, memoire, taille <= rendu_max).result()
+        rapport["mesures"][str(taille)] = resultats
+        afficher(taille, resultats)
+    return rapport
+
+# Afficher les mesures d'une taille
+def afficher(taille, resultats):
+    print(f"\n{taille} stations")
+    for etape, mesure in resultats.items():
+        if mesure["statut"] != "ok":
+            print(f"  {etape:<16} {mesure['statut']}  {mesure.get('erreur', '')}")
+            continue
+        memoire = f"{mesure['memoire_max_mo']:9.1f} Mo" if "memoire_max_mo" in mesure else ""
+        print(f"  {etape:<16} {mesure['duree_s']:9.3f} s {mesure['cpu_s']:9.3f} s CPU {memoire}")
+
+# Comparer deux rapports (rapport de référence → nouveau rapport)
+def comparer(reference, nouveau):
+    print(f"\nComparaison {(reference['environnement']['commit'] or '?')[:10]} "
+          f"→ {(nouveau['environnement']['commit'] or '?')[:10]} (rapport nouveau / référence)")
+    for taille, resultats in nouveau["mesures"].items():
+        for etape, mesure in resultats.items():
+            avant = reference["mesures"].get(taille, {}).get(etape)
+            if not avant or avant["statut"] != "ok" or mesure["statut"] != "ok":
+                continue
+            ligne = f"  {taille:>8} {etape:<16} durée ×{mesure['duree_s'] / max(avant['duree_s'], 1e-9):6.2f}"
+            if "memoire_max_mo" in mesure and "memoire_max_mo" in avant:
+                ligne += f"  mémoire ×{mesure['memoire_max_mo'] / max(avant['memoire_max_mo'], 1e-9):6.2f}"
+            print(ligne)
+
+###################################################################################################
+###################################################################################################
+
+# Exemple d'utilisation
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline Vélib' sur des flux synthétiques")
+    parser.add_argument("--tailles", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Nombres de stations à mesurer")
+    parser.add_argument("--etapes", nargs="+", choices=list(ETAPES), default=list(ETAPES),
+                        help="Étapes à mesurer (avec les étapes dont elles dépendent)")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du générateur aléatoire")
+    parser.add_argument("--doublons", type=float, default=0.001,
+                        help="Part des stations placées aux coordonnées exactes d'une autre")
+    parser.add_argument("--rendu-max", type=int, default=RENDU_MAX,
+                        help="Nombre de stations au-delà duquel le rendu HTML est ignoré")
+    parser.add_argument("--sans-memoire", action="store_true",
+                        help="Ne pas suivre la mémoire (tracemalloc ralentit le code Python pur)")
+    parser.add_argument("--donnees", default=str(RACINE / "benchmarks" / "donnees"),
+                        help="Dossier des flux générés")
+    parser.add_argument("--resultats", default=str(RACINE / "benchmarks" / "resultats"),
+                        help="Dossier des rapports JSON")
+    parser.add_argument("--comparer", help="Rapport JSON de référence à comparer au nouveau")
+    args = parser.parse_args()
+
+    # Ajouter les étapes dont dépendent les étapes demandées
+    etapes, a_traiter = set(), list(args.etapes)
+    while a_traiter:
+        etape = a_traiter.pop()
+        if etape not in etapes:
+            etapes.add(etape)
+            a_traiter.extend(ETAPES[etape])
+
+    rapport = lancer(args.tailles, args.donnees, args.graine, args.doublons, tuple(etapes),
+                     not args.sans_memoire, args.rendu_max)
+
+    environnement = rapport["environnement"]
+    nom = f"{(environnement['commit'] or 'inconnu')[:10]}{'-modifie' if environnement['modifie'] else ''}"
+    fichier = Path(args.resultats) / f"{nom}_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    fichier.parent.mkdir(parents=True, exist_ok=True)
+    fichier.write_text(json.dumps(rapport, indent=4, ensure_ascii=False), encoding="utf-8")
+    print(f"\nRapport écrit dans '{fichier}'")
+
+    if args.comparer:
+        comparer(json.loads(Path(args.comparer).read_text(encoding="utf-8")), rapport)
@@ -0,0 +1,101 @@
+"""
+Générateur de flux GBFS `station_information` synthétiques, pour les benchmarks.
+
+Les stations sont regroupées en quartiers de tailles inégales (mélange de gaussiennes), avec une
+part de stations dispersées uniformément ; l'emprise grandit avec le nombre de stations pour garder
+une densité proche de celle de Paris. Une part des stations reprend exactement les coordonnées d'une
+autre (cas limite pour la triangulation), et quelques capacités sont absentes.
+"""
+import argparse  # Pour lire les options de la ligne de commande
+import json  # Pour écrire le fichier JSON
+import time  # Pour l'horodatage du flux
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+import numpy as np  # Pour tirer les coordonnées aléatoires
+
+# Centre du réseau (Paris) et densité visée : environ 1 500 stations sur 20 km de côté
+CENTRE = (48.8566, 2.3522)
+COTE_REFERENCE_KM = 20.0
+NB_STATIONS_REFERENCE = 1500
+
+# Capacités usuelles des stations Vélib'
+CAPACITES = np.arange(12, 72, 2)
+
+###################################################################################################
+###################################################################################################
+
+# Tirer les coordonnées de n stations
+def generer_coordonnees(n, rng, stations_par_quartier=200, part_dispersee=0.1, part_doublons=0.001):
+    """Retourne (lat, lon) en degrés ; `part_doublons` des stations copient les coordonnées d'une autre."""
+    cote_km = COTE_REFERENCE_KM * np.sqrt(max(n, 1) / NB_STATIONS_REFERENCE)
+    nb_quartiers = max(1, n // stations_par_quartier)
+
+    # Quartiers : centres uniformes, tailles inégales (loi log-normale), étalement variable
+    centres = rng.uniform(-cote_km / 2, cote_km / 2, size=(nb_quartiers, 2))
+    poids = rng.lognormal(sigma=1.0, size=nb_quartiers)
+    etalements = cote_km / np.sqrt(nb_quartiers) * rng.uniform(0.15, 0.5, size=nb_quartiers)
+    quartiers = rng.choice(nb_quartiers, size=n, p=poids / poids.sum())
+    xy = centres[quartiers] + rng.normal(size=(n, 2)) * etalements[quartiers, None]
+
+    # Stations dispersées sur toute l'emprise
+    dispersees = rng.random(n) < part_dispersee
+    xy[dispersees] = rng.uniform(-cote_km / 2, cote_km / 2, size=(int(dispersees.sum()), 2))
+
+    # Conversion en degrés autour du centre
+    lat = CENTRE[0] + np.degrees(xy[:, 1] / 6371.0)
+    lon = CENTRE[1] + np.degrees(xy[:, 0] / (6371.0 * np.cos(np.radians(CENTRE[0]))))
+
+    # Doublons exacts : deux stations à la même adresse
+    nb_doublons = min(int(round(n * part_doublons)), n // 2)
+    if nb_doublons:
+        copies, originaux = np.split(rng.choice(n, size=2 * nb_doublons, replace=False), 2)
+        lat[copies], lon[copies] = lat[originaux], lon[originaux]
+    return lat, lon
+
+# Générer le contenu d'un flux station_information
+def generer_stations(n, graine=0, stations_par_quartier=200, part_dispersee=0.1, part_doublons=0.001,
+                     part_sans_capacite=0.001):
+    rng = np.random.default_rng(graine)
+    lat, lon = generer_coordonnees(n, rng, stations_par_quartier, part_dispersee, part_doublons)
+    ids = rng.permutation(np.arange(n, dtype=np.int64) * 37 + 213688169)  # Identifiants uniques, mélangés
+    capacites = rng.choice(CAPACITES, size=n).tolist()
+    sans_capacite = set(np.flatnonzero(rng.random(n) < part_sans_capacite).tolist())
+
+    stations = []
+    for i, (station_id, la, lo, capacite) in enumerate(zip(ids.tolist(), lat.tolist(), lon.tolist(), capacites)):
+        station = {
+            "station_id": station_id,
+            "stationCode": str(10000 + i),
+            "name": f"Station {i} - Rue de l'Église",
+            "lat": la,
+            "lon": lo,
+            "rental_methods": ["CREDITCARD"],
+        }
+        if i not in sans_capacite:
+            station["capacity"] = capacite
+        stations.append(station)
+    return {"lastUpdatedOther": int(time.time()), "ttl": 3600, "data": {"stations": stations}}
+
+# Écrire un flux synthétique dans un fichier
+def ecrire_flux(fichier, n, graine=0, **options):
+    Path(fichier).parent.mkdir(parents=True, exist_ok=True)
+    with open(fichier, "w", encoding="utf-8") as f:
+        json.dump(generer_stations(n, graine, **options), f, ensure_ascii=False)
+    return Path(fichier)
+
+###################################################################################################
+###################################################################################################
+
+# Exemple d'utilisation
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Générer un flux station_information synthétique")
+    parser.add_argument("nb_stations", type=int, help="Nombre de stations")
+    parser.add_argument("--sortie", "-o", default="station_informations.json", help="Fichier JSON produit")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du générateur aléatoire")
+    parser.add_argument("--doublons", type=float, default=0.001,
+                        help="Part des stations placées aux coordonnées exactes d'une autre")
+    parser.add_argument("--dispersees", type=float, default=0.1, help="Part des stations hors des quartiers")
+    args = parser.parse_args()
+
+    fichier = ecrire_flux(args.sortie, args.nb_stations, args.graine,
+                          part_dispersee=args.dispersees, part_doublons=args.doublons)
+    print(f"{args.nb_stations} stations écrites dans '{fichier}'")
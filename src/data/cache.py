@@ -0,0 +1,93 @@
+"""
+Outils communs pour les artefacts mis en cache sur disque.
+Les artefacts sont indexés par l'empreinte (SHA-256) du fichier source dont ils dérivent ; seules
+les versions les plus récentes de chaque artefact sont conservées.
+"""
+import hashlib  # Pour calculer les empreintes des fichiers
+import os  # Pour remplacer les fichiers de manière atomique
+import re  # Pour reconnaître les noms des artefacts
+import tempfile  # Pour écrire dans un fichier temporaire avant le remplacement
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+from profilage import compter_fichier  # Octets écrits (option --profile)
+
+# Dossier par défaut des artefacts mis en cache
+DOSSIER_CACHE = "cache"
+
+# Nombre de versions (empreintes différentes) conservées pour chaque artefact
+NB_VERSIONS = 8
+
+###################################################################################################
+###################################################################################################
+
+# Calculer l'empreinte du contenu d'un fichier
+def empreinte_fichier(chemin, taille_bloc=1 << 20):
+    """Retourne l'empreinte SHA-256 (hexadécimale) du contenu d'un fichier."""
+    h = hashlib.sha256()
+    with open(chemin, "rb") as fichier:
+        # Lire le fichier par blocs pour ne pas le charger entièrement en mémoire
+        for bloc in iter(lambda: fichier.read(taille_bloc), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+###################################################################################################
+###################################################################################################
+
+# Construire le chemin d'un artefact à partir de son nom et de l'empreinte de sa source
+def chemin_artefact(nom, empreinte, dossier=DOSSIER_CACHE, extension=".npz"):
+    """Retourne le chemin de l'artefact `nom` associé à `empreinte` (le dossier est créé si besoin)."""
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+    return dossier / f"{nom}_{empreinte[:16]}{extension}"
+
+# Supprimer les anciennes versions d'un artefact qui vient d'être écrit
+def elaguer_artefacts(chemin, conserves=NB_VERSIONS):
+    """Parmi les artefacts de même nom que `chemin` (construit par `chemin_artefact`), ne garde que les
+    `conserves` plus récemment écrits, `chemin` compris. Retourne les chemins supprimés."""
+    chemin = Path(chemin)
+    nom = chemin.stem.rpartition("_")[0]
+    motif = re.compile(rf"{re.escape(nom)}_[0-9a-f]{{16}}{re.escape(chemin.suffix)}")
+    versions = []
+    for autre in chemin.parent.iterdir():
+        if autre.name != chemin.name and motif.fullmatch(autre.name):
+            try:
+                versions.append((autre.stat().st_mtime, autre))
+            except FileNotFoundError:  # Supprimé entre-temps par un autre processus
+                pass
+    versions.sort(reverse=True)
+    supprimes = []
+    for _, autre in versions[max(conserves - 1, 0):]:
+        try:
+            autre.unlink()
+            supprimes.append(autre)
+        except FileNotFoundError:
+            pass
+    return supprimes
+
+###################################################################################################
+###################################################################################################
+
+# Écrire un fichier de manière atomique
+def ecrire_atomique(chemin, ecrire, exclusif=False):
+    """Appelle `ecrire(fichier)` sur un fichier temporaire puis le renomme en `chemin`.
+
+    Un lecteur concurrent ne voit donc jamais un fichier à moitié écrit. Avec `exclusif`, un fichier
+    existant n'est jamais remplacé : FileExistsError est levée si `chemin` existe déjà.
+    """
+    chemin = Path(chemin)
+    descripteur, temporaire = tempfile.mkstemp(dir=chemin.parent, prefix=chemin.name, suffix=".tmp")
+    try:
+        with os.fdopen(descripteur, "wb") as fichier:
+            ecrire(fichier)
+        os.chmod(temporaire, 0o644)  # mkstemp crée le fichier accessible uniquement à son propriétaire
+        if exclusif:
+            os.link(temporaire, chemin)  # Création atomique, échoue si le fichier existe
+            os.remove(temporaire)
+        else:
+            os.replace(temporaire, chemin)  # Remplacement atomique
+        compter_fichier(chemin)
+    except BaseException:
+        # Supprimer le fichier temporaire en cas d'erreur
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
@@ -0,0 +1,204 @@
+"""
+Cellules de Voronoi bornées : la cellule de chaque station est découpée par l'enveloppe convexe
+des stations (ou par un polygone convexe fourni), toutes les cellules étant traitées ensemble.
+Les calculs sont faits en mètres (projection locale) ; les polygones sont stockés à plat
+(coordonnées + offsets) et leurs aires sont calculées par la formule du lacet vectorisée.
+"""
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.cache import DOSSIER_CACHE, chemin_artefact, ecrire_atomique, elaguer_artefacts, empreinte_fichier
+from data.geo import deprojeter, projeter
+from data.station_table import StationTable
+from profilage import mesure
+
+# Version du format de l'artefact (à incrémenter si son contenu change)
+VERSION_FORMAT = 2
+
+# Nombre de points fictifs placés en cercle autour des stations pour borner toutes les cellules
+NB_POINTS_FICTIFS = 16
+
+###################################################################################################
+###################################################################################################
+
+class CellulesVoronoi:
+    """Cellules de Voronoi bornées, une par station, dans l'ordre de la table des stations.
+
+    Attributs :
+        coords : sommets (latitude, longitude) de toutes les cellules, dans le sens trigonométrique ;
+            la cellule de la station i est coords[offsets[i]:offsets[i + 1]] (vide si la station
+            est hors de la frontière). Des stations de mêmes coordonnées partagent une cellule,
+            stockée une seule fois (pour la première d'entre elles) : les autres ont une cellule vide.
+        offsets : début de chaque cellule dans `coords` (longueur nb_stations + 1).
+        aires : aire de chaque cellule en m², partagée à parts égales entre les stations de mêmes
+            coordonnées (la somme des aires est celle de la zone découpée).
+    """
+
+    def __init__(self, coords, offsets, aires):
+        self.coords = coords
+        self.offsets = offsets
+        self.aires = aires
+
+    def __len__(self):
+        return len(self.aires)
+
+    # Sommets de la cellule de la station à la ligne i
+    def polygone(self, i):
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    # Cellules non vides : (lignes des stations, offsets des seules cellules retenues)
+    def non_vides(self):
+        lignes = np.flatnonzero(np.diff(self.offsets) > 0)
+        return lignes, np.concatenate(([0], self.offsets[lignes + 1]))
+
+    # Sauvegarder les cellules dans un artefact .npz
+    def sauvegarder(self, chemin):
+        ecrire_atomique(chemin, lambda fichier: np.savez(
+            fichier, version=VERSION_FORMAT, coords=self.coords, offsets=self.offsets, aires=self.aires,
+        ))
+
+    # Recharger des cellules depuis un artefact .npz
+    @classmethod
+    def depuis_fichier(cls, chemin):
+        with np.load(chemin) as donnees:
+            if int(donnees["version"]) != VERSION_FORMAT:
+                raise ValueError(f"Format d'artefact obsolète : {chemin}")
+            return cls(donnees["coords"], donnees["offsets"], donnees["aires"])
+
+###################################################################################################
+###################################################################################################
+
+# Numéro de polygone de chaque sommet et indice du sommet suivant dans le même polygone
+def _suivants(offsets):
+    longueurs = np.diff(offsets)
+    polygones = np.repeat(np.arange(len(longueurs)), longueurs)
+    suivants = np.arange(offsets[-1]) + 1
+    fins = offsets[1:][longueurs > 0] - 1
+    suivants[fins] = offsets[:-1][longueurs > 0]  # Le dernier sommet est relié au premier
+    return polygones, suivants
+
+# Aires (formule du lacet) de polygones stockés à plat
+def aires_polygones(xy, offsets):
+    """Aire de chaque polygone (positive si ses sommets sont dans le sens trigonométrique)."""
+    polygones, suivants = _suivants(offsets)
+    produits = xy[:, 0] * xy[suivants, 1] - xy[suivants, 0] * xy[:, 1]
+    return np.bincount(polygones, weights=produits, minlength=len(offsets) - 1) / 2
+
+# Ordonner les sommets de chaque polygone convexe dans le sens trigonométrique autour d'un centre
+def _ordonner(xy, polygones, centres):
+    angles = np.arctan2(xy[:, 1] - centres[polygones, 1], xy[:, 0] - centres[polygones, 0])
+    return np.lexsort((angles, polygones))
+
+# Découper des polygones stockés à plat par un polygone convexe (Sutherland-Hodgman)
+def decouper_polygones(xy, offsets, frontiere):
+    """Retourne (xy, offsets) des polygones découpés par `frontiere` (convexe, sens trigonométrique).
+
+    Chaque côté de la frontière est traité en une seule passe vectorisée sur tous les sommets
+    de tous les polygones ; un polygone entièrement à l'extérieur devient vide.
+    """
+    nb_polygones = len(offsets) - 1
+    for a, b in zip(frontiere, np.roll(frontiere, -1, axis=0)):
+        polygones, suivants = _suivants(offsets)
+        # Position de chaque sommet par rapport au côté [a, b] (positive à l'intérieur)
+        cote = (b[0] - a[0]) * (xy[:, 1] - a[1]) - (b[1] - a[1]) * (xy[:, 0] - a[0])
+        dedans = cote >= 0
+        traverse = dedans != dedans[suivants]
+
+        # Chaque sommet produit : lui-même s'il est à l'intérieur, puis l'intersection si le côté
+        # [sommet, suivant] traverse la frontière
+        nombres = dedans.astype(np.int64) + traverse
+        sources = np.repeat(np.arange(len(xy)), nombres)
+        rang = np.arange(len(sources)) - np.repeat(np.cumsum(nombres) - nombres, nombres)
+        intersection = ~(dedans[sources] & (rang == 0))
+
+        nouveaux = xy[sources].copy()
+        i, j = sources[intersection], suivants[sources[intersection]]
+        t = (cote[i] / (cote[i] - cote[j]))[:, None]
+        nouveaux[intersection] = xy[i] + t * (xy[j] - xy[i])
+
+        xy = nouveaux
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(polygones[sources], minlength=nb_polygones))))
+    return xy, offsets
+
+###################################################################################################
+###################################################################################################
+
+# Enveloppe convexe de points, dans le sens trigonométrique
+def enveloppe_convexe(xy):
+    from scipy.spatial import ConvexHull
+
+    return xy[ConvexHull(xy).vertices]  # En 2D, les sommets sont déjà dans le sens trigonométrique
+
+# Vérifier qu'une frontière est un polygone convexe et l'orienter dans le sens trigonométrique
+def orienter_frontiere(xy):
+    if aires_polygones(xy, np.array([0, len(xy)]))[0] < 0:
+        xy = xy[::-1]
+    a, b, c = xy, np.roll(xy, -1, axis=0), np.roll(xy, -2, axis=0)
+    virages = (b[:, 0] - a[:, 0]) * (c[:, 1] - b[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - b[:, 0])
+    if (virages < -1e-9 * np.abs(virages).max()).any():
+        raise ValueError("La frontière doit être un polygone convexe")
+    return xy
+
+# Calculer les cellules de Voronoi bornées de stations
+def calculer_cellules(lat, lon, frontiere=None):
+    """Retourne les cellules (CellulesVoronoi) des stations de coordonnées `lat`, `lon`.
+
+    `frontiere` est un polygone convexe (tableau (m, 2) de latitudes, longitudes) ;
+    par défaut, l'enveloppe convexe des stations.
+    """
+    from scipy.spatial import Voronoi
+
+    lat0, lon0 = float(np.mean(lat)), float(np.mean(lon))
+    stations = projeter(lat, lon, lat0, lon0)  # Les distances doivent être en mètres
+    # Une seule cellule par position : les stations de mêmes coordonnées la partagent
+    xy, premieres, positions, nombres = np.unique(stations, axis=0, return_index=True,
+                                                  return_inverse=True, return_counts=True)
+    positions = positions.reshape(-1)
+    if frontiere is None:
+        bord = enveloppe_convexe(xy)
+    else:
+        frontiere = np.asarray(frontiere, dtype=np.float64)
+        bord = orienter_frontiere(projeter(frontiere[:, 0], frontiere[:, 1], lat0, lon0))
+
+    # Points fictifs éloignés : toutes les cellules des stations deviennent bornées, et leurs
+    # bissectrices avec les stations restent en dehors de la frontière
+    etendue = np.ptp(np.vstack((xy, bord)), axis=0).max() + 1.0
+    angles = np.linspace(0, 2 * np.pi, NB_POINTS_FICTIFS, endpoint=False)
+    fictifs = xy.mean(axis=0) + 10 * etendue * np.column_stack((np.cos(angles), np.sin(angles)))
+    vor = Voronoi(np.vstack((xy, fictifs)))
+
+    # Cellules des stations, à plat, ordonnées dans le sens trigonométrique
+    n = len(xy)
+    regions = [vor.regions[r] for r in vor.point_region[:n].tolist()]
+    longueurs = np.fromiter((len(r) for r in regions), dtype=np.int64, count=n)
+    sommets = np.fromiter((s for r in regions for s in r), dtype=np.int64, count=longueurs.sum())
+    polygones = np.repeat(np.arange(n), longueurs)
+    ordre = _ordonner(vor.vertices[sommets], polygones, xy)
+    cellules = vor.vertices[sommets[ordre]]
+    offsets = np.concatenate(([0], np.cumsum(longueurs)))
+
+    cellules, offsets = decouper_polygones(cellules, offsets, bord)
+    aires = aires_polygones(cellules, offsets)
+
+    # Retour à l'ordre des stations : la cellule d'une position revient à sa première station
+    longueurs = np.where(premieres[positions] == np.arange(len(stations)), np.diff(offsets)[positions], 0)
+    offsets_stations = np.concatenate(([0], np.cumsum(longueurs)))
+    index = np.repeat(offsets[:-1][positions] - offsets_stations[:-1], longueurs) + np.arange(offsets_stations[-1])
+    return CellulesVoronoi(deprojeter(cellules[index], lat0, lon0), offsets_stations,
+                           aires[positions] / nombres[positions])
+
+# Charger les cellules des stations (découpées par leur enveloppe convexe) depuis le cache
+@mesure("cellules_voronoi", lambda cellules: {"polygones": int(np.count_nonzero(np.diff(cellules.offsets)))})
+def charger_cellules(fichier_json="station_informations.json", dossier_cache=DOSSIER_CACHE):
+    chemin = chemin_artefact("cellules", empreinte_fichier(fichier_json), dossier_cache)
+    if chemin.exists():
+        try:
+            return CellulesVoronoi.depuis_fichier(chemin)
+        except (OSError, KeyError, ValueError) as e:
+            # Artefact illisible ou obsolète : on le recalcule
+            print(f"Artefact des cellules de Voronoi ignoré ({e}), recalcul en cours...")
+
+    table = StationTable.charger(fichier_json, dossier_cache)
+    cellules = calculer_cellules(table.lat, table.lon)
+    cellules.sauvegarder(chemin)
+    elaguer_artefacts(chemin)
+    return cellules
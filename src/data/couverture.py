@@ -0,0 +1,167 @@
+"""
+Raster de couverture : distance (en mètres) de chaque point de la zone desservie à la station la
+plus proche, et à la k-ième (redondance). La grille couvre l'emprise des stations à une résolution
+donnée ; elle est découpée en tuiles calculées en parallèle et écrites directement dans un fichier
+.npy projeté en mémoire, si bien que la mémoire utilisée ne dépend que de la taille des tuiles.
+"""
+import os  # Pour connaître le nombre de processeurs
+from concurrent.futures import ProcessPoolExecutor  # Pour répartir les tuiles entre les processus
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.geo import RAYON_TERRE
+from data.index_spatial import charger_index_spatial
+from data.station_table import StationTable
+from profilage import compter_fichier, initialiser_processus, mesure
+
+# Distance maximale enregistrée (uint16, en mètres) ; au-delà, la valeur est saturée
+DISTANCE_MAX = np.iinfo(np.uint16).max
+
+# Seuils (en mètres) pour lesquels la part de la zone couverte est calculée
+SEUILS = (100, 200, 300, 500, 1000)
+
+# Index spatial de chaque processus de calcul (chargé une seule fois par processus)
+_INDEX = None
+
+###################################################################################################
+###################################################################################################
+
+# Décrire la grille : coin nord-ouest, pas en degrés et nombre de lignes et de colonnes
+def definir_grille(lat, lon, resolution=10.0, marge=0.0):
+    """Retourne un dictionnaire décrivant la grille qui couvre les stations (plus `marge` mètres).
+
+    La ligne 0 est au nord (convention des images) ; les pas en latitude et longitude
+    correspondent à `resolution` mètres au centre de la zone.
+    """
+    lat0 = float(np.mean([np.min(lat), np.max(lat)]))
+    pas_lat = np.degrees(resolution / RAYON_TERRE)
+    pas_lon = pas_lat / np.cos(np.radians(lat0))
+    nord = float(np.max(lat)) + marge / resolution * pas_lat
+    sud = float(np.min(lat)) - marge / resolution * pas_lat
+    ouest = float(np.min(lon)) - marge / resolution * pas_lon
+    est = float(np.max(lon)) + marge / resolution * pas_lon
+    return {
+        "nord": nord, "ouest": ouest, "pas_lat": pas_lat, "pas_lon": pas_lon, "resolution": resolution,
+        "lignes": int(np.ceil((nord - sud) / pas_lat)) + 1,
+        "colonnes": int(np.ceil((est - ouest) / pas_lon)) + 1,
+    }
+
+# Découper la grille en tuiles (i0, i1, j0, j1) d'au plus `taille` × `taille` cellules
+def decouper_tuiles(lignes, colonnes, taille=1024):
+    return [(i, min(i + taille, lignes), j, min(j + taille, colonnes))
+            for i in range(0, lignes, taille) for j in range(0, colonnes, taille)]
+
+###################################################################################################
+###################################################################################################
+
+# Charger l'index spatial dans chaque processus de calcul
+def _initialiser(fichier_json, dossier_cache):
+    global _INDEX
+    _INDEX = charger_index_spatial(fichier_json, dossier_cache)
+
+# Calculer une tuile et l'écrire dans le fichier de sortie ; retourne son histogramme des distances
+def _calculer_tuile(sortie, grille, k, tuile):
+    i0, i1, j0, j1 = tuile
+    lat = grille["nord"] - np.arange(i0, i1) * grille["pas_lat"]
+    lon = grille["ouest"] + np.arange(j0, j1) * grille["pas_lon"]
+    lat, lon = np.meshgrid(lat, lon, indexing="ij")
+
+    distances, _ = _INDEX.plus_proches(lat.ravel(), lon.ravel(), k=k, workers=1)
+    distances = np.minimum(np.rint(distances), DISTANCE_MAX).astype(np.uint16).reshape(i1 - i0, j1 - j0, k)
+
+    raster = np.load(sortie, mmap_mode="r+")
+    raster[i0:i1, j0:j1] = distances
+    raster.flush()
+    # Histogramme (pas de 1 m) de la distance à la station la plus proche, pour les statistiques
+    return np.bincount(distances[..., 0].ravel(), minlength=DISTANCE_MAX + 1)
+
+###################################################################################################
+###################################################################################################
+
+# Calculer le raster de couverture des stations
+@mesure("couverture", lambda resume: {"cellules": resume["nb_cellules"]})
+def calculer_couverture(fichier_json="station_informations.json", sortie="results/analysis/couverture.npy",
+                        resolution=10.0, k=2, taille_tuile=1024, processus=None, marge=0.0,
+                        dossier_cache="cache"):
+    """Écrit le raster (lignes, colonnes, k) uint16 des distances en mètres dans `sortie`.
+
+    Retourne un résumé : la grille, la distance médiane et le 90e centile à la station la plus
+    proche, et la part de la zone située à moins de chaque seuil de `SEUILS`.
+    """
+    table = StationTable.charger(fichier_json, dossier_cache)
+    charger_index_spatial(fichier_json, dossier_cache)  # Construire l'index avant de lancer les processus
+    grille = definir_grille(table.lat, table.lon, resolution, marge)
+    k = min(k, len(table))
+
+    # Le fichier de sortie est créé à sa taille définitive ; chaque tuile y écrit sa partie
+    Path(sortie).parent.mkdir(parents=True, exist_ok=True)
+    forme = (grille["lignes"], grille["colonnes"], k)
+    np.lib.format.open_memmap(sortie, mode="w+", dtype=np.uint16, shape=forme).flush()
+
+    tuiles = decouper_tuiles(grille["lignes"], grille["colonnes"], taille_tuile)
+    processus = processus or os.cpu_count()
+    histogramme = np.zeros(DISTANCE_MAX + 1, dtype=np.int64)
+    if processus == 1:
+        _initialiser(fichier_json, dossier_cache)
+        for tuile in tuiles:
+            histogramme += _calculer_tuile(sortie, grille, k, tuile)
+    else:
+        with ProcessPoolExecutor(processus, initializer=initialiser_processus,
+                                 initargs=(_initialiser, fichier_json, dossier_cache)) as executeur:
+            for h in executeur.map(_calculer_tuile, *zip(*((sortie, grille, k, t) for t in tuiles))):
+                histogramme += h
+
+    compter_fichier(sortie)
+
+    # Statistiques de la distance à la station la plus proche
+    cumul = np.cumsum(histogramme) / histogramme.sum()
+    return {
+        "grille": grille,
+        "sortie": str(sortie),
+        "nb_cellules": int(histogramme.sum()),
+        "distance_mediane_m": int(np.searchsorted(cumul, 0.5)),
+        "distance_90_m": int(np.searchsorted(cumul, 0.9)),
+        "part_couverte": {seuil: float(cumul[seuil]) for seuil in SEUILS},
+    }
+
+###################################################################################################
+###################################################################################################
+
+# Enregistrer une carte de chaleur du raster (PNG) et la superposer à une carte Folium
+@mesure("rendu_couverture")
+def rendre_couverture(sortie, grille, fichier_png, fichier_carte=None, rang=0, distance_max=500,
+                      pixels_max=2048):
+    """Le raster est sous-échantillonné pour que l'image ait au plus `pixels_max` pixels de côté.
+
+    `rang` choisit la couche (0 : station la plus proche, k - 1 : k-ième) et les distances
+    sont représentées de 0 à `distance_max` mètres.
+    """
+    from matplotlib.image import imsave  # Rendu sans écran
+
+    raster = np.load(sortie, mmap_mode="r")
+    pas = max(1, -(-max(raster.shape[:2]) // pixels_max))
+    image = np.asarray(raster[::pas, ::pas, rang])  # Seules les cellules retenues sont lues
+    Path(fichier_png).parent.mkdir(parents=True, exist_ok=True)
+    imsave(fichier_png, image, cmap="magma_r", vmin=0, vmax=distance_max)
+    compter_fichier(fichier_png)
+
+    if fichier_carte is None:
+        return None
+    import folium  # Pour créer des cartes interactives
+    from visualization.rendu_geojson import sauvegarder_carte
+
+    # Emprise de l'image : chaque pixel couvre pas × pas cellules, à partir du coin nord-ouest
+    nord = grille["nord"] + grille["pas_lat"] / 2
+    ouest = grille["ouest"] - grille["pas_lon"] / 2
+    sud = nord - image.shape[0] * pas * grille["pas_lat"]
+    est = ouest + image.shape[1] * pas * grille["pas_lon"]
+    m = folium.Map(location=[(nord + sud) / 2, (ouest + est) / 2], zoom_start=12)
+    folium.raster_layers.ImageOverlay(
+        image=str(fichier_png),  # L'image est intégrée à la page HTML
+        bounds=[[sud, ouest], [nord, est]],
+        opacity=0.6,
+        name=f"Distance à la station n°{rang + 1} la plus proche (0 à {distance_max} m)",
+    ).add_to(m)
+    folium.LayerControl().add_to(m)
+    sauvegarder_carte(m, fichier_carte)
+    return m
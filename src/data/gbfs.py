@@ -0,0 +1,164 @@
+"""
+Récupération asynchrone et périodique des flux GBFS Vélib' (station_information, station_status).
+Les requêtes sont conditionnelles (ETag / If-Modified-Since) : un flux inchangé n'est ni
+retéléchargé ni réécrit. Les fichiers sont écrits de manière atomique.
+"""
+import argparse  # Pour lire les options de la ligne de commande
+import asyncio  # Pour effectuer les requêtes en parallèle
+import json  # Pour manipuler les fichiers JSON
+import sys  # Pour modifier le chemin des imports
+import time  # Pour mesurer l'intervalle entre deux interrogations
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+import aiohttp  # Client HTTP asynchrone
+
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data.cache import ecrire_atomique  # Pour écrire les fichiers de manière atomique
+
+# Adresse de base des flux GBFS Vélib'
+URL_BASE = "https://velib-metropole-opendata.smovengo.cloud/opendata/Velib_Metropole/"
+
+# Flux à récupérer et nom du fichier local correspondant
+FLUX = {
+    "station_information.json": "station_informations.json",
+    "station_status.json": "station_status.json",
+}
+
+###################################################################################################
+###################################################################################################
+
+# Lire les métadonnées HTTP (ETag, Last-Modified) enregistrées lors du dernier téléchargement
+def lire_meta(destination):
+    try:
+        with open(f"{destination}.meta.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+# Enregistrer les métadonnées HTTP d'un téléchargement
+def ecrire_meta(destination, meta):
+    contenu = json.dumps(meta).encode("utf-8")
+    ecrire_atomique(f"{destination}.meta.json", lambda f: f.write(contenu))
+
+###################################################################################################
+###################################################################################################
+
+# Télécharger un flux si (et seulement si) il a changé depuis le dernier téléchargement
+async def telecharger(session, url, destination, tentatives=4, delai_initial=1.0):
+    """Retourne True si le fichier `destination` a été mis à jour, False si le flux est inchangé.
+
+    Les erreurs réseau, les délais dépassés et les erreurs serveur (5xx) sont retentés avec
+    un délai doublé à chaque essai ; la dernière erreur est propagée.
+    """
+    meta = lire_meta(destination)
+    entetes = {}
+    if Path(destination).exists():
+        # Requête conditionnelle : le serveur répond 304 si le flux n'a pas changé
+        if "etag" in meta:
+            entetes["If-None-Match"] = meta["etag"]
+        if "last_modified" in meta:
+            entetes["If-Modified-Since"] = meta["last_modified"]
+
+    delai = delai_initial
+    for essai in range(tentatives):
+        try:
+            async with session.get(url, headers=entetes) as reponse:
+                if reponse.status == 304:
+                    return False  # Flux inchangé : rien à télécharger ni à analyser
+                if reponse.status >= 500:
+                    raise aiohttp.ClientResponseError(reponse.request_info, reponse.history,
+                                                      status=reponse.status, message=reponse.reason)
+                reponse.raise_for_status()
+                contenu = await reponse.read()
+                # Écriture atomique du contenu brut (pas de réanalyse JSON)
+                ecrire_atomique(destination, lambda f: f.write(contenu))
+                ecrire_meta(destination, {
+                    "etag": reponse.headers.get("ETag"),
+                    "last_modified": reponse.headers.get("Last-Modified"),
+                    "url": url,
+                    "date": time.time(),
+                } if reponse.headers.get("ETag") or reponse.headers.get("Last-Modified") else {})
+                return True
+        except aiohttp.ClientResponseError as e:
+            if e.status < 500 or essai == tentatives - 1:
+                raise  # Erreur client (4xx) : inutile de réessayer
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if essai == tentatives - 1:
+                raise
+        await asyncio.sleep(delai)  # Attente exponentielle avant un nouvel essai
+        delai *= 2
+    return False
+
+# Récupérer tous les flux en parallèle avec une même session
+async def rafraichir(session, url_base=URL_BASE, dossier=".", flux=FLUX):
+    """Retourne la liste des fichiers locaux mis à jour."""
+    noms = list(flux)
+    resultats = await asyncio.gather(
+        *(telecharger(session, url_base + nom, str(Path(dossier) / flux[nom])) for nom in noms),
+        return_exceptions=True,
+    )
+    mis_a_jour = []
+    for nom, resultat in zip(noms, resultats):
+        if isinstance(resultat, BaseException):
+            print(f"Erreur lors du téléchargement de {nom} : {resultat}")  # Gérer les erreurs
+        elif resultat:
+            mis_a_jour.append(str(Path(dossier) / flux[nom]))
+    return mis_a_jour
+
+# Créer une session HTTP réutilisable (connexions conservées entre deux interrogations)
+def creer_session(delai_max=30):
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=delai_max),
+        connector=aiohttp.TCPConnector(limit=8),
+    )
+
+# Interroger les flux toutes les `intervalle` secondes
+async def interroger(url_base=URL_BASE, dossier=".", intervalle=60, iterations=None, rappel=None):
+    """Boucle d'interrogation ; `rappel(fichiers)` est appelé avec les fichiers mis à jour."""
+    Path(dossier).mkdir(parents=True, exist_ok=True)
+    async with creer_session() as session:
+        n = 0
+        while iterations is None or n < iterations:
+            debut = time.monotonic()
+            mis_a_jour = await rafraichir(session, url_base, dossier)
+            if mis_a_jour and rappel is not None:
+                rappel(mis_a_jour)
+            n += 1
+            if iterations is None or n < iterations:
+                # Attendre la prochaine échéance en tenant compte de la durée du téléchargement
+                await asyncio.sleep(max(0.0, intervalle - (time.monotonic() - debut)))
+
+
+# Code principal
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Récupérer périodiquement les flux GBFS Vélib'")
+    parser.add_argument("--url-base", default=URL_BASE, help="Adresse de base des flux GBFS")
+    parser.add_argument("--dossier", default=".", help="Dossier de destination des fichiers")
+    parser.add_argument("--intervalle", type=float, default=60, help="Secondes entre deux interrogations")
+    parser.add_argument("--une-fois", action="store_true", help="Interroger une seule fois puis s'arrêter")
+    parser.add_argument("--historique", metavar="DOSSIER",
+                        help="Ajouter chaque nouvel instantané station_status à cet historique")
+    args = parser.parse_args()
+
+    historique = None
+
+    # Afficher les fichiers mis à jour et alimenter l'historique
+    def rappel(fichiers):
+        global historique
+        print(f"Fichiers mis à jour : {', '.join(fichiers)}")
+        statut = str(Path(args.dossier) / FLUX["station_status.json"])
+        if args.historique and statut in fichiers:
+            if historique is None:
+                from data.historique import Historique
+                # Les colonnes suivent le fichier des stations (étendues aux stations ouvertes ensuite)
+                historique = Historique.ouvrir_ou_creer(
+                    args.historique, str(Path(args.dossier) / FLUX["station_information.json"]))
+            historique.ajouter_fichier(statut, str(Path(args.dossier) / FLUX["station_information.json"]))
+
+    asyncio.run(interroger(
+        args.url_base, args.dossier, args.intervalle,
+        iterations=1 if args.une_fois else None,
+        rappel=rappel,
+    ))
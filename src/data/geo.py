@@ -0,0 +1,82 @@
+"""
+Fonctions géographiques vectorisées : distances sur la sphère terrestre, projection locale,
+coordonnées cartésiennes et longueur des arêtes d'une liste d'adjacence.
+"""
+import numpy as np  # Pour manipuler des tableaux numériques
+
+# Rayon moyen de la Terre (en mètres)
+RAYON_TERRE = 6_371_008.8
+
+###################################################################################################
+###################################################################################################
+
+# Distance du grand cercle (en mètres) entre des couples de points (en degrés)
+def haversine(lat1, lon1, lat2, lon2):
+    """Distance haversine en mètres ; les arguments peuvent être des nombres ou des tableaux."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+# Projection équirectangulaire locale (en mètres) autour d'un point de référence
+def projeter(lat, lon, lat0=None, lon0=None):
+    """Retourne un tableau (n, 2) de coordonnées (x, y) en mètres.
+
+    Sans point de référence, le centre des points est utilisé. L'erreur reste négligeable
+    à l'échelle d'une agglomération (quelques dizaines de kilomètres).
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    lat0 = float(np.mean(lat)) if lat0 is None else lat0
+    lon0 = float(np.mean(lon)) if lon0 is None else lon0
+    x = np.radians(lon - lon0) * RAYON_TERRE * np.cos(np.radians(lat0))
+    y = np.radians(lat - lat0) * RAYON_TERRE
+    return np.column_stack((x, y))
+
+# Coordonnées cartésiennes (en mètres) sur la sphère terrestre
+def cartesiennes(lat, lon):
+    """Retourne un tableau (n, 3) de points (x, y, z) en mètres.
+
+    La distance euclidienne (corde) entre deux points croît avec leur distance haversine :
+    les plus proches voisins sont donc exactement les mêmes (voir `corde` et `arc`).
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    return RAYON_TERRE * np.column_stack((np.cos(lat) * np.cos(lon),
+                                          np.cos(lat) * np.sin(lon),
+                                          np.sin(lat)))
+
+# Longueur de la corde correspondant à une distance sur la sphère (en mètres)
+def corde(distance):
+    distance = np.minimum(np.asarray(distance, dtype=np.float64), np.pi * RAYON_TERRE)  # Au plus un demi-tour
+    return 2 * RAYON_TERRE * np.sin(distance / (2 * RAYON_TERRE))
+
+# Distance sur la sphère correspondant à une longueur de corde (en mètres)
+def arc(longueur):
+    return 2 * RAYON_TERRE * np.arcsin(np.clip(np.asarray(longueur, dtype=np.float64) / (2 * RAYON_TERRE), 0, 1))
+
+# Projection inverse de `projeter` : coordonnées (x, y) en mètres vers (latitude, longitude)
+def deprojeter(xy, lat0, lon0):
+    """Retourne un tableau (n, 2) de coordonnées (latitude, longitude) en degrés."""
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    lat = lat0 + np.degrees(xy[:, 1] / RAYON_TERRE)
+    lon = lon0 + np.degrees(xy[:, 0] / (RAYON_TERRE * np.cos(np.radians(lat0))))
+    return np.column_stack((lat, lon))
+
+###################################################################################################
+###################################################################################################
+
+# Pondération des arêtes d'une liste d'adjacence CSR par leur longueur géographique
+def ponderer_aretes(liste_adjacence, table):
+    """Retourne (u, v, longueurs) : chaque arête (u < v) de `liste_adjacence` (ids, indptr, indices),
+    exprimée en lignes de la table des stations `table`, et sa longueur haversine en mètres."""
+    ids, indptr, indices = liste_adjacence
+    # Ligne de la table correspondant à chaque station de la liste d'adjacence
+    lignes = table.lignes(ids)
+    # Station de départ de chaque arête, déduite des écarts de indptr
+    sources = np.repeat(np.arange(len(ids)), np.diff(indptr))
+    # Ne garder chaque arête qu'une fois, et seulement si ses deux stations sont connues
+    u, v = lignes[sources], lignes[indices]
+    garder = (sources < indices) & (u >= 0) & (v >= 0)
+    u, v = u[garder], v[garder]
+    # Longueur de toutes les arêtes en une seule passe
+    return u, v, haversine(table.lat[u], table.lon[u], table.lat[v], table.lon[v])
@@ -0,0 +1,235 @@
+"""
+Analyse du réseau des stations directement sur la liste d'adjacence CSR (sans networkx) :
+composantes connexes, degrés, proximité et intermédiarité. Les arêtes sont pondérées par leur
+longueur haversine ; les plus courts chemins sont calculés par Dijkstra (scipy.sparse.csgraph)
+depuis un échantillon de stations sources, réparti entre plusieurs processus. Tous les résultats
+sont des tableaux alignés sur la table des stations.
+"""
+import os  # Pour connaître le nombre de processeurs
+from concurrent.futures import ProcessPoolExecutor  # Pour répartir les sources entre les processus
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.geo import ponderer_aretes  # Longueur géographique des arêtes
+from profilage import initialiser_processus, mesure  # Mesure des étapes (option --profile)
+
+# Nombre de sources échantillonnées par défaut (toutes les stations si le réseau est plus petit)
+NB_SOURCES = 256
+
+# Matrice du graphe de chaque processus de calcul (transmise une seule fois par processus)
+_MATRICE = None
+
+###################################################################################################
+###################################################################################################
+
+# Matrice creuse symétrique des longueurs d'arêtes, indexée par les lignes de la table des stations
+def matrice_longueurs(liste_adjacence, table):
+    from scipy.sparse import csr_matrix  # Import coûteux, seulement si nécessaire
+
+    u, v, longueurs = ponderer_aretes(liste_adjacence, table)
+    n = len(table)
+    # Une longueur nulle (stations aux mêmes coordonnées) serait vue comme une arête absente
+    poids = np.maximum(longueurs, 1e-6)
+    return csr_matrix((np.concatenate((poids, poids)), (np.concatenate((u, v)), np.concatenate((v, u)))),
+                      shape=(n, n))
+
+# Taille du sous-arbre de chaque nœud d'un arbre décrit par le parent de chaque nœud (< 0 : racine)
+def tailles_sous_arbres(parents):
+    n = len(parents)
+    parents = np.where(parents >= 0, parents, -1)
+
+    # Profondeur de chaque nœud par sauts de pointeurs (log(hauteur) passes vectorisées)
+    profondeur = (parents >= 0).astype(np.int64)
+    suivant = parents.copy()
+    actifs = np.flatnonzero(suivant >= 0)
+    while len(actifs):
+        cibles = suivant[actifs]
+        profondeur[actifs] = profondeur[actifs] + profondeur[cibles]
+        suivant[actifs] = suivant[cibles]
+        actifs = actifs[suivant[actifs] >= 0]
+
+    # Accumulation niveau par niveau, des feuilles les plus profondes vers la racine
+    tailles = np.ones(n, dtype=np.float64)
+    ordre = np.argsort(-profondeur, kind="stable")
+    bornes = np.flatnonzero(np.diff(profondeur[ordre])) + 1
+    for niveau in np.split(ordre, bornes):
+        if profondeur[niveau[0]] == 0:
+            break  # Racine et nœuds non atteints
+        np.add.at(tailles, parents[niveau], tailles[niveau])
+    return tailles
+
+###################################################################################################
+###################################################################################################
+
+# Transmettre la matrice du graphe à chaque processus de calcul
+def _initialiser(matrice):
+    global _MATRICE
+    _MATRICE = matrice
+
+# Plus courts chemins depuis un lot de sources : distances cumulées et dépendances (Brandes)
+def _accumuler(sources):
+    """Retourne (somme des distances, nombre de sources atteintes, intermédiarité partielle).
+
+    Les longueurs étant réelles, le plus court chemin entre deux stations est presque toujours
+    unique : la dépendance d'une station pour une source est alors la taille de son sous-arbre
+    dans l'arbre des plus courts chemins, moins un.
+    """
+    from scipy.sparse.csgraph import dijkstra  # Import coûteux, seulement si nécessaire
+
+    distances, predecesseurs = dijkstra(_MATRICE, directed=True, indices=sources, return_predecessors=True)
+    atteint = np.isfinite(distances)
+    somme = np.where(atteint, distances, 0.0).sum(axis=0)
+    nombre = atteint.sum(axis=0)
+    nombre[sources] -= 1  # Une source s'atteint elle-même (distance nulle)
+
+    intermediarite = np.zeros(_MATRICE.shape[0])
+    for source, parents in zip(sources, predecesseurs):
+        dependances = tailles_sous_arbres(parents) - 1
+        dependances[source] = 0.0
+        intermediarite += dependances
+    return somme, nombre, intermediarite
+
+# Proximité et intermédiarité de toutes les stations, estimées depuis un échantillon de sources
+def centralites(matrice, composante, nb_sources=NB_SOURCES, graine=0, processus=None, taille_lot=32):
+    """Retourne (proximite, distance_moyenne, intermediarite, sources).
+
+    Avec toutes les stations comme sources, les valeurs sont exactes et normalisées comme
+    dans networkx (`closeness_centrality` et `betweenness_centrality`, pondérées par la longueur) ;
+    sinon l'intermédiarité est extrapolée (× n / nb_sources) et la distance moyenne de chaque station
+    est estimée sur les sources échantillonnées de sa composante.
+    """
+    n = matrice.shape[0]
+    if nb_sources is None or nb_sources >= n:
+        sources = np.arange(n)
+    else:
+        sources = np.sort(np.random.default_rng(graine).choice(n, size=nb_sources, replace=False))
+    lots = [sources[i:i + taille_lot] for i in range(0, len(sources), taille_lot)]
+
+    somme, nombre, intermediarite = np.zeros(n), np.zeros(n, dtype=np.int64), np.zeros(n)
+    processus = min(processus or os.cpu_count(), len(lots))
+    if processus <= 1:
+        _initialiser(matrice)
+        resultats = map(_accumuler, lots)
+    else:
+        executeur = ProcessPoolExecutor(processus, initializer=initialiser_processus,
+                                        initargs=(_initialiser, matrice))
+        resultats = executeur.map(_accumuler, lots)
+    try:
+        for s, nb, b in resultats:
+            somme += s
+            nombre += nb
+            intermediarite += b
+    finally:
+        if processus > 1:
+            executeur.shutdown()
+
+    # Proximité (Wasserman et Faust) : inverse de la distance moyenne, pondéré par la part
+    # des stations atteignables
+    tailles = np.bincount(composante)[composante]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        distance_moyenne = np.where(nombre > 0, somme / nombre, np.nan)
+        proximite = np.where(nombre > 0, (tailles - 1) / max(n - 1, 1) / distance_moyenne, 0.0)
+
+    # Intermédiarité normalisée par le nombre de couples (s, t), extrapolée si échantillonnée
+    echelle = 1.0 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+    intermediarite *= echelle * n / len(sources) if len(sources) else 0.0
+    return proximite, distance_moyenne, intermediarite, sources
+
+###################################################################################################
+###################################################################################################
+
+# Analyser le graphe des stations
+@mesure("graphe", lambda analyse: {"stations": len(analyse["degre"]), "sources": analyse["nb_sources"]})
+def analyser_graphe(liste_adjacence, table, nb_sources=NB_SOURCES, graine=0, processus=None):
+    """Retourne un dictionnaire de tableaux alignés sur `table` : composante, taille_composante,
+    degre, proximite, distance_moyenne_m, intermediarite (et nb_sources, exact)."""
+    from scipy.sparse.csgraph import connected_components  # Import coûteux, seulement si nécessaire
+
+    matrice = matrice_longueurs(liste_adjacence, table)
+    _, composante = connected_components(matrice, directed=False)
+    proximite, distance_moyenne, intermediarite, sources = centralites(
+        matrice, composante, nb_sources, graine, processus,
+    )
+    return {
+        "composante": composante,
+        "taille_composante": np.bincount(composante)[composante],
+        "degre": np.diff(matrice.indptr),
+        "proximite": proximite,
+        "distance_moyenne_m": distance_moyenne,
+        "intermediarite": intermediarite,
+        "nb_sources": int(len(sources)),
+        "exact": bool(len(sources) == len(table)),
+    }
+
+# Résumé de l'analyse : composantes, distribution des degrés et stations les plus critiques
+def resumer_graphe(analyse, table, nb_critiques=10):
+    tailles = np.bincount(analyse["composante"]) if len(table) else np.zeros(0, dtype=np.int64)
+    critiques = np.argsort(-analyse["intermediarite"], kind="stable")[:nb_critiques]
+    return {
+        "nb_stations": len(table),
+        "nb_aretes": int(analyse["degre"].sum() // 2),
+        "nb_composantes": int(len(tailles)),
+        "taille_plus_grande_composante": int(tailles.max()) if len(tailles) else 0,
+        "stations_isolees": int((tailles == 1).sum()),
+        "repartition_degres": np.bincount(analyse["degre"]).tolist(),
+        "degre_moyen": float(analyse["degre"].mean()) if len(table) else 0.0,
+        "nb_sources": analyse["nb_sources"],
+        "exact": analyse["exact"],
+        "stations_critiques": [
+            {
+                "station_id": table.station_id[i].item(),
+                "nom": table.nom(i),
+                "intermediarite": float(analyse["intermediarite"][i]),
+                "degre": int(analyse["degre"][i]),
+            }
+            for i in critiques.tolist()
+        ],
+    }
+
+###################################################################################################
+###################################################################################################
+
+# Analyser le graphe des stations d'un fichier GBFS et écrire le tableau, le résumé et la carte
+def generer_analyse_graphe(fichier_json="station_informations.json", output_dir="results/analysis",
+                           fichier_carte="results/maps/velib_graphe_map.html", nb_sources=NB_SOURCES,
+                           graine=0, processus=None):
+    """Écrit `graphe.csv` (une ligne par station) et `graphe.json` dans `output_dir`, et la carte
+    `fichier_carte` (si elle est demandée). Retourne le résumé (None s'il y a moins de 3 stations)."""
+    import csv  # Pour écrire le tableau des stations
+    import json  # Pour écrire le résumé
+    from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+    from data.liste_adjacence import construire_adjacence
+    from data.station_table import StationTable
+    from data.triangulation import charger_triangulation
+    from profilage import compter_fichier
+
+    table = StationTable.charger(fichier_json)
+    if len(table) < 3:
+        print("Pas assez de stations pour analyser le graphe.")
+        return None
+    # Liste d'adjacence déduite de la triangulation (mise en cache), dans l'ordre de la table
+    indptr, indices = construire_adjacence(charger_triangulation(fichier_json))
+    analyse = analyser_graphe((table.station_id, indptr, indices), table, nb_sources, graine, processus)
+    resume = resumer_graphe(analyse, table)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / "graphe.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["station_id", "nom", "composante", "degre", "proximite", "distance_moyenne_m",
+                         "intermediarite"])
+        writer.writerows(zip(
+            table.station_id.tolist(), table.liste_noms(), analyse["composante"].tolist(),
+            analyse["degre"].tolist(), np.round(analyse["proximite"], 9).tolist(),
+            np.round(analyse["distance_moyenne_m"], 1).tolist(), np.round(analyse["intermediarite"], 6).tolist(),
+        ))
+    compter_fichier(output_dir / "graphe.csv")
+    with open(output_dir / "graphe.json", "w", encoding="utf-8") as f:
+        json.dump(resume, f, indent=4, ensure_ascii=False)
+    compter_fichier(output_dir / "graphe.json")
+
+    if fichier_carte:
+        from visualization.carte_graphe import carte_graphe
+        from visualization.rendu_geojson import sauvegarder_carte
+        sauvegarder_carte(carte_graphe(table, analyse), fichier_carte)
+    return resume
@@ -0,0 +1,313 @@
+"""
+Historique des instantanés `station_status` : chaque instantané (vélos mécaniques, vélos
+électriques, bornes libres de chaque station) est ajouté à la suite de fichiers de taille fixe,
+projetés en mémoire (memmap). Les colonnes suivent l'ordre de la table des stations (StationTable).
+Les stations ouvertes après la création de l'historique sont ajoutées en fin de table : seul le
+fichier en cours est alors réécrit, plus large, et les fichiers précédents, plus étroits, sont lus
+comme si ces stations y étaient absentes.
+
+Organisation du dossier :
+    stations.npz        table des stations de référence (ordre des colonnes)
+    etat.json           nombre d'instantanés écrits (mis à jour après les données)
+    valeurs_00000.npy   (TAILLE_CHUNK, nb_stations, 3) int16, -1 si la station est absente
+    temps_00000.npy     (TAILLE_CHUNK,) int64, horodatage (secondes UNIX) de chaque instantané
+"""
+import json  # Pour manipuler les fichiers JSON
+import os  # Pour remplacer les fichiers de manière atomique
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.cache import ecrire_atomique  # Pour écrire les fichiers de manière atomique
+from data.station_table import StationTable  # Table des stations en colonnes
+
+# Version du format de l'historique (à incrémenter si son contenu change)
+VERSION_FORMAT = 1
+
+# Grandeurs enregistrées pour chaque station
+CHAMPS = ("mecaniques", "electriques", "bornes_libres")
+
+# Nombre d'instantanés par fichier (une journée à raison d'un instantané par minute)
+TAILLE_CHUNK = 1440
+
+# Dossier par défaut de l'historique
+DOSSIER_HISTORIQUE = "historique"
+
+###################################################################################################
+###################################################################################################
+
+# Vélos mécaniques et électriques disponibles dans une station du flux station_status
+def velos_station(statut):
+    """Le détail par type n'existe que dans certains flux (Vélib' : [{"mechanical": n}, {"ebike": m}]).
+    Sinon, le total (num_bikes_available en GBFS 2, num_vehicles_available en GBFS 3) est compté
+    comme vélos mécaniques.
+    """
+    types = statut.get("num_bikes_available_types")
+    if isinstance(types, list):
+        types = {cle: n for t in types for cle, n in t.items()}
+    if types:
+        return types.get("mechanical", 0), types.get("ebike", 0)
+    return statut.get("num_bikes_available", statut.get("num_vehicles_available", 0)) or 0, 0
+
+# Lire un fichier station_status sans l'aligner sur une table
+def lire_statuts(fichier_json):
+    """Retourne (horodatage, station_ids, colonnes) ; colonnes est un tableau (nb_statuts, 3) int16."""
+    with open(fichier_json, "r", encoding="utf-8") as fichier:
+        data = json.load(fichier)  # Charger le contenu du fichier JSON
+    statuts = data.get("data", {}).get("stations", [])
+
+    velos = [velos_station(s) for s in statuts]
+    colonnes = np.array([
+        [v[0] for v in velos],
+        [v[1] for v in velos],
+        [s.get("num_docks_available", 0) or 0 for s in statuts],
+    ], dtype=np.int16).reshape(3, -1).T
+
+    horodatage = data.get("last_updated") or max((s.get("last_reported", 0) for s in statuts), default=0)
+    return int(horodatage), np.array([s["station_id"] for s in statuts]), colonnes
+
+# Aligner les colonnes d'un flux station_status sur la table des stations
+def aligner_statuts(station_ids, colonnes, table):
+    """Retourne (valeurs, inconnues) : valeurs est un tableau (nb_stations, 3) int16 dans l'ordre de
+    `table`, à -1 pour les stations absentes du flux ; inconnues liste les identifiants du flux
+    absents de `table` (ignorés)."""
+    valeurs = np.full((len(table), len(CHAMPS)), -1, dtype=np.int16)
+    lignes = table.lignes(station_ids)
+    connues = lignes >= 0
+    valeurs[lignes[connues]] = colonnes[connues]
+    return valeurs, station_ids[~connues]
+
+# Lire un fichier station_status et aligner ses valeurs sur la table des stations
+def lire_station_status(fichier_json, table):
+    """Retourne (horodatage, valeurs) ; valeurs est un tableau (nb_stations, 3) int16
+    dans l'ordre de `table`, à -1 pour les stations absentes du flux.
+    """
+    horodatage, station_ids, colonnes = lire_statuts(fichier_json)
+    return horodatage, aligner_statuts(station_ids, colonnes, table)[0]
+
+###################################################################################################
+###################################################################################################
+
+class Historique:
+    """Série temporelle des instantanés station_status, en ajout seul.
+
+    L'ajout d'un instantané écrit une ligne dans le fichier courant (O(1)) ; la lecture
+    d'une plage de temps renvoie des vues sur les fichiers projetés en mémoire, sans copie
+    (sauf pour les fichiers écrits avant l'ajout de nouvelles stations).
+    """
+
+    def __init__(self, dossier, table, taille_chunk, nb_instantanes, ecriture=False):
+        self.dossier = Path(dossier)
+        self.table = table
+        self.taille_chunk = taille_chunk
+        self.nb_instantanes = nb_instantanes
+        self.ecriture = ecriture
+        self.stations_inconnues = set()  # Stations du flux ignorées (absentes de la table)
+        self._chunks = {}  # Fichiers déjà projetés en mémoire : numéro → (temps, valeurs)
+        self._temps = np.empty(0, dtype=np.int64)  # Horodatages déjà lus (capacité doublée au besoin)
+        self._nb_temps = 0
+
+    def __len__(self):
+        return self.nb_instantanes
+
+    # Créer un historique vide dont les colonnes suivent `table`
+    @classmethod
+    def creer(cls, dossier, table, taille_chunk=TAILLE_CHUNK):
+        dossier = Path(dossier)
+        dossier.mkdir(parents=True, exist_ok=True)
+        if (dossier / "etat.json").exists():
+            raise FileExistsError(f"Un historique existe déjà dans {dossier}")
+        table.sauvegarder(dossier / "stations.npz")
+        historique = cls(dossier, table, taille_chunk, 0, ecriture=True)
+        historique._ecrire_etat()
+        return historique
+
+    # Ouvrir un historique existant (en lecture seule par défaut)
+    @classmethod
+    def ouvrir(cls, dossier=DOSSIER_HISTORIQUE, ecriture=False):
+        dossier = Path(dossier)
+        with open(dossier / "etat.json", "r", encoding="utf-8") as f:
+            etat = json.load(f)
+        if etat["version"] != VERSION_FORMAT:
+            raise ValueError(f"Format d'historique obsolète : {dossier}")
+        table = StationTable.depuis_fichier(dossier / "stations.npz")
+        return cls(dossier, table, etat["taille_chunk"], etat["nb_instantanes"], ecriture)
+
+    # Ouvrir l'historique, ou le créer avec la table des stations de `fichier_json`
+    @classmethod
+    def ouvrir_ou_creer(cls, dossier=DOSSIER_HISTORIQUE, fichier_json="station_informations.json"):
+        if (Path(dossier) / "etat.json").exists():
+            return cls.ouvrir(dossier, ecriture=True)
+        return cls.creer(dossier, StationTable.charger(fichier_json))
+
+    # Relire le nombre d'instantanés et les stations (historique alimenté par un autre processus)
+    def actualiser(self):
+        with open(self.dossier / "etat.json", "r", encoding="utf-8") as f:
+            etat = json.load(f)
+        if etat["nb_stations"] != len(self.table):
+            self.table = StationTable.depuis_fichier(self.dossier / "stations.npz")
+            self._chunks.clear()  # Le fichier en cours a pu être réécrit plus large
+        self.nb_instantanes = etat["nb_instantanes"]
+
+    # Ajouter en fin de table les stations de `table` absentes de l'historique
+    def etendre(self, table):
+        """Retourne le nombre de stations ajoutées. Le fichier en cours n'est élargi qu'au prochain ajout."""
+        if not self.ecriture:
+            raise PermissionError("Historique ouvert en lecture seule")
+        nouvelles = np.flatnonzero(self.table.lignes(table.station_id) < 0)
+        if len(nouvelles) == 0:
+            return 0
+        self.table = self.table.etendre(table, nouvelles)
+        self.table.sauvegarder(self.dossier / "stations.npz")
+        self._ecrire_etat()
+        return len(nouvelles)
+
+    def _ecrire_etat(self):
+        etat = {
+            "version": VERSION_FORMAT,
+            "champs": list(CHAMPS),
+            "taille_chunk": self.taille_chunk,
+            "nb_stations": len(self.table),
+            "nb_instantanes": self.nb_instantanes,
+        }
+        contenu = json.dumps(etat).encode("utf-8")
+        ecrire_atomique(self.dossier / "etat.json", lambda f: f.write(contenu))
+
+    ###############################################################################################
+
+    # Projeter en mémoire le fichier numéro k (créé à sa taille définitive lors du premier ajout)
+    def _chunk(self, k):
+        if k not in self._chunks:
+            chemin_temps = self.dossier / f"temps_{k:05d}.npy"
+            chemin_valeurs = self.dossier / f"valeurs_{k:05d}.npy"
+            if self.ecriture and not chemin_temps.exists():
+                # Le fichier des valeurs est créé avant celui des temps, qui sert de marqueur
+                forme = (self.taille_chunk, len(self.table), len(CHAMPS))
+                np.lib.format.open_memmap(chemin_valeurs, mode="w+", dtype=np.int16, shape=forme).flush()
+                np.lib.format.open_memmap(chemin_temps, mode="w+", dtype=np.int64,
+                                          shape=(self.taille_chunk,)).flush()
+            mode = "r+" if self.ecriture else "r"
+            self._chunks[k] = (np.load(chemin_temps, mmap_mode=mode),
+                               np.load(chemin_valeurs, mmap_mode=mode))
+        return self._chunks[k]
+
+    # Réécrire le fichier de valeurs numéro k avec une colonne par station de la table
+    def _elargir(self, k):
+        ancien = self._chunk(k)[1]
+        chemin = self.dossier / f"valeurs_{k:05d}.npy"
+        temporaire = chemin.with_name(chemin.name + ".tmp")
+        forme = (self.taille_chunk, len(self.table), len(CHAMPS))
+        nouveau = np.lib.format.open_memmap(temporaire, mode="w+", dtype=np.int16, shape=forme)
+        nouveau[:, ancien.shape[1]:] = -1  # Stations ajoutées : absentes des instantanés précédents
+        nouveau[:, :ancien.shape[1]] = ancien
+        nouveau.flush()
+        del nouveau, ancien
+        self._chunks.pop(k)
+        os.replace(temporaire, chemin)  # Remplacement atomique
+        return self._chunk(k)
+
+    # Colonnes demandées d'un bloc de valeurs, complété à -1 s'il est plus étroit que la table
+    def _colonnes(self, bloc, stations):
+        if bloc.shape[1] == len(self.table):
+            return bloc[:, stations]
+        complet = np.full((bloc.shape[0], len(self.table), len(CHAMPS)), -1, dtype=np.int16)
+        complet[:, :bloc.shape[1]] = bloc
+        return complet[:, stations]
+
+    # Horodatage du dernier instantané (None si l'historique est vide)
+    def dernier_horodatage(self):
+        if self.nb_instantanes == 0:
+            return None
+        k, r = divmod(self.nb_instantanes - 1, self.taille_chunk)
+        return int(self._chunk(k)[0][r])
+
+    # Ajouter un instantané (valeurs alignées sur la table, de forme (nb_stations, 3))
+    def ajouter(self, horodatage, valeurs):
+        """Retourne False si l'instantané n'est pas plus récent que le dernier enregistré."""
+        if not self.ecriture:
+            raise PermissionError("Historique ouvert en lecture seule")
+        dernier = self.dernier_horodatage()
+        if dernier is not None and horodatage <= dernier:
+            return False  # Instantané déjà enregistré (flux inchangé)
+
+        k, r = divmod(self.nb_instantanes, self.taille_chunk)
+        temps, tableau = self._chunk(k)
+        if tableau.shape[1] < len(self.table):
+            temps, tableau = self._elargir(k)  # Stations ajoutées depuis la création du fichier
+        tableau[r] = valeurs
+        temps[r] = horodatage
+        tableau.flush()
+        temps.flush()
+        # Le compteur n'est incrémenté qu'une fois les données écrites
+        self.nb_instantanes += 1
+        self._ecrire_etat()
+        if self._nb_temps == self.nb_instantanes - 1 and self._nb_temps < len(self._temps):
+            self._temps[self._nb_temps] = horodatage  # Index des horodatages tenu à jour
+            self._nb_temps += 1
+        return True
+
+    # Ajouter l'instantané contenu dans un fichier station_status
+    def ajouter_fichier(self, fichier_json, fichier_stations=None):
+        """Si le flux contient des stations absentes de l'historique, les stations du fichier
+        station_information `fichier_stations` y sont ajoutées ; les stations toujours inconnues
+        sont ignorées et signalées."""
+        horodatage, station_ids, colonnes = lire_statuts(fichier_json)
+        valeurs, inconnues = aligner_statuts(station_ids, colonnes, self.table)
+        if len(inconnues) and fichier_stations is not None:
+            if self.etendre(StationTable.charger(fichier_stations)):
+                valeurs, inconnues = aligner_statuts(station_ids, colonnes, self.table)
+        nouvelles = set(inconnues.tolist()) - self.stations_inconnues
+        if nouvelles:
+            self.stations_inconnues |= nouvelles
+            print(f"{len(inconnues)} station(s) du flux absente(s) de la table de l'historique, ignorée(s) "
+                  f"({len(self.stations_inconnues)} au total)")
+        return self.ajouter(horodatage, valeurs)
+
+    ###############################################################################################
+
+    # Horodatages de tous les instantanés (8 octets par instantané, lus une seule fois)
+    def temps(self):
+        if self._nb_temps < self.nb_instantanes:
+            if len(self._temps) < self.nb_instantanes:
+                tampon = np.empty(max(self.nb_instantanes, 2 * len(self._temps)), dtype=np.int64)
+                tampon[:self._nb_temps] = self._temps[:self._nb_temps]
+                self._temps = tampon
+            i = self._nb_temps
+            while i < self.nb_instantanes:
+                k, r = divmod(i, self.taille_chunk)
+                n = min(self.nb_instantanes - i, self.taille_chunk - r)
+                self._temps[i:i + n] = self._chunk(k)[0][r:r + n]
+                i += n
+            self._nb_temps = self.nb_instantanes
+        return self._temps[:self.nb_instantanes]
+
+    # Parcourir une plage de temps fichier par fichier, sous forme de vues sans copie
+    def iterer(self, debut=None, fin=None, stations=slice(None)):
+        """Produit des couples (temps, valeurs) pour les instantanés tels que debut <= t < fin.
+
+        `stations` sélectionne les colonnes : une tranche (vue sans copie) ou des numéros de ligne
+        de la table (copie des seules colonnes demandées).
+        """
+        temps = self.temps()
+        i = 0 if debut is None else int(np.searchsorted(temps, debut, side="left"))
+        j = self.nb_instantanes if fin is None else int(np.searchsorted(temps, fin, side="left"))
+        while i < j:
+            k, r = divmod(i, self.taille_chunk)
+            n = min(j - i, self.taille_chunk - r)
+            t, valeurs = self._chunk(k)
+            yield t[r:r + n], self._colonnes(valeurs[r:r + n], stations)
+            i += n
+
+    # Instantanés d'une plage de temps (vue sans copie si la plage tient dans un seul fichier)
+    def tranche(self, debut=None, fin=None, stations=slice(None)):
+        morceaux = list(self.iterer(debut, fin, stations))
+        if not morceaux:
+            vide = np.empty((0, len(self.table), len(CHAMPS)), dtype=np.int16)
+            return np.empty(0, dtype=np.int64), vide[:, stations]
+        if len(morceaux) == 1:
+            return morceaux[0]
+        return (np.concatenate([t for t, _ in morceaux]),
+                np.concatenate([v for _, v in morceaux]))
+
+    # Série temporelle d'une station donnée par son identifiant
+    def serie(self, station_id, debut=None, fin=None):
+        return self.tranche(debut, fin, self.table.ligne(station_id))
@@ -0,0 +1,106 @@
+"""
+Index spatial des stations (arbre k-d sur les coordonnées cartésiennes en mètres) : stations les plus
+proches et stations situées dans un rayon donné, pour des milliers de points en un seul appel.
+L'index est sauvegardé dans le cache, à côté de la triangulation, et indexé par la même empreinte.
+"""
+import pickle  # Pour sauvegarder l'arbre k-d sans avoir à le reconstruire
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.cache import DOSSIER_CACHE, chemin_artefact, ecrire_atomique, elaguer_artefacts, empreinte_fichier
+from data.geo import arc, cartesiennes, corde
+from data.station_table import StationTable
+
+# Version du format de l'artefact (à incrémenter si son contenu change)
+VERSION_FORMAT = 1
+
+###################################################################################################
+###################################################################################################
+
+class IndexSpatial:
+    """Arbre k-d des stations en coordonnées cartésiennes (x, y, z) en mètres.
+
+    La distance en ligne droite (corde) classe les voisins dans le même ordre que la distance
+    haversine, qui est retrouvée exactement à partir de la corde. Les résultats sont des numéros
+    de ligne de la table des stations (StationTable) et des distances en mètres.
+    Les requêtes acceptent des nombres ou des tableaux de coordonnées.
+    """
+
+    def __init__(self, arbre):
+        self.arbre = arbre
+
+    def __len__(self):
+        return self.arbre.n
+
+    # Construire l'index à partir des coordonnées (latitude, longitude) des stations
+    @classmethod
+    def depuis_coordonnees(cls, lat, lon):
+        from scipy.spatial import cKDTree
+
+        return cls(cKDTree(cartesiennes(lat, lon)))
+
+    # Sauvegarder l'index (l'arbre est conservé tel quel, sans reconstruction au chargement)
+    def sauvegarder(self, chemin):
+        etat = {"version": VERSION_FORMAT, "arbre": self.arbre}
+        ecrire_atomique(chemin, lambda fichier: pickle.dump(etat, fichier, protocol=pickle.HIGHEST_PROTOCOL))
+
+    # Recharger un index sauvegardé
+    @classmethod
+    def depuis_fichier(cls, chemin):
+        with open(chemin, "rb") as fichier:
+            etat = pickle.load(fichier)
+        if etat.get("version") != VERSION_FORMAT:
+            raise ValueError(f"Format d'artefact obsolète : {chemin}")
+        return cls(etat["arbre"])
+
+    ###############################################################################################
+
+    # Convertir des points de requête dans le repère de l'index
+    def convertir(self, lat, lon):
+        return cartesiennes(np.atleast_1d(lat), np.atleast_1d(lon))
+
+    # k stations les plus proches de chaque point
+    def plus_proches(self, lat, lon, k=1, distance_max=np.inf, workers=-1):
+        """Retourne (distances, lignes) de forme (n, k) ; (n,) si k == 1.
+
+        Les voisins manquants (plus loin que `distance_max`) ont une distance infinie et la ligne -1.
+        """
+        cordes, lignes = self.arbre.query(self.convertir(lat, lon), k=k,
+                                          distance_upper_bound=corde(distance_max), workers=workers)
+        manquants = np.isinf(cordes)
+        return np.where(manquants, np.inf, arc(cordes)), np.where(manquants, -1, lignes)
+
+    # Stations situées à moins de `rayon` mètres de chaque point, au format CSR
+    def dans_rayon(self, lat, lon, rayon, workers=-1):
+        """Retourne (indptr, lignes) : les stations proches du point i sont
+        lignes[indptr[i]:indptr[i + 1]], triées par numéro de ligne.
+        """
+        resultats = self.arbre.query_ball_point(self.convertir(lat, lon), r=corde(rayon),
+                                                workers=workers, return_sorted=True)
+        longueurs = np.fromiter((len(r) for r in resultats), dtype=np.int64, count=len(resultats))
+        indptr = np.concatenate(([0], np.cumsum(longueurs)))
+        lignes = np.fromiter((j for r in resultats for j in r), dtype=np.int64, count=indptr[-1])
+        return indptr, lignes
+
+    # Nombre de stations situées à moins de `rayon` mètres de chaque point
+    def compter_dans_rayon(self, lat, lon, rayon, workers=-1):
+        return self.arbre.query_ball_point(self.convertir(lat, lon), r=corde(rayon),
+                                           workers=workers, return_length=True)
+
+###################################################################################################
+###################################################################################################
+
+# Charger l'index spatial des stations (depuis le cache si le fichier n'a pas changé)
+def charger_index_spatial(fichier_json="station_informations.json", dossier_cache=DOSSIER_CACHE):
+    chemin = chemin_artefact("index_spatial", empreinte_fichier(fichier_json), dossier_cache, extension=".pkl")
+    if chemin.exists():
+        try:
+            return IndexSpatial.depuis_fichier(chemin)
+        except (OSError, KeyError, ValueError, pickle.UnpicklingError) as e:
+            # Artefact illisible ou obsolète : on le reconstruit
+            print(f"Artefact de l'index spatial ignoré ({e}), reconstruction en cours...")
+
+    table = StationTable.charger(fichier_json, dossier_cache)
+    index = IndexSpatial.depuis_coordonnees(table.lat, table.lon)
+    index.sauvegarder(chemin)
+    elaguer_artefacts(chemin)
+    return index
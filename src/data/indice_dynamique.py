@@ -0,0 +1,209 @@
+"""
+Indice de répartition dynamique, calculé sur l'historique des instantanés station_status
+(data/historique.py) : le terme de connectivité de l'indice statique (nombre de voisins de Delaunay)
+est combiné à l'occupation réelle des stations sur une fenêtre de temps (part du temps où la station
+est vide, part du temps où elle est pleine, nombre moyen de bornes libres).
+
+Les statistiques sont accumulées par heure de la journée en un seul passage sur l'historique, par
+blocs d'instantanés (temps × stations) traités de manière vectorisée : la mémoire utilisée reste
+bornée quelle que soit la durée de l'historique.
+"""
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from profilage import compter, mesure  # Mesure des étapes (option --profile)
+
+# Mémoire par défaut des tableaux intermédiaires d'un bloc d'instantanés (en Mo)
+MEMOIRE_BLOC_MO = 64
+
+# Octets de tableaux intermédiaires par cellule (instantané, station) d'un bloc
+OCTETS_CELLULE = 40
+
+###################################################################################################
+###################################################################################################
+
+# Heure locale (0 à 23) de chaque horodatage UNIX
+def heures_locales(temps, fuseau=None):
+    """Sans fuseau, l'heure UTC est utilisée. Le décalage du fuseau n'est calculé qu'une fois par
+    heure distincte (changements d'heure compris), jamais pour chaque horodatage."""
+    temps = np.asarray(temps, dtype=np.int64)
+    if not fuseau:
+        return (temps // 3600) % 24
+    from datetime import datetime  # Pour le décalage horaire du fuseau
+    from zoneinfo import ZoneInfo  # Fuseaux horaires (bibliothèque standard)
+
+    zone = ZoneInfo(fuseau)
+    heures, inverse = np.unique(temps // 3600, return_inverse=True)
+    decalages = np.array([datetime.fromtimestamp(h * 3600, zone).utcoffset().total_seconds()
+                          for h in heures.tolist()], dtype=np.int64)
+    return ((temps + decalages[inverse.reshape(-1)]) // 3600) % 24
+
+# Statistiques d'occupation de chaque station, par heure de la journée
+@mesure("occupation", lambda stats: {"instantanes": stats["nb_instantanes"],
+                                     "cellules": stats["nb_instantanes"] * stats["presents"].shape[1]})
+def statistiques_occupation(historique, debut=None, fin=None, fuseau=None, memoire_mo=MEMOIRE_BLOC_MO):
+    """Parcourt les instantanés tels que debut <= t < fin par blocs d'au plus `memoire_mo` Mo.
+
+    Retourne un dictionnaire de tableaux (24, nb_stations) : presents (instantanés où la station
+    figure dans le flux), vides, pleines (instantanés où elle n'a aucun vélo, aucune borne libre)
+    et somme_bornes (bornes libres cumulées), ainsi que nb_instantanes et instantanes_heure (24,).
+    """
+    n = len(historique.table)
+    presents, vides, pleines = (np.zeros((24, n), dtype=np.int64) for _ in range(3))
+    somme_bornes = np.zeros((24, n), dtype=np.float64)
+    instantanes_heure = np.zeros(24, dtype=np.int64)
+    lignes_bloc = max(1, int(memoire_mo * 1024 ** 2 // (OCTETS_CELLULE * max(n, 1))))
+
+    for temps, valeurs in historique.iterer(debut, fin):
+        for i in range(0, len(temps), lignes_bloc):
+            t, v = temps[i:i + lignes_bloc], valeurs[i:i + lignes_bloc]  # Vues sur les fichiers projetés
+            heures = heures_locales(t, fuseau)
+            present = v[..., 0] >= 0
+            velos = v[..., 0].astype(np.int32) + v[..., 1]
+            bornes = np.where(present, v[..., 2], 0)
+
+            # Les instantanés étant triés, chaque heure forme des plages contiguës : une somme par plage
+            plages = np.flatnonzero(np.r_[True, heures[1:] != heures[:-1]])
+            heures_plages = heures[plages]
+            for cumul, cellules in ((presents, present), (vides, present & (velos == 0)),
+                                    (pleines, present & (bornes == 0)), (somme_bornes, bornes)):
+                np.add.at(cumul, heures_plages, np.add.reduceat(cellules, plages, axis=0, dtype=cumul.dtype))
+            np.add.at(instantanes_heure, heures, 1)
+
+    return {
+        "presents": presents,
+        "vides": vides,
+        "pleines": pleines,
+        "somme_bornes": somme_bornes,
+        "instantanes_heure": instantanes_heure,
+        "nb_instantanes": int(instantanes_heure.sum()),
+    }
+
+# Parts du temps vide et pleine, et bornes libres moyennes (NaN sans aucun instantané)
+def taux_occupation(presents, vides, pleines, somme_bornes):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return vides / presents, pleines / presents, somme_bornes / presents
+
+###################################################################################################
+###################################################################################################
+
+# Indice de répartition dynamique (d'une station ou de tableaux de stations)
+def indice_dynamique(Nv, part_vide, part_pleine, bornes_moyennes, C_med, alpha=0.5, voisins_cible=6):
+    """Combine le terme de connectivité de l'indice statique, alpha × (Nv - voisins_cible) / voisins_cible,
+    et un terme d'occupation, (1 - alpha) × ((part_vide + part_pleine) + manque de bornes) / 2, où le
+    manque de bornes est max(C_med - bornes_moyennes, 0) / C_med. Tous les arguments sont diffusés
+    (par exemple Nv de forme (nb_stations,) et les taux de forme (24, nb_stations)).
+
+    Contrairement à l'indice statique, l'indice n'est pas annulé pour les stations qui ont le nombre
+    de voisins idéal : leur occupation reste prise en compte.
+    """
+    Nv = np.asarray(Nv, dtype=np.float64)
+    bornes_moyennes = np.asarray(bornes_moyennes, dtype=np.float64)
+    connectivite = (Nv - voisins_cible) / voisins_cible
+    if C_med > 0:
+        manque_bornes = np.maximum(C_med - bornes_moyennes, 0) / C_med
+    else:
+        manque_bornes = np.zeros_like(bornes_moyennes)
+    occupation = (np.asarray(part_vide) + np.asarray(part_pleine) + manque_bornes) / 2
+    return (alpha * connectivite + (1 - alpha) * occupation)[()]
+
+# Nombre de voisins de Delaunay des stations de l'historique
+def degres_stations(table):
+    from scipy.spatial import Delaunay  # Import coûteux, seulement si nécessaire
+
+    if len(table) < 3:
+        return np.zeros(len(table), dtype=np.int64)
+    indptr, _ = Delaunay(table.coordonnees).vertex_neighbor_vertices
+    return np.diff(indptr)
+
+###################################################################################################
+###################################################################################################
+
+# Calculer l'indice dynamique sur une fenêtre de l'historique et l'écrire par station et par heure
+@mesure("indice_dynamique")
+def generer_indice_dynamique(dossier_historique="historique", output_dir="results/analysis", jours=None,
+                             alpha=0.5, voisins_cible=6, fuseau="Europe/Paris", memoire_mo=MEMOIRE_BLOC_MO):
+    """La fenêtre couvre les `jours` derniers jours de l'historique (tout l'historique par défaut).
+    Écrit dans `output_dir` :
+        indice_dynamique.csv           une ligne par station (statistiques sur toute la fenêtre)
+        indice_dynamique_horaire.csv   une ligne par station, une colonne d'indice par heure
+        indice_dynamique_heures.csv    une ligne par heure de la journée (moyennes sur les stations)
+        indice_dynamique.npz           tableaux (24, nb_stations) des statistiques et de l'indice
+    Retourne le résumé par heure (None si la fenêtre ne contient aucun instantané).
+    """
+    import csv  # Pour écrire les tableaux
+    import warnings  # Pour ignorer les moyennes des heures sans instantané
+    from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+    from data.historique import Historique
+    from data.indice_repartition import indice_repartition
+    from profilage import compter_fichier
+
+    historique = Historique.ouvrir(dossier_historique)
+    table = historique.table
+    debut = None
+    if jours is not None and len(historique):
+        debut = historique.dernier_horodatage() - int(jours * 86400) + 1
+    stats = statistiques_occupation(historique, debut, None, fuseau, memoire_mo)
+    if stats["nb_instantanes"] == 0:
+        print("Aucun instantané dans la fenêtre demandée.")
+        return None
+
+    degres = degres_stations(table)
+    C_med = float(np.median(table.capacity)) if len(table) else 0.0
+    # Par heure (24, n) et sur toute la fenêtre (n,)
+    par_heure = taux_occupation(stats["presents"], stats["vides"], stats["pleines"], stats["somme_bornes"])
+    total = taux_occupation(*(stats[cle].sum(axis=0) for cle in ("presents", "vides", "pleines", "somme_bornes")))
+    indices_heure = indice_dynamique(degres, *par_heure, C_med, alpha, voisins_cible)
+    indices_total = indice_dynamique(degres, *total, C_med, alpha, voisins_cible)
+    indices_statiques = indice_repartition(degres, table.capacity, C_med, alpha, voisins_cible)
+    compter(stations=len(table))
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / "indice_dynamique.npz", "wb") as f:
+        np.savez_compressed(
+            f, station_id=table.station_id, voisins=degres, indice=indices_heure.astype(np.float32),
+            part_vide=par_heure[0].astype(np.float32), part_pleine=par_heure[1].astype(np.float32),
+            bornes_moyennes=par_heure[2].astype(np.float32), instantanes=stats["presents"].astype(np.int32),
+            alpha=alpha, voisins_cible=voisins_cible,
+        )
+    compter_fichier(output_dir / "indice_dynamique.npz")
+
+    with open(output_dir / "indice_dynamique.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["station_id", "nom", "voisins", "instantanes", "part_vide", "part_pleine",
+                         "bornes_moyennes", "indice_statique", "indice_dynamique"])
+        writer.writerows(zip(
+            table.station_id.tolist(), table.liste_noms(), degres.tolist(), stats["presents"].sum(axis=0).tolist(),
+            *(np.round(x, 4).tolist() for x in (*total, np.atleast_1d(indices_statiques), indices_total)),
+        ))
+    compter_fichier(output_dir / "indice_dynamique.csv")
+
+    with open(output_dir / "indice_dynamique_horaire.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["station_id"] + [f"h{h:02d}" for h in range(24)])
+        writer.writerows([s] + ligne for s, ligne in zip(table.station_id.tolist(),
+                                                          np.round(indices_heure.T, 4).tolist()))
+    compter_fichier(output_dir / "indice_dynamique_horaire.csv")
+
+    # Moyennes sur les stations, pour chaque heure de la journée (NaN : heure sans instantané)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Moyenne d'une heure vide
+        moyennes = [np.nanmean(x, axis=1) for x in (*par_heure, indices_heure)]
+    heures = [
+        {
+            "heure": h,
+            "instantanes": int(stats["instantanes_heure"][h]),
+            "part_vide": round(float(moyennes[0][h]), 4),
+            "part_pleine": round(float(moyennes[1][h]), 4),
+            "bornes_moyennes": round(float(moyennes[2][h]), 2),
+            "indice_moyen": round(float(moyennes[3][h]), 4),
+        }
+        for h in range(24)
+    ]
+    with open(output_dir / "indice_dynamique_heures.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(heures[0]))
+        writer.writeheader()
+        writer.writerows(heures)
+    compter_fichier(output_dir / "indice_dynamique_heures.csv")
+    return heures
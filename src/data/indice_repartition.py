@@ -1,139 +1,288 @@
 # Importation des bibliothèques nécessaires
+import csv  # Pour écrire le tableau des indices
 import json  # Pour manipuler les fichiers JSON
-import folium  # Pour créer des cartes interactives
-from folium.plugins import MarkerCluster  # Pour regrouper les marqueurs sur la carte
-from scipy.spatial import Delaunay  # Pour effectuer la triangulation de Delaunay
+import sys  # Pour modifier le chemin des imports
+from pathlib import Path  # Pour manipuler les chemins de fichiers
 import numpy as np  # Pour manipuler des tableaux numériques
 
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data.cellules_voronoi import charger_cellules  # Cellules de Voronoi bornées, mises en cache
+from data.liste_adjacence import DOSSIER_CSR, charger_csr  # Liste d'adjacence au format CSR
+from data.station_table import StationTable  # Table des stations en colonnes
+from data.triangulation import charger_triangulation  # Triangulation de Delaunay mise en cache
+from profilage import compter_fichier, mesure  # Mesure des étapes (option --profile)
+
 ###################################################################################################
 ###################################################################################################
 
-# Charger les données des stations depuis un fichier JSON
+# Charger la table des stations depuis un fichier JSON (ou depuis le cache)
 def charger_donnees(fichier_json):
     try:
-        with open(fichier_json, "r", encoding="utf-8") as file:
-            data = json.load(file)  # Charger le contenu du fichier JSON
-        return data.get("data", {}).get("stations", [])  # Retourner la liste des stations
+        return StationTable.charger(fichier_json)  # Retourner la table des stations
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Erreur lors de la lecture du fichier JSON : {e}")  # Gérer les erreurs
-        return []
+        return StationTable.vide()
     
 ###################################################################################################
 ###################################################################################################
 
-# Charger la liste d'adjacence depuis un fichier JSON
-def charger_liste_adjacence(fichier):
+# Charger le nombre de voisins de chaque station depuis la liste d'adjacence CSR
+def charger_degres(table, dossier):
+    """Retourne le nombre de voisins de chaque station de `table` (None si la liste est absente)."""
     try:
-        with open(fichier, 'r', encoding="utf-8") as f:
-            return json.load(f)  # Charger le contenu du fichier JSON
-    except (FileNotFoundError, json.JSONDecodeError) as e:
+        ids, indptr, _ = charger_csr(dossier)  # Fichiers projetés en mémoire, sans analyse JSON
+    except (FileNotFoundError, ValueError) as e:
         print(f"Erreur lors du chargement de la liste d'adjacence : {e}")  # Gérer les erreurs
-        return {}
+        return None
+    # Le nombre de voisins se lit directement dans les écarts de indptr
+    degres = np.diff(indptr)
+    if ids.shape == table.station_id.shape and np.array_equal(ids, table.station_id):
+        return degres  # Même ordre que le fichier des stations : lecture directe
+    # Sinon, réaligner par identifiant (une station absente de la liste n'a aucun voisin)
+    lignes = table.lignes(ids)
+    alignes = np.zeros(len(table), dtype=degres.dtype)
+    alignes[lignes[lignes >= 0]] = degres[lignes >= 0]
+    return alignes
 
 ###################################################################################################
 ###################################################################################################
 
-# Fonction pour calculer l'indice de répartition
-def indice_repartition(Nv, C, C_med, alpha=0.5):
-    # Si le nombre de voisins est égal à 6, l'indice est 0
-    if Nv == 6:
-        Ir = 0
-    else:
-        # Normalisation du nombre de voisins
-        Nv_norm = (Nv - 6) / 6
-        # Normalisation de la capacité restante
-        C_norm = max(C_med - C, 0) / C_med if C_med > 0 else 0
-        # Calcul de l'indice en combinant les deux critères
-        Ir = alpha * Nv_norm + (1 - alpha) * C_norm
-    return Ir  # Retourner l'indice
+# Fonction pour calculer l'indice de répartition (d'une station ou de toutes les stations à la fois)
+def indice_repartition(Nv, C, C_med, alpha=0.5, voisins_cible=6):
+    """Calcule l'indice de répartition ; `Nv`, `C`, `alpha` et `voisins_cible` peuvent être des
+    nombres ou des tableaux NumPy (diffusés les uns sur les autres)."""
+    Nv = np.asarray(Nv, dtype=np.float64)
+    C = np.asarray(C, dtype=np.float64)
+    alpha = np.asarray(alpha, dtype=np.float64)
+    voisins_cible = np.asarray(voisins_cible, dtype=np.float64)
+    # Normalisation du nombre de voisins par rapport au nombre de voisins idéal
+    Nv_norm = (Nv - voisins_cible) / voisins_cible
+    # Normalisation de la capacité restante
+    C_norm = np.maximum(C_med - C, 0) / C_med if C_med > 0 else np.zeros_like(C)
+    # Calcul de l'indice en combinant les deux critères
+    Ir = alpha * Nv_norm + (1 - alpha) * C_norm
+    # Si le nombre de voisins est égal au nombre idéal, l'indice est 0
+    Ir = np.where(Nv == voisins_cible, 0.0, Ir)
+    return Ir[()]  # Retourner l'indice (un nombre si les entrées sont des nombres)
+
+# Calculer les indices de répartition de toutes les stations
+@mesure("indices", lambda indices: {"stations": np.size(indices)})
+def calculer_indices(table, degres, alpha=0.5, voisins_cible=6):
+    # Calculer la médiane des capacités des stations
+    C_med = np.median(table.capacity) if len(table) else 0  # Éviter une erreur si la table est vide
+    return indice_repartition(degres, table.capacity, C_med, alpha, voisins_cible)
+
+# Calculer les indices de toutes les stations pour une grille de paramètres, en une seule opération
+@mesure("balayage", lambda cube: {"stations": cube.shape[-1], "combinaisons": cube.shape[0] * cube.shape[1]})
+def balayer_parametres(table, degres, alphas, voisins_cibles):
+    """Retourne un cube float32 (len(alphas), len(voisins_cibles), nb_stations) : l'élément [a, v, i]
+    est l'indice de la station i pour alphas[a] et voisins_cibles[v]."""
+    C_med = np.median(table.capacity) if len(table) else 0
+    alphas = np.asarray(alphas, dtype=np.float64)[:, None, None]
+    voisins_cibles = np.asarray(voisins_cibles, dtype=np.float64)[None, :, None]
+    return indice_repartition(degres, table.capacity, C_med, alphas, voisins_cibles).astype(np.float32)
+
+# Statistiques de chaque combinaison de paramètres du cube (réductions sur l'axe des stations)
+def resumer_balayage(cube, alphas, voisins_cibles, seuil=0.0):
+    """Retourne une ligne par couple (alpha, voisins_cible) : part et nombre de stations dont
+    l'indice est inférieur à `seuil`, moyenne, médiane et quantiles 10 % et 90 % des indices."""
+    sous_seuil = (cube < seuil).sum(axis=-1)
+    moyennes = cube.mean(axis=-1, dtype=np.float64)
+    quantiles = np.quantile(cube, [0.1, 0.5, 0.9], axis=-1)
+    nb_stations = max(cube.shape[-1], 1)
+    return [
+        {
+            "alpha": float(alpha),
+            "voisins_cible": float(cible),
+            "part_sous_seuil": round(float(sous_seuil[a, v] / nb_stations), 4),
+            "nb_sous_seuil": int(sous_seuil[a, v]),
+            "indice_moyen": round(float(moyennes[a, v]), 4),
+            "indice_median": round(float(quantiles[1, a, v]), 4),
+            "indice_q10": round(float(quantiles[0, a, v]), 4),
+            "indice_q90": round(float(quantiles[2, a, v]), 4),
+        }
+        for a, alpha in enumerate(np.asarray(alphas).tolist())
+        for v, cible in enumerate(np.asarray(voisins_cibles).tolist())
+    ]
+
+# Densité de stations (stations par km²) déduite de l'aire de la cellule de Voronoi de chaque station
+def calculer_densites(aires):
+    """Retourne 1 / aire en stations par km² (NaN pour une cellule vide) ; `aires` est en m²."""
+    aires = np.asarray(aires, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        return np.where(aires > 0, 1e6 / aires, np.nan)
+
+###################################################################################################
+###################################################################################################
+
+# Analyser la répartition des stations : indices, densités et résumé écrits dans `output_dir`
+@mesure("analyse_repartition")
+def analyze_distribution(fichier_json="station_informations.json", dossier_csr=DOSSIER_CSR,
+                         output_dir="results/analysis", alpha=0.5):
+    """Écrit `indices_repartition.csv` (une ligne par station) et `resume.json` dans `output_dir`.
+
+    La liste d'adjacence doit avoir été générée au préalable (voir `generate_adjacency_list`).
+    Retourne le résumé (None s'il n'y a pas assez de stations ou pas de liste d'adjacence).
+    """
+    table = charger_donnees(fichier_json)
+    if len(table) < 3:
+        print("Pas assez de stations pour analyser la répartition.")
+        return None
+    degres = charger_degres(table, dossier_csr)
+    if degres is None:
+        return None
+
+    indices = calculer_indices(table, degres, alpha)
+    aires = charger_cellules(fichier_json).aires
+    densites = calculer_densites(aires)
+
+    # Tableau détaillé, une ligne par station
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / "indices_repartition.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["station_id", "nom", "capacite", "voisins", "indice", "aire_km2", "densite_km2"])
+        writer.writerows(zip(
+            table.station_id.tolist(), table.liste_noms(), table.capacity.tolist(), degres.tolist(),
+            np.round(indices, 4).tolist(), np.round(aires / 1e6, 4).tolist(), np.round(densites, 2).tolist(),
+        ))
+    compter_fichier(output_dir / "indices_repartition.csv")
+
+    # Résumé de la répartition
+    resume = {
+        "nb_stations": len(table),
+        "alpha": alpha,
+        "capacite_mediane": float(np.median(table.capacity)),
+        "voisins_moyen": float(np.mean(degres)),
+        "indice_moyen": float(np.mean(indices)),
+        "indices_negatifs": int(np.sum(indices < 0)),
+        "indices_nuls": int(np.sum(indices == 0)),
+        "indices_positifs": int(np.sum(indices > 0)),
+        "densite_mediane_km2": float(np.nanmedian(densites)),
+    }
+    with open(output_dir / "resume.json", "w", encoding="utf-8") as f:
+        json.dump(resume, f, indent=4, ensure_ascii=False)
+    compter_fichier(output_dir / "resume.json")
+    return resume
+
+# Balayer une grille de paramètres de l'indice et écrire le cube des indices et ses statistiques
+@mesure("analyse_balayage")
+def generer_balayage(fichier_json="station_informations.json", output_dir="results/analysis",
+                     alphas=None, voisins_cibles=(4, 5, 6, 7, 8), seuil=0.0):
+    """Écrit `balayage.npz` (cube des indices, paramètres et identifiants des stations) et
+    `balayage.csv` (une ligne par combinaison de paramètres) dans `output_dir`, sans aucune carte.
+
+    Le nombre de voisins est lu dans la triangulation (mise en cache) : la liste d'adjacence n'a pas
+    besoin d'avoir été générée. `alphas` vaut par défaut 0, 0.1, ..., 1. Retourne les lignes du résumé
+    (None s'il y a moins de 3 stations).
+    """
+    from data.liste_adjacence import construire_adjacence
+
+    table = charger_donnees(fichier_json)
+    if len(table) < 3:
+        print("Pas assez de stations pour analyser la répartition.")
+        return None
+    indptr, _ = construire_adjacence(charger_triangulation(fichier_json))
+    if alphas is None:
+        alphas = np.linspace(0, 1, 11)
+    alphas, voisins_cibles = np.asarray(alphas, dtype=np.float64), np.asarray(voisins_cibles, dtype=np.float64)
+    cube = balayer_parametres(table, np.diff(indptr), alphas, voisins_cibles)
+    lignes = resumer_balayage(cube, alphas, voisins_cibles, seuil)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / "balayage.npz", "wb") as f:
+        np.savez_compressed(f, indices=cube, alphas=alphas, voisins_cibles=voisins_cibles,
+                            station_id=table.station_id, seuil=seuil)
+    compter_fichier(output_dir / "balayage.npz")
+    with open(output_dir / "balayage.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(lignes[0]))
+        writer.writeheader()
+        writer.writerows(lignes)
+    compter_fichier(output_dir / "balayage.csv")
+    return lignes
 
 ###################################################################################################
 ###################################################################################################
 
-# Charger les données des stations
-stations_data = charger_donnees("station_informations.json")
-# Charger la liste d'adjacence
-adjacence_data = charger_liste_adjacence("liste_adjacence.json")
-
-# Vérifier qu'il y a suffisamment de stations pour la triangulation
-if len(stations_data) < 3:
-    print("Pas assez de stations pour effectuer la triangulation de Delaunay.")
-else:
-    # Extraire les coordonnées des stations valides
-    points = np.array([
-        [station["lat"], station["lon"]]
-        for station in stations_data if "lat" in station and "lon" in station
-    ])
-
-    # Vérifier qu'il y a suffisamment de points valides
-    if len(points) < 3:
-        print("Pas assez de points valides pour la triangulation.")
+# Fonction pour déterminer la couleur en fonction de l'indice
+def get_color(indice_rep):
+    indice_rep = max(-1, min(indice_rep, 1))  # Normaliser entre -1 et 1
+
+    if indice_rep < 0:
+        r = 255  # Rouge au maximum
+        g = int(50 * (1 + indice_rep))  # Vert faible pour les indices négatifs
     else:
-        # Effectuer la triangulation de Delaunay
-        tri = Delaunay(points)
-
-        # Créer une carte centrée sur Paris
-        m = folium.Map(location=[48.8566, 2.3522], zoom_start=12)
-
-        # Ajouter les triangles de Delaunay à la carte
-        for simplex in tri.simplices:
-            triangle = [points[i].tolist() for i in simplex]  # Convertir les points en liste
-            folium.Polygon(
-                locations=triangle,  # Ajouter les sommets du triangle
-                color='black',  # Couleur des bords
-                weight=1,  # Épaisseur des bords
-                fill=True,  # Remplir le triangle
-                fill_color='grey',  # Couleur de remplissage
-                fill_opacity=0.25  # Opacité du remplissage
-            ).add_to(m)
-
-        # Calculer les indices de répartition pour chaque station
-        indices = {}
-        # Calculer la médiane des capacités des stations
-        capacites = [station.get('capacity', 0) for station in stations_data]
-        C_med = np.median(capacites) if capacites else 0  # Éviter une erreur si la liste est vide
-
-        for station in stations_data:
-            station_id = str(station["station_id"])  # Identifier la station
-            Nv = len(adjacence_data.get(station_id, [])) if adjacence_data else 0  # Nombre de voisins
-            C = station.get('capacity', 0)  # Capacité de la station
-            indices[station_id] = indice_repartition(Nv, C, C_med)  # Calculer l'indice
-
-        # Fonction pour déterminer la couleur en fonction de l'indice
-        def get_color(indice_rep):
-            indice_rep = max(-1, min(indice_rep, 1))  # Normaliser entre -1 et 1
-
-            if indice_rep < 0:
-                r = 255  # Rouge au maximum
-                g = int(50 * (1 + indice_rep))  # Vert faible pour les indices négatifs
-            else:
-                r = int(255 * (0.8 - indice_rep))  # Rouge diminue pour les indices positifs
-                g = 255  # Vert au maximum pour les indices positifs
-
-            return f"#{r:02x}{g:02x}00"  # Retourner la couleur en format hexadécimal
-
-        # Ajouter les marqueurs des stations sur la carte
-        for station in stations_data:
-            if "lat" in station and "lon" in station:
-                station_id = str(station["station_id"])  # Identifier la station
-                indice_rep = indices.get(station_id, 0)  # Récupérer l'indice de répartition
-
-                color = get_color(indice_rep)  # Déterminer la couleur du marqueur
-
-                folium.CircleMarker(
-                    location=[station['lat'], station['lon']],  # Position du marqueur
-                    radius=max(station.get('capacity', 0) // 6, 4),  # Taille du marqueur
-                    color=color,  # Couleur du contour
-                    weight=5,  # Épaisseur du contour
-                    fill=True,  # Remplir le marqueur
-                    fill_color=color,  # Couleur de remplissage
-                    fill_opacity=0.9,  # Opacité du remplissage
-                    tooltip=(  # Ajouter une info-bulle
-                        f"{station.get('name', 'Inconnu')}<br>"
-                        f"Capacité: {station.get('capacity', 0)}<br>"
-                        f"Indice de répartition: {indice_rep:.3f}"
-                    )
-                ).add_to(m)
-
-        # Sauvegarder la carte dans un fichier HTML
-        m.save('velib_stations_map.html')
\ No newline at end of file
+        r = int(255 * (0.8 - indice_rep))  # Rouge diminue pour les indices positifs
+        g = 255  # Vert au maximum pour les indices positifs
+
+    return f"#{r:02x}{g:02x}00"  # Retourner la couleur en format hexadécimal
+
+###################################################################################################
+###################################################################################################
+
+# Construire la carte des indices de répartition à partir des tableaux déjà chargés
+@mesure("carte_indices")
+def carte_indices(table, points, simplices, indices):
+    from visualization.rendu_geojson import carte_centree, couche_stations, couche_triangles  # Couches GeoJSON
+
+    # Créer une carte centrée sur les stations
+    m = carte_centree(table.lat, table.lon, zoom_start=12)
+
+    # Ajouter les triangles de Delaunay à la carte (une seule couche GeoJSON)
+    couche_triangles(points, simplices, style={
+        "color": "black",  # Couleur des bords
+        "weight": 1,  # Épaisseur des bords
+        "fillColor": "grey",  # Couleur de remplissage
+        "fillOpacity": 0.25,  # Opacité du remplissage
+    }).add_to(m)
+
+    # Ajouter les marqueurs des stations sur la carte (une seule couche GeoJSON)
+    indices = np.asarray(indices).tolist()
+    infos = [  # Info-bulles
+        f"{nom}<br>"
+        f"Capacité: {capacite}<br>"
+        f"Indice de répartition: {indice_rep:.3f}"
+        for nom, capacite, indice_rep in zip(table.liste_noms(), table.capacity.tolist(), indices)
+    ]
+    couche_stations(
+        table.lat, table.lon,
+        couleurs=[get_color(indice_rep) for indice_rep in indices],  # Couleur selon l'indice
+        rayons=np.maximum(table.capacity // 6, 4),  # Taille du marqueur
+        infos=infos,
+        style={"weight": 5, "fill": True, "fill_opacity": 0.9},  # Épaisseur du contour et opacité
+    ).add_to(m)
+    return m
+
+# Générer la carte des indices de répartition
+def generer_carte_indices(fichier_json="station_informations.json", dossier_csr="liste_adjacence_csr",
+                          fichier_carte="velib_indices_map.html"):
+    # Charger les données des stations
+    table = charger_donnees(fichier_json)
+
+    # Vérifier qu'il y a suffisamment de stations pour la triangulation
+    if len(table) < 3:
+        print("Pas assez de stations pour effectuer la triangulation de Delaunay.")
+        return None
+
+    # Charger la triangulation de Delaunay (calculée une seule fois puis mise en cache)
+    tri = charger_triangulation(fichier_json)
+
+    # Calculer les indices de répartition de toutes les stations en un seul appel
+    degres = charger_degres(table, dossier_csr)
+    if degres is None:
+        degres = np.zeros(len(table))  # Sans liste d'adjacence, aucune station n'a de voisin
+    indices = calculer_indices(table, degres)
+
+    # Construire puis sauvegarder la carte dans un fichier HTML
+    from visualization.rendu_geojson import sauvegarder_carte
+    m = carte_indices(table, tri.points, tri.simplices, indices)
+    sauvegarder_carte(m, fichier_carte)
+    return m
+
+
+# Code principal
+if __name__ == "__main__":
+    generer_carte_indices()
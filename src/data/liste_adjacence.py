@@ -1,53 +1,136 @@
+import argparse  # Pour lire les options de la ligne de commande
 import json  # Pour manipuler les fichiers JSON
-import numpy as np  # Pour manipuler des tableaux numériques
-from scipy.spatial import Delaunay  # Pour effectuer la triangulation de Delaunay
 import sys  # Pour configurer l'encodage de sortie
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+import numpy as np  # Pour manipuler des tableaux numériques
+
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data.cache import ecrire_atomique  # Pour écrire les fichiers de manière atomique
+from data.station_table import StationTable  # Table des stations en colonnes
+from data.triangulation import charger_triangulation  # Triangulation de Delaunay mise en cache
+from profilage import compter_fichier, mesure  # Mesure des étapes (option --profile)
+
+# Dossier contenant la liste d'adjacence au format CSR (ids.npy, indptr.npy, indices.npy)
+DOSSIER_CSR = "liste_adjacence_csr"
+
+# Triangles de la triangulation, sauvegardés avec la liste d'adjacence (mises à jour incrémentales)
+TRIANGLES = "triangles.npz"
 
 ###################################################################################################
 ###################################################################################################
 
-# Forcer l'encodage UTF-8 pour éviter les erreurs d'encodage
-sys.stdout.reconfigure(encoding='utf-8')
+# Construire la liste d'adjacence au format CSR à partir de la triangulation
+@mesure("adjacence", lambda csr: {"aretes": len(csr[1]) // 2})
+def construire_adjacence(tri):
+    """Retourne (indptr, indices) : les voisins de la station i sont indices[indptr[i]:indptr[i + 1]].
+
+    Les voisins sont lus directement dans `vertex_neighbor_vertices`, sans parcourir les triangles.
+    """
+    indptr, indices = tri.vertex_neighbor_vertices
+    # Types compacts : int32 suffit pour les numéros de stations
+    return np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int32)
 
-# Charger le fichier JSON original contenant les informations des stations
-with open("station_informations.json", "r", encoding="utf-8") as file:
-    data = json.load(file)  # Charger le contenu du fichier JSON
+###################################################################################################
+###################################################################################################
 
-# Extraire les données nécessaires
-stations = data["data"]["stations"]  # Liste des stations
-coordonnees = [(s["lon"], s["lat"]) for s in stations]  # Extraire les coordonnées (longitude, latitude)
-station_ids = [s["station_id"] for s in stations]  # Extraire les IDs des stations
+# Sauvegarder la liste d'adjacence CSR dans un dossier de fichiers .npy
+def sauvegarder_csr(ids, indptr, indices, dossier=DOSSIER_CSR):
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+    for nom, tableau in (("ids", ids), ("indptr", indptr), ("indices", indices)):
+        ecrire_atomique(dossier / f"{nom}.npy", lambda fichier, t=tableau: np.save(fichier, t))
 
-# Triangulation de Delaunay
-points = np.array(coordonnees)  # Convertir les coordonnées en tableau NumPy
-tri = Delaunay(points)  # Effectuer la triangulation de Delaunay
+# Sauvegarder les triangles de la triangulation (et les identifiants des stations qu'ils relient)
+def sauvegarder_triangles(ids, simplices, voisins, dossier=DOSSIER_CSR):
+    ecrire_atomique(Path(dossier) / TRIANGLES, lambda fichier: np.savez(
+        fichier, ids=ids, simplices=simplices, neighbors=voisins))
 
-# Création de la liste d'adjacence
-adj_list = {station_id: set() for station_id in station_ids}  # Initialiser un dictionnaire avec des ensembles vides
+# Charger les triangles sauvegardés avec la liste d'adjacence
+def charger_triangles(dossier=DOSSIER_CSR):
+    """Retourne (ids, simplices, voisins) ; lève FileNotFoundError s'ils n'ont pas été sauvegardés."""
+    with np.load(Path(dossier) / TRIANGLES) as donnees:
+        return donnees["ids"], donnees["simplices"], donnees["neighbors"]
+
+# Charger la liste d'adjacence CSR (projetée en mémoire par défaut, sans lecture complète)
+def charger_csr(dossier=DOSSIER_CSR, mmap=True):
+    """Retourne (ids, indptr, indices) ; lève FileNotFoundError si la liste n'a pas été générée."""
+    dossier = Path(dossier)
+    mode = "r" if mmap else None
+    return tuple(np.load(dossier / f"{nom}.npy", mmap_mode=mode) for nom in ("ids", "indptr", "indices"))
+
+# Exporter la liste d'adjacence au format JSON historique ({station_id: [voisins]})
+def exporter_json(ids, indptr, indices, fichier="liste_adjacence.json"):
+    ids_liste = ids.tolist()
+    voisins = ids[indices].tolist()
+    bornes = indptr.tolist()
+    adj_list = {str(ids_liste[i]): voisins[bornes[i]:bornes[i + 1]] for i in range(len(ids_liste))}
+    with open(fichier, "w", encoding="utf-8") as f:
+        json.dump(adj_list, f)  # Sans indentation pour limiter la taille du fichier
+    compter_fichier(fichier)
 
 ###################################################################################################
 ###################################################################################################
 
-# Ajouter les connexions entre les stations
-for simplex in tri.simplices:  # Parcourir chaque triangle de la triangulation
-    s1, s2, s3 = simplex  # Indices des stations dans la liste
-    id1, id2, id3 = station_ids[s1], station_ids[s2], station_ids[s3]  # Récupérer les IDs des stations
+# Générer la liste d'adjacence des stations d'un fichier JSON
+@mesure("liste_adjacence")
+def generer_liste_adjacence(fichier_json="station_informations.json", dossier=DOSSIER_CSR,
+                            fichier_export_json=None):
+    # Charger les identifiants des stations (table mise en cache)
+    table = StationTable.charger(fichier_json)
+    ids = table.station_id
+
+    # Triangulation de Delaunay (rechargée depuis le cache si le fichier n'a pas changé)
+    tri = charger_triangulation(fichier_json)
+
+    # Création de la liste d'adjacence et sauvegarde au format CSR
+    indptr, indices = construire_adjacence(tri)
+    sauvegarder_csr(ids, indptr, indices, dossier)
+    sauvegarder_triangles(ids, tri.simplices, tri.neighbors, dossier)
+    # Instantané des stations, comparé au flux suivant lors des mises à jour incrémentales
+    table.sauvegarder(Path(dossier) / "stations.npz")
+
+    # Export JSON optionnel (format historique)
+    if fichier_export_json:
+        exporter_json(ids, indptr, indices, fichier_export_json)
+    return ids, indptr, indices
+
+# Nom utilisé par la commande `analyze` de main.py
+generate_adjacency_list = generer_liste_adjacence
+
+
+# Code principal
+if __name__ == "__main__":
+    # Forcer l'encodage UTF-8 pour éviter les erreurs d'encodage
+    sys.stdout.reconfigure(encoding='utf-8')
 
-    # Ajouter les connexions entre les stations du triangle
-    adj_list[id1].update([id2, id3])
-    adj_list[id2].update([id1, id3])
-    adj_list[id3].update([id1, id2])
+    parser = argparse.ArgumentParser(description="Générer la liste d'adjacence des stations")
+    parser.add_argument("--stations", default="station_informations.json",
+                        help="Fichier JSON des stations")
+    parser.add_argument("--sortie", default=DOSSIER_CSR, help="Dossier de la liste d'adjacence CSR")
+    parser.add_argument("--json", nargs="?", const="liste_adjacence.json", default=None,
+                        help="Exporter aussi la liste au format JSON (liste_adjacence.json par défaut)")
+    parser.add_argument("--mise-a-jour", action="store_true",
+                        help="Comparer le flux à l'instantané précédent et n'écrire que les changements")
+    args = parser.parse_args()
 
-# Convertir les ensembles en listes pour l'affichage et la sauvegarde
-adj_list = {station: list(neighbors) for station, neighbors in adj_list.items()}
+    if args.mise_a_jour:
+        from data.mise_a_jour import mettre_a_jour  # Mise à jour incrémentale
 
-# Afficher la liste d'adjacence
-for station, neighbors in adj_list.items():
-    print(f"Station {station} → {neighbors}")  # Afficher chaque station et ses voisins
+        resume = mettre_a_jour(args.stations, args.sortie)
+        if resume is None:
+            print("Aucun changement à signaler (ou liste d'adjacence complète générée).")
+        else:
+            print(f"{resume['ajoutees']} station(s) ajoutée(s), {resume['supprimees']} supprimée(s), "
+                  f"{resume['deplacees']} déplacée(s) : {resume['lignes_adjacence']} ligne(s) "
+                  f"d'adjacence modifiée(s) ({resume['triangulation']}), delta écrit dans '{resume['delta']}'.")
+        sys.exit(0)
 
-# Sauvegarder la liste d'adjacence dans un fichier JSON
-with open("liste_adjacence.json", "w", encoding="utf-8") as f:
-    json.dump(adj_list, f, indent=4)  # Sauvegarder le dictionnaire dans un fichier JSON avec une indentation
+    ids, indptr, indices = generer_liste_adjacence(args.stations, args.sortie, args.json)
 
-# Indiquer que la sauvegarde a été effectuée
-print("Liste d'adjacence sauvegardée dans 'liste_adjacence.json'.")
\ No newline at end of file
+    # Indiquer que la sauvegarde a été effectuée
+    print(f"Liste d'adjacence de {len(ids)} stations ({len(indices) // 2} arêtes) "
+          f"sauvegardée dans '{args.sortie}'.")
+    if args.json:
+        print(f"Export JSON sauvegardé dans '{args.json}'.")
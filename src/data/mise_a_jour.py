@@ -0,0 +1,288 @@
+"""
+Mise à jour de la liste d'adjacence quand le flux des stations change.
+Le nouveau flux est comparé à l'instantané précédent (par station_id) : seules les lignes
+d'adjacence et les indices de répartition qui ont changé sont écrits dans un fichier delta,
+et chaque mise à jour est consignée dans un journal.
+
+Les triangles sauvegardés avec la liste d'adjacence sont mis à jour sur place : les nouvelles stations
+y sont insérées une à une (algorithme de Bowyer-Watson, seule leur cavité est retriangulée) et seules
+les lignes d'adjacence de leurs sommets sont recalculées ; un changement de capacité ne touche pas la
+triangulation. Une station supprimée ou déplacée entraîne une reconstruction complète (Qhull ne permet
+pas de retirer des points). Un flux inchangé ne déclenche aucun calcul.
+"""
+import json  # Pour manipuler les fichiers JSON
+import time  # Pour horodater les mises à jour
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.cache import ecrire_atomique, empreinte_fichier
+from data.indice_repartition import calculer_indices
+from data.liste_adjacence import (DOSSIER_CSR, charger_csr, charger_triangles, generer_liste_adjacence,
+                                  sauvegarder_csr, sauvegarder_triangles)
+from data.station_table import StationTable
+
+# Nom de l'instantané de la table des stations, sauvegardé avec la liste d'adjacence
+INSTANTANE = "stations.npz"
+
+###################################################################################################
+###################################################################################################
+
+# Comparer deux tables de stations par identifiant
+def comparer_stations(ancienne, nouvelle):
+    """Retourne les identifiants des stations ajoutées, supprimées, déplacées et dont la capacité a changé."""
+    lignes_anciennes = ancienne.lignes(nouvelle.station_id)  # Ligne dans l'ancienne table (-1 si nouvelle)
+    communes = lignes_anciennes >= 0
+    i_nouv = np.flatnonzero(communes)
+    i_anc = lignes_anciennes[communes]
+    deplacees = (ancienne.lat[i_anc] != nouvelle.lat[i_nouv]) | (ancienne.lon[i_anc] != nouvelle.lon[i_nouv])
+    capacites = ancienne.capacity[i_anc] != nouvelle.capacity[i_nouv]
+    return {
+        "ajoutees": nouvelle.station_id[~communes],
+        "supprimees": ancienne.station_id[nouvelle.lignes(ancienne.station_id) < 0],
+        "deplacees": nouvelle.station_id[i_nouv[deplacees]],
+        "capacites": nouvelle.station_id[i_nouv[capacites]],
+    }
+
+# Clés uniques (entiers) des arêtes d'une liste d'adjacence CSR, dans un espace d'identifiants commun
+def cles_aretes(ids, indptr, indices, tous_ids):
+    codes = np.searchsorted(tous_ids, ids)  # Numéro de chaque station dans l'espace commun
+    sources = np.repeat(codes, np.diff(indptr))
+    cibles = codes[indices]
+    return sources * len(tous_ids) + cibles
+
+# Stations dont la liste de voisins a changé entre deux listes d'adjacence CSR
+def lignes_modifiees(ancienne_csr, nouvelle_csr):
+    tous_ids = np.union1d(ancienne_csr[0], nouvelle_csr[0])
+    anciennes = cles_aretes(*ancienne_csr, tous_ids)
+    nouvelles = cles_aretes(*nouvelle_csr, tous_ids)
+    # Arêtes apparues ou disparues : leurs deux extrémités ont une nouvelle liste de voisins
+    differences = np.setxor1d(anciennes, nouvelles, assume_unique=True)
+    return tous_ids[np.unique(differences // len(tous_ids))]
+
+# Écrire un delta sans jamais écraser celui d'une autre mise à jour de la même seconde
+def ecrire_delta(dossier_deltas, horodatage, delta):
+    """Écrit `delta_<horodatage>.json`, ou `delta_<horodatage>_<k>.json` si ce nom est déjà pris."""
+    dossier_deltas = Path(dossier_deltas)
+    dossier_deltas.mkdir(parents=True, exist_ok=True)
+    contenu = json.dumps(delta, ensure_ascii=False).encode("utf-8")
+    k = 0
+    while True:
+        chemin = dossier_deltas / (f"delta_{horodatage}.json" if k == 0 else f"delta_{horodatage}_{k}.json")
+        try:
+            ecrire_atomique(chemin, lambda f: f.write(contenu), exclusif=True)
+            return chemin
+        except FileExistsError:
+            k += 1
+
+###################################################################################################
+###################################################################################################
+
+# Cercles circonscrits de triangles, avec la tolérance de l'évaluation des sites candidats
+def _cercles(points, simplices):
+    from data.sites_candidats import cercles_circonscrits
+
+    centres, rayons2 = cercles_circonscrits(points, simplices)
+    # Un point sur le cercle (points cocycliques) ne le perturbe pas ; triangle plat : jamais en conflit
+    return centres, np.nan_to_num(rayons2 * (1 - 1e-9), nan=-1.0, posinf=-1.0)
+
+# Insérer des points dans une triangulation de Delaunay existante (algorithme de Bowyer-Watson)
+def inserer_points(points, simplices, voisins, nouveaux):
+    """`points` contient tous les sommets ; `simplices` et `voisins` (triangle opposé à chaque sommet,
+    -1 sur l'enveloppe convexe) ne relient pas encore les points numérotés `nouveaux`.
+
+    Chaque point supprime les triangles dont le cercle circonscrit le contient (sa cavité) et, hors de
+    l'enveloppe, les arêtes de l'enveloppe qu'il voit ; il est relié au bord de la région ainsi libérée.
+    Un point confondu avec un sommet existant n'est pas inséré (comme avec Qhull).
+    Retourne (simplices, voisins, sommets) : la nouvelle triangulation et les sommets dont les voisins
+    ont changé. Lève ValueError si la cavité est dégénérée.
+    """
+    simplices = np.asarray(simplices, dtype=np.int64)
+    voisins = np.asarray(voisins, dtype=np.int64)
+    vivants = np.ones(len(simplices), dtype=bool)
+    centres, rayons2 = _cercles(points, simplices)
+    sommets = set()
+
+    for v in nouveaux:
+        p = points[v]
+        conflit = np.flatnonzero(vivants & (((centres - p) ** 2).sum(axis=1) < rayons2))
+
+        # Arêtes de l'enveloppe vues depuis le point (le triangle adjacent est de l'autre côté)
+        t, k = np.nonzero((voisins < 0) & vivants[:, None])
+        a, b = points[simplices[t, (k + 1) % 3]], points[simplices[t, (k + 2) % 3]]
+        oppose = points[simplices[t, k]]
+        croix = ((b[:, 0] - a[:, 0]) * (p[1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (p[0] - a[:, 0]))
+        croix_oppose = ((b[:, 0] - a[:, 0]) * (oppose[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (oppose[:, 0] - a[:, 0]))
+        vues = set(zip(t[croix * croix_oppose < 0].tolist(), k[croix * croix_oppose < 0].tolist()))
+        if len(conflit) == 0 and not vues:
+            continue
+
+        # Bord de la région libérée : (a, b, triangle extérieur, côté de ce triangle tourné vers la région)
+        dans_conflit = set(conflit.tolist())
+        bords = []
+        for u in conflit.tolist():
+            for c in range(3):
+                w = int(voisins[u, c])
+                if w in dans_conflit or (w < 0 and (u, c) in vues):
+                    continue
+                cote = int(np.flatnonzero(voisins[w] == u)[0]) if w >= 0 else -1
+                bords.append((int(simplices[u, (c + 1) % 3]), int(simplices[u, (c + 2) % 3]), w, cote))
+        for u, c in vues:
+            if u not in dans_conflit:
+                bords.append((int(simplices[u, (c + 1) % 3]), int(simplices[u, (c + 2) % 3]), u, c))
+
+        # Nouveaux triangles (v, a, b) : voisins par l'arête (a, b), puis par les arêtes (v, b) et (v, a)
+        debut = len(simplices)
+        nouveaux_simplices = np.array([(v, a, b) for a, b, _, _ in bords], dtype=np.int64)
+        nouveaux_voisins = np.full((len(bords), 3), -1, dtype=np.int64)
+        par_sommet = {}
+        for i, (a, b, w, cote) in enumerate(bords):
+            nouveaux_voisins[i, 0] = w
+            if w >= 0:
+                voisins[w, cote] = debut + i
+            for x, position in ((a, 2), (b, 1)):
+                par_sommet.setdefault(x, []).append((i, position))
+        for x, cotes in par_sommet.items():
+            if len(cotes) > 2:
+                raise ValueError(f"Cavité dégénérée autour du point {v}")
+            if len(cotes) == 2:
+                (i, pi), (j, pj) = cotes
+                nouveaux_voisins[i, pi], nouveaux_voisins[j, pj] = debut + j, debut + i
+
+        vivants[conflit] = False
+        simplices = np.vstack((simplices, nouveaux_simplices))
+        voisins = np.vstack((voisins, nouveaux_voisins))
+        vivants = np.concatenate((vivants, np.ones(len(bords), dtype=bool)))
+        nouveaux_centres, nouveaux_rayons2 = _cercles(points, nouveaux_simplices)
+        centres, rayons2 = np.vstack((centres, nouveaux_centres)), np.concatenate((rayons2, nouveaux_rayons2))
+        sommets.update(nouveaux_simplices.ravel().tolist())
+
+    # Retirer les triangles supprimés et renuméroter les voisins
+    numeros = np.cumsum(vivants) - 1
+    voisins = voisins[vivants]
+    voisins = np.where(voisins >= 0, numeros[voisins], -1)
+    return simplices[vivants], voisins, np.array(sorted(sommets), dtype=np.int64)
+
+# Mettre à jour les triangles et la liste d'adjacence sauvegardés après l'ajout de stations
+def inserer_stations(ancienne_table, nouvelle_table, ancienne_csr, dossier):
+    """Aucune station ne doit avoir été supprimée ni déplacée. Les lignes d'adjacence des stations
+    non touchées sont reprises telles quelles, dans l'ordre de la nouvelle table.
+    Retourne la nouvelle liste CSR (ids, indptr, indices), ou None si les triangles sauvegardés
+    ne correspondent pas à l'instantané (une reconstruction complète est alors nécessaire).
+    """
+    try:
+        ids_triangles, simplices, voisins = charger_triangles(dossier)
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+    ids, indptr, indices = ancienne_csr
+    if (len(simplices) == 0 or not np.array_equal(ids_triangles, ancienne_table.station_id)
+            or not np.array_equal(ids, ancienne_table.station_id)):
+        return None
+
+    # Numérotation de travail : stations de l'instantané, puis stations ajoutées
+    n = len(ancienne_table)
+    ajoutees = np.flatnonzero(ancienne_table.lignes(nouvelle_table.station_id) < 0)
+    rangs = np.concatenate((nouvelle_table.lignes(ancienne_table.station_id), ajoutees))  # Ligne dans la nouvelle table
+    if len(ajoutees) == 0 and np.array_equal(rangs, np.arange(n)):
+        return ids, indptr, indices  # Seules des capacités ont changé : rien à réécrire
+    points = np.vstack((ancienne_table.coordonnees, nouvelle_table.coordonnees[ajoutees]))
+    try:
+        simplices, voisins, touches = inserer_points(points, simplices, voisins, range(n, len(points)))
+    except ValueError:
+        return None
+
+    # Arêtes conservées (lignes non touchées) et arêtes recalculées à partir des triangles des sommets touchés
+    est_touche = np.zeros(len(points), dtype=bool)
+    est_touche[touches] = True
+    sources = np.repeat(np.arange(n), np.diff(indptr))
+    gardees = ~est_touche[sources]
+    autour = simplices[est_touche[simplices].any(axis=1)]
+    paires = np.concatenate([autour[:, [i, j]] for i in range(3) for j in range(3) if i != j])
+    paires = np.unique(paires[est_touche[paires[:, 0]]], axis=0)
+    sources = rangs[np.concatenate((sources[gardees], paires[:, 0]))]
+    cibles = rangs[np.concatenate((np.asarray(indices)[gardees], paires[:, 1]))]
+
+    ordre = np.argsort(sources, kind="stable")  # L'ordre des voisins d'une ligne conservée est inchangé
+    nouvel_indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(points)))))
+    csr = (nouvelle_table.station_id, nouvel_indptr.astype(np.int64), cibles[ordre].astype(np.int32))
+    sauvegarder_csr(*csr, dossier)
+    sauvegarder_triangles(nouvelle_table.station_id, rangs[simplices].astype(np.int32), voisins.astype(np.int32),
+                          dossier)
+    return csr
+
+###################################################################################################
+###################################################################################################
+
+# Mettre à jour la liste d'adjacence à partir d'un nouveau flux de stations
+def mettre_a_jour(fichier_json="station_informations.json", dossier=DOSSIER_CSR,
+                  dossier_deltas="deltas", journal="journal_mises_a_jour.jsonl"):
+    """Compare le flux `fichier_json` à l'instantané de `dossier` et écrit un delta.
+
+    Sans instantané précédent, la liste d'adjacence complète est générée. Si des stations ont été
+    ajoutées (ou leurs capacités modifiées), elles sont insérées dans les triangles sauvegardés ;
+    si des stations ont été supprimées ou déplacées, la triangulation complète est recalculée.
+    Retourne le résumé consigné dans le journal (None si rien n'a changé) ; sa clé `triangulation`
+    vaut "insertion" ou "reconstruction".
+    """
+    dossier = Path(dossier)
+    try:
+        ancienne_table = StationTable.depuis_fichier(dossier / INSTANTANE)
+        ancienne_csr = tuple(np.asarray(t) for t in charger_csr(dossier))
+    except (FileNotFoundError, KeyError, ValueError):
+        # Pas d'instantané utilisable : génération complète
+        generer_liste_adjacence(fichier_json, dossier)
+        return None
+
+    nouvelle_table = StationTable.charger(fichier_json)
+    changements = comparer_stations(ancienne_table, nouvelle_table)
+    if not any(len(ids) for ids in changements.values()):
+        return None  # Aucun changement dans le flux
+
+    # Insertion des nouvelles stations, ou nouvelle triangulation (Qhull ne permet pas de retirer des points)
+    nouvelle_csr = None
+    if not len(changements["supprimees"]) and not len(changements["deplacees"]):
+        nouvelle_csr = inserer_stations(ancienne_table, nouvelle_table, ancienne_csr, dossier)
+    methode = "insertion" if nouvelle_csr is not None else "reconstruction"
+    if nouvelle_csr is None:
+        nouvelle_csr = generer_liste_adjacence(fichier_json, dossier)
+    else:
+        nouvelle_table.sauvegarder(dossier / INSTANTANE)
+    ids, indptr, indices = nouvelle_csr
+
+    # Lignes d'adjacence modifiées (les stations supprimées n'apparaissent que dans le résumé)
+    modifiees = lignes_modifiees(ancienne_csr, nouvelle_csr)
+    lignes = nouvelle_table.lignes(modifiees)
+    lignes = lignes[lignes >= 0]
+    adjacence = {
+        str(ids[i]): ids[indices[indptr[i]:indptr[i + 1]]].tolist() for i in lignes.tolist()
+    }
+
+    # Indices de répartition modifiés (la médiane des capacités peut elle aussi avoir changé)
+    anciens_indices = calculer_indices(ancienne_table, np.diff(ancienne_csr[1]))
+    nouveaux_indices = calculer_indices(nouvelle_table, np.diff(indptr))
+    lignes_anciennes = ancienne_table.lignes(ids)
+    precedents = np.where(lignes_anciennes >= 0, anciens_indices[lignes_anciennes], np.nan)
+    changes = np.flatnonzero(~np.isclose(nouveaux_indices, precedents))
+    indices_modifies = dict(zip(map(str, ids[changes].tolist()), nouveaux_indices[changes].tolist()))
+
+    # Écrire le delta
+    horodatage = time.strftime("%Y%m%dT%H%M%S")
+    delta = {
+        **{cle: valeurs.tolist() for cle, valeurs in changements.items()},
+        "adjacence": adjacence,
+        "indices": indices_modifies,
+    }
+    chemin_delta = ecrire_delta(dossier_deltas, horodatage, delta)
+
+    # Consigner la mise à jour dans le journal
+    resume = {
+        "date": horodatage,
+        "empreinte": empreinte_fichier(fichier_json),
+        **{cle: len(valeurs) for cle, valeurs in changements.items()},
+        "triangulation": methode,
+        "lignes_adjacence": len(adjacence),
+        "indices": len(indices_modifies),
+        "delta": str(chemin_delta),
+    }
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write(json.dumps(resume) + "\n")
+    return resume
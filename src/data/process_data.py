@@ -1,50 +1,58 @@
-import numpy as np  # Pour manipuler des tableaux numériques
-import requests  # Pour effectuer des requêtes HTTP
-import json  # Pour manipuler les fichiers JSON
+import sys  # Pour modifier le chemin des imports
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data.cache import ecrire_atomique  # Pour écrire les fichiers de manière atomique
+from data.station_table import StationTable  # Table des stations en colonnes
 
 # URL du fichier JSON contenant les informations des stations Vélib'
 url = "https://velib-metropole-opendata.smovengo.cloud/opendata/Velib_Metropole/station_information.json"
 
-# Effectuer une requête GET pour télécharger les données
-response = requests.get(url)
+# Nom du fichier contenant les données des stations
+FICHIER_ENTREE = "station_informations.json"
+
 
-# Vérifier si la requête a réussi
-if response.status_code == 200:
-    data = response.json()  # Convertir la réponse en JSON
-    # Sauvegarder les données dans un fichier local
-    with open("station_informationn.json", "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4, ensure_ascii=False)  # Sauvegarder avec une indentation
+# Fonction pour télécharger une seule fois le fichier des stations
+# (pour une récupération périodique, voir data/gbfs.py)
+def telecharger_donnees(url=url, fichier=FICHIER_ENTREE, delai=30):
+    """Télécharge le fichier des stations et le sauvegarde dans `fichier` ; retourne True si tout s'est bien passé."""
+    import requests  # Pour effectuer des requêtes HTTP (seulement lors d'un téléchargement)
+
+    try:
+        # Effectuer une requête GET pour télécharger les données (avec un délai maximal)
+        response = requests.get(url, timeout=delai)
+    except requests.RequestException as e:
+        print(f"Erreur lors du téléchargement : {e}")  # Gérer les erreurs réseau
+        return False
+
+    # Vérifier si la requête a réussi
+    if response.status_code != 200:
+        # Afficher un message d'erreur si la requête a échoué
+        print(f"Erreur : {response.status_code}")
+        return False
+
+    response.json()  # Vérifier que la réponse est bien du JSON
+    # Sauvegarder les données dans le fichier local lu par les autres scripts (écriture atomique)
+    ecrire_atomique(fichier, lambda f: f.write(response.content))
     print("Le fichier JSON a bien été téléchargé.")  # Confirmation de la sauvegarde
-else:
-    # Afficher un message d'erreur si la requête a échoué
-    print(f"Erreur : {response.status_code}")
+    return True
 
 ###################################################################################################
 ###################################################################################################
 
-# Nom du fichier contenant les données des stations
-FICHIER_ENTREE = "station_informations.json"
-
-
 # Fonction pour charger et extraire les données des stations Vélib'
-def load_station_data():
-    """Charge et extrait les données des stations Vélib'."""
-    with open(FICHIER_ENTREE, "r", encoding="utf-8") as fichier:
-        data = json.load(fichier)  # Charger le contenu du fichier JSON
-    
-    stations = []  # Liste pour stocker les informations des stations
-    coordonnees = []  # Liste pour stocker les coordonnées des stations
-
-    # Vérifier si les données contiennent des stations
-    if "data" in data and "stations" in data["data"]:
-        for station in data["data"]["stations"]:  # Parcourir chaque station
-            stations.append(station)  # Ajouter les informations de la station
-            coordonnees.append((station["lat"], station["lon"]))  # Ajouter les coordonnées (latitude, longitude)
-
-    return stations, np.array(coordonnees)  # Retourner les stations et leurs coordonnées sous forme de tableau NumPy
+def load_station_data(fichier=FICHIER_ENTREE):
+    """Charge la table des stations Vélib' (StationTable) et leurs coordonnées (latitude, longitude)."""
+    # Le fichier JSON n'est analysé qu'une fois : la table est ensuite rechargée depuis le cache
+    stations = StationTable.charger(fichier)
+    return stations, stations.coordonnees  # Retourner la table et les coordonnées sous forme de tableau NumPy
 
 # Code principal
 if __name__ == "__main__":
+    # Télécharger les données des stations
+    telecharger_donnees()
     # Charger les données des stations
     stations, coordonnees = load_station_data()
     # Afficher le nombre de stations chargées
@@ -0,0 +1,605 @@
+"""
+Planification des tournées de rééquilibrage : à partir du nombre de vélos de chaque station et d'un
+niveau cible, des camions de capacité limitée partent du dépôt, chargent les vélos des stations
+excédentaires, les déposent dans les stations déficitaires et reviennent au dépôt avant la fin de
+leur service, camion vide.
+
+Aucune matrice de distances N × N n'est construite : les distances sont calculées à la demande
+(projection locale en mètres, multipliée par un facteur de détour) et les mouvements de la recherche
+locale ne considèrent, pour chaque station, que ses k plus proches voisines, choisies parmi les
+voisins de la triangulation de Delaunay (et les voisins de ces voisins). Plusieurs recherches de
+graines différentes tournent en parallèle pendant une durée limitée ; la meilleure est retenue.
+"""
+import math  # Pour les distances calculées à la demande
+import os  # Pour connaître le nombre de processeurs
+import random  # Pour les perturbations de la recherche locale
+import time  # Pour limiter la durée de la recherche
+from concurrent.futures import ProcessPoolExecutor  # Une recherche par processus
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from profilage import initialiser_processus, mesure  # Mesure des étapes (option --profile)
+
+# Nombre de plus proches voisines de chaque station considérées par la recherche locale
+NB_VOISINES = 16
+
+# Nombre d'anneaux de voisins de Delaunay parmi lesquels ces voisines sont choisies
+NB_ANNEAUX = 3
+
+# Nombre de perturbations sans amélioration après lequel une recherche s'arrête avant la limite de temps
+STAGNATION = 500
+
+# Problème de chaque processus de recherche (transmis une seule fois par processus)
+_PROBLEME = None
+
+###################################################################################################
+###################################################################################################
+
+# Plus proches voisines de chaque station, parmi ses voisins de Delaunay jusqu'au rang `anneaux`
+def voisines_proches(indptr, indices, xy, k=NB_VOISINES, anneaux=NB_ANNEAUX):
+    """Retourne un tableau (n, k) int32 de numéros de stations triées par distance croissante,
+    complété par -1 si une station a moins de k voisines à moins de `anneaux` arêtes.
+
+    Seules les O(n) paires de stations proches sont examinées (matrice creuse du graphe de Delaunay
+    élevée à la puissance `anneaux`), jamais les n² paires.
+    """
+    from scipy.sparse import csr_matrix  # Import coûteux, seulement si nécessaire
+
+    n = len(xy)
+    adjacence = csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(n, n))
+    atteintes = adjacence
+    for _ in range(anneaux - 1):
+        atteintes = atteintes + atteintes @ adjacence
+    atteintes = atteintes.tocoo()
+    lignes, colonnes = atteintes.row, atteintes.col
+    differentes = lignes != colonnes
+    lignes, colonnes = lignes[differentes], colonnes[differentes]
+
+    # Tri des voisines de chaque station par distance, puis conservation des k premières
+    distances = np.hypot(*(xy[lignes] - xy[colonnes]).T)
+    ordre = np.lexsort((distances, lignes))
+    lignes, colonnes = lignes[ordre], colonnes[ordre]
+    debuts = np.searchsorted(lignes, np.arange(n))
+    rangs = np.arange(len(lignes)) - debuts[lignes]
+    gardees = rangs < k
+    voisines = np.full((n, k), -1, dtype=np.int32)
+    voisines[lignes[gardees], rangs[gardees]] = colonnes[gardees]
+    return voisines
+
+###################################################################################################
+###################################################################################################
+
+class Probleme:
+    """Données d'un problème de rééquilibrage, indexées par les lignes de la table des stations.
+
+    Le dépôt est le point numéro n (après la dernière station). `ecarts[i]` est le nombre de vélos
+    en trop (> 0) ou manquants (< 0) à la station i ; les durées sont en secondes, les distances
+    en mètres et la vitesse en mètres par seconde.
+    """
+
+    def __init__(self, xy, ecarts, voisines, nb_camions, capacite, duree_max, vitesse, service, detour):
+        self.xs, self.ys = xy[:, 0].copy(), xy[:, 1].copy()
+        self.x, self.y = self.xs.tolist(), self.ys.tolist()
+        self.depot = len(xy) - 1
+        self.ecarts = [int(e) for e in ecarts]
+        self.voisines = [[v for v in ligne if v >= 0] for ligne in voisines.tolist()]
+        self.nb_camions = nb_camions
+        self.capacite = capacite
+        self.duree_max = duree_max
+        self.vitesse = vitesse
+        self.service = service
+        self.detour = detour
+
+    # Distance routière estimée entre deux points
+    def distance(self, a, b):
+        return math.hypot(self.x[a] - self.x[b], self.y[a] - self.y[b]) * self.detour
+
+    # Longueur d'une tournée (du dépôt au dépôt)
+    def longueur(self, stations):
+        points = [self.depot, *stations, self.depot]
+        return sum(self.distance(a, b) for a, b in zip(points, points[1:]))
+
+    # Durée d'une tournée : trajets et arrêts
+    def duree(self, longueur, nb_arrets):
+        return longueur / self.vitesse + nb_arrets * self.service
+
+    # Vérifier que la charge du camion reste comprise entre 0 et sa capacité
+    def charges_valides(self, quantites):
+        charge = 0
+        for q in quantites:
+            charge += q
+            if charge < 0 or charge > self.capacite:
+                return False
+        return True
+
+###################################################################################################
+###################################################################################################
+
+class Recherche:
+    """Construction gloutonne puis recherche locale itérée (perturbation, réinsertion, 2-opt,
+    déplacements) d'un ensemble de tournées.
+
+    Chaque tournée est une liste de stations et une liste de quantités (> 0 : vélos chargés,
+    < 0 : vélos déposés) ; une station est visitée au plus une fois et le camion revient vide au
+    dépôt. Les solutions sont comparées sur le nombre de vélos déplacés, puis sur la distance totale.
+    Toutes les phases (construction comprise) s'interrompent à l'échéance `echeance`.
+    """
+
+    def __init__(self, probleme, graine=0, echeance=math.inf):
+        self.p = probleme
+        self.graine = graine
+        self.echeance = echeance
+        self.rng = random.Random(graine)
+        self.stations = [[] for _ in range(probleme.nb_camions)]
+        self.quantites = [[] for _ in range(probleme.nb_camions)]
+        self.longueurs = [0.0] * probleme.nb_camions
+        self.restant = list(probleme.ecarts)  # Écart restant de chaque station après les tournées
+        self.tournee = {}  # Station visitée → numéro de sa tournée
+
+    # Valeur de la solution (à maximiser)
+    def score(self):
+        return sum(abs(q) for quantites in self.quantites for q in quantites), -round(sum(self.longueurs), 3)
+
+    # Copie de la solution (tournées seulement)
+    def solution(self):
+        return [list(s) for s in self.stations], [list(q) for q in self.quantites]
+
+    # Remplacer la solution courante
+    def restaurer(self, solution):
+        self.stations, self.quantites = [list(s) for s in solution[0]], [list(q) for q in solution[1]]
+        self.longueurs = [self.p.longueur(s) for s in self.stations]
+        self.restant = list(self.p.ecarts)
+        self.tournee = {}
+        for r, (stations, quantites) in enumerate(zip(self.stations, self.quantites)):
+            for s, q in zip(stations, quantites):
+                self.restant[s] -= q
+                self.tournee[s] = r
+
+    # Vérifier si l'échéance de la recherche est dépassée
+    def expiree(self):
+        return time.perf_counter() >= self.echeance
+
+    # Vérifier qu'une tournée modifiée respecte la durée du service
+    def duree_valide(self, longueur, nb_arrets):
+        return self.p.duree(longueur, nb_arrets) <= self.p.duree_max
+
+    ###############################################################################################
+
+    # Construction gloutonne : chaque camion va à l'arrêt qui déplace le plus de vélos par seconde
+    def construire(self):
+        """Avec une graine non nulle, le score des candidats est bruité pour diversifier les solutions."""
+        p = self.p
+        restant = np.array(self.restant, dtype=np.int64)
+        libre = np.ones(len(restant), dtype=bool)
+        libre[list(self.tournee)] = False
+        retour = np.hypot(p.xs[:-1] - p.x[p.depot], p.ys[:-1] - p.y[p.depot]) * p.detour / p.vitesse
+        bruit = np.random.default_rng(self.graine)
+
+        for r in range(p.nb_camions):
+            position, charge, temps = p.depot, 0, 0.0
+            while not self.expiree():
+                utiles = libre & (((restant > 0) & (charge < p.capacite)) | ((restant < 0) & (charge > 0)))
+                candidats = np.flatnonzero(utiles)
+                if len(candidats) == 0:
+                    break
+                ecarts = restant[candidats]
+                quantites = np.where(ecarts > 0, np.minimum(ecarts, p.capacite - charge), -np.minimum(-ecarts, charge))
+                trajets = np.hypot(p.xs[candidats] - p.x[position], p.ys[candidats] - p.y[position]) * p.detour / p.vitesse
+                faisables = temps + trajets + p.service + retour[candidats] <= p.duree_max
+                if not faisables.any():
+                    break
+                scores = np.where(faisables, np.abs(quantites) / (trajets + p.service), -np.inf)
+                if self.graine:
+                    scores *= bruit.uniform(0.6, 1.0, len(scores))
+                meilleur = int(np.argmax(scores))
+                station, q = int(candidats[meilleur]), int(quantites[meilleur])
+                self.stations[r].append(station)
+                self.quantites[r].append(q)
+                self.tournee[station] = r
+                restant[station] -= q
+                libre[station] = False
+                charge += q
+                temps += trajets[meilleur] + p.service
+                position = station
+            self.longueurs[r] = p.longueur(self.stations[r])
+        self.restant = restant.tolist()
+        for r in range(p.nb_camions):
+            self.vider(r)
+
+    ###############################################################################################
+
+    # Réduire les quantités d'une tournée pour que la charge reste valide (après un retrait)
+    def reparer(self, r):
+        stations, quantites, charge = [], [], 0
+        for s, q in zip(self.stations[r], self.quantites[r]):
+            nouvelle = min(q, self.p.capacite - charge) if q > 0 else max(q, -charge)
+            self.restant[s] += q - nouvelle
+            if nouvelle == 0:
+                del self.tournee[s]
+                continue
+            stations.append(s)
+            quantites.append(nouvelle)
+            charge += nouvelle
+        self.stations[r], self.quantites[r] = stations, quantites
+        self.longueurs[r] = self.p.longueur(stations)
+
+    # Réduire les derniers chargements d'une tournée pour que le camion revienne vide au dépôt
+    def vider(self, r):
+        """En remontant la tournée, chaque chargement est réduit de la charge finale restante : la charge
+        reste positive (seuls des dépôts suivent) et retirer des arrêts ne rallonge pas la tournée."""
+        quantites = list(self.quantites[r])
+        exces = sum(quantites)
+        for t in range(len(quantites) - 1, -1, -1):
+            if exces == 0:
+                break
+            if quantites[t] > 0:
+                retrait = min(quantites[t], exces)
+                quantites[t] -= retrait
+                exces -= retrait
+                self.restant[self.stations[r][t]] += retrait
+        self.quantites[r] = quantites
+        if all(quantites):
+            return
+        for s, q in zip(self.stations[r], quantites):
+            if q == 0:
+                del self.tournee[s]
+        self.stations[r] = [s for s, q in zip(self.stations[r], quantites) if q]
+        self.quantites[r] = [q for q in quantites if q]
+        self.longueurs[r] = self.p.longueur(self.stations[r])
+
+    # Retirer quelques arrêts proches les uns des autres (perturbation)
+    def perturber(self, taille=4):
+        """Retourne l'ensemble des tournées modifiées."""
+        visitees = list(self.tournee)
+        if not visitees:
+            return set()
+        centre = self.rng.choice(visitees)
+        retirees = [centre] + [v for v in self.p.voisines[centre] if v in self.tournee][:taille - 1]
+        modifiees = set()
+        for s in retirees:
+            r = self.tournee.pop(s)
+            i = self.stations[r].index(s)
+            self.restant[s] += self.quantites[r][i]
+            del self.stations[r][i], self.quantites[r][i]
+            modifiees.add(r)
+        for r in modifiees:
+            self.reparer(r)
+        return modifiees
+
+    # Insérer les stations non visitées à côté de l'une de leurs voisines déjà visitées
+    def inserer(self):
+        """Chaque station est insérée à la position qui lui permet de déplacer le plus de vélos
+        (puis qui allonge le moins la tournée). Retourne l'ensemble des tournées modifiées."""
+        p = self.p
+        modifiees = set()
+        candidates = [s for s in range(p.depot) if self.restant[s] and s not in self.tournee]
+        self.rng.shuffle(candidates)
+        for s in candidates:
+            if self.expiree():
+                break
+            meilleure = None
+            for v in p.voisines[s]:
+                r = self.tournee.get(v)
+                if r is None:
+                    continue
+                stations, quantites = self.stations[r], self.quantites[r]
+                i = stations.index(v)
+                for t in (i, i + 1):  # Avant ou après la voisine
+                    precedent = stations[t - 1] if t > 0 else p.depot
+                    suivant = stations[t] if t < len(stations) else p.depot
+                    ajout = p.distance(precedent, s) + p.distance(s, suivant) - p.distance(precedent, suivant)
+                    if not self.duree_valide(self.longueurs[r] + ajout, len(stations) + 1):
+                        continue
+                    charges = np.cumsum([0] + quantites)
+                    if self.restant[s] > 0:
+                        q = min(self.restant[s], p.capacite - int(charges[t:].max()))
+                    else:
+                        q = -min(-self.restant[s], int(charges[t:].min()))
+                    if q and (meilleure is None or (abs(q), -ajout) > (abs(meilleure[0]), -meilleure[3])):
+                        meilleure = (q, r, t, ajout)
+            if meilleure is not None:
+                q, r, t, ajout = meilleure
+                self.stations[r].insert(t, s)
+                self.quantites[r].insert(t, q)
+                self.longueurs[r] += ajout
+                self.restant[s] -= q
+                self.tournee[s] = r
+                modifiees.add(r)
+        return modifiees
+
+    # Augmenter les quantités des arrêts existants tant que la charge du camion le permet
+    def augmenter(self, r):
+        quantites = self.quantites[r]
+        for t, s in enumerate(self.stations[r]):
+            if self.restant[s] == 0:
+                continue
+            charges = np.cumsum(quantites)[t:]
+            if self.restant[s] > 0 and quantites[t] > 0:
+                ajout = min(self.restant[s], self.p.capacite - int(charges.max()))
+            elif self.restant[s] < 0 and quantites[t] < 0:
+                ajout = -min(-self.restant[s], int(charges.min()))
+            else:
+                continue
+            quantites[t] += ajout
+            self.restant[s] -= ajout
+
+    # Amélioration 2-opt d'une tournée (inversion d'un segment, si la charge reste valide)
+    def deux_opt(self, r):
+        p = self.p
+        ameliore = True
+        while ameliore and not self.expiree():
+            ameliore = False
+            stations, quantites = self.stations[r], self.quantites[r]
+            points = [p.depot, *stations, p.depot]
+            for i in range(1, len(points) - 2):
+                for j in range(i + 1, len(points) - 1):
+                    delta = (p.distance(points[i - 1], points[j]) + p.distance(points[i], points[j + 1])
+                             - p.distance(points[i - 1], points[i]) - p.distance(points[j], points[j + 1]))
+                    if delta > -1e-6:
+                        continue
+                    nouvelles = quantites[:i - 1] + quantites[i - 1:j][::-1] + quantites[j:]
+                    if not p.charges_valides(nouvelles):
+                        continue
+                    self.stations[r] = stations[:i - 1] + stations[i - 1:j][::-1] + stations[j:]
+                    self.quantites[r] = nouvelles
+                    self.longueurs[r] += delta
+                    ameliore = True
+                    break
+                if ameliore:
+                    break
+
+    # Déplacer les arrêts des tournées `modifiees` à côté de l'une de leurs voisines, s'ils raccourcissent les tournées
+    def deplacer(self, modifiees):
+        p = self.p
+        for a in list(modifiees):
+            if self.expiree():
+                break
+            for s in list(self.stations[a]):
+                if self.tournee.get(s) != a:
+                    continue
+                i = self.stations[a].index(s)
+                q = self.quantites[a][i]
+                reste_s = self.stations[a][:i] + self.stations[a][i + 1:]
+                reste_q = self.quantites[a][:i] + self.quantites[a][i + 1:]
+                if not p.charges_valides(reste_q):
+                    continue
+                longueur_a = p.longueur(reste_s)
+                for v in p.voisines[s]:
+                    b = self.tournee.get(v)
+                    if b is None:
+                        continue
+                    base_s, base_q = (reste_s, reste_q) if b == a else (self.stations[b], self.quantites[b])
+                    j = base_s.index(v)
+                    for t in (j, j + 1):
+                        nouvelles_s = base_s[:t] + [s] + base_s[t:]
+                        nouvelles_q = base_q[:t] + [q] + base_q[t:]
+                        if b == a:
+                            gain = self.longueurs[a] - p.longueur(nouvelles_s)
+                        else:
+                            longueur_b = p.longueur(nouvelles_s)
+                            gain = self.longueurs[a] + self.longueurs[b] - longueur_a - longueur_b
+                        if gain < 1e-6 or not p.charges_valides(nouvelles_q):
+                            continue
+                        if b == a:
+                            if not self.duree_valide(self.longueurs[a] - gain, len(nouvelles_s)):
+                                continue
+                            self.stations[a], self.quantites[a] = nouvelles_s, nouvelles_q
+                            self.longueurs[a] -= gain
+                        else:
+                            if not self.duree_valide(longueur_b, len(nouvelles_s)):
+                                continue
+                            self.stations[a], self.quantites[a], self.longueurs[a] = reste_s, reste_q, longueur_a
+                            self.stations[b], self.quantites[b], self.longueurs[b] = nouvelles_s, nouvelles_q, longueur_b
+                            self.tournee[s] = b
+                            modifiees.add(b)
+                        break
+                    else:
+                        continue
+                    break
+
+    # Recherche locale sur les tournées modifiées (les camions reviennent ensuite vides au dépôt)
+    def ameliorer(self, modifiees):
+        modifiees = set(modifiees) | self.inserer()
+        for r in modifiees:
+            self.augmenter(r)
+            self.deux_opt(r)
+        self.deplacer(modifiees)
+        # Les déplacements libèrent du temps : de nouvelles stations peuvent être insérées
+        nouvelles = self.inserer()
+        for r in nouvelles:
+            self.augmenter(r)
+            self.deux_opt(r)
+        for r in modifiees | nouvelles:
+            self.vider(r)
+
+    # Recherche locale itérée jusqu'à l'échéance (ou jusqu'à la stagnation)
+    def rechercher(self, echeance, stagnation=STAGNATION):
+        self.echeance = echeance
+        self.construire()
+        self.ameliorer(range(self.p.nb_camions))
+        meilleure, meilleur_score = self.solution(), self.score()
+        sans_amelioration = iterations = 0
+        while time.perf_counter() < echeance and sans_amelioration < stagnation:
+            iterations += 1
+            self.ameliorer(self.perturber(self.rng.randint(2, 6)))
+            score = self.score()
+            if score > meilleur_score:
+                meilleure, meilleur_score, sans_amelioration = self.solution(), score, 0
+            else:
+                sans_amelioration += 1
+                if score < meilleur_score:
+                    self.restaurer(meilleure)
+        self.restaurer(meilleure)
+        return iterations
+
+###################################################################################################
+###################################################################################################
+
+# Transmettre le problème à chaque processus de recherche
+def _initialiser(probleme):
+    global _PROBLEME
+    _PROBLEME = probleme
+
+# Une recherche complète (dans un processus du pool) ; retourne son score, ses tournées et ses itérations
+def _rechercher(graine, duree_s):
+    recherche = Recherche(_PROBLEME, graine)
+    iterations = recherche.rechercher(time.perf_counter() + duree_s)
+    return recherche.score(), recherche.solution(), iterations
+
+# Lancer une recherche par processus (graines différentes) et garder la meilleure solution
+def optimiser(probleme, duree_s=20.0, processus=None, graine=0):
+    """Retourne (tournées, nombre total d'itérations) ; les tournées sont un couple
+    (stations, quantités) de listes par camion."""
+    processus = max(1, processus or os.cpu_count())
+    graines = [graine + k for k in range(processus)]
+    if processus == 1:
+        _initialiser(probleme)
+        resultats = [_rechercher(graines[0], duree_s)]
+    else:
+        with ProcessPoolExecutor(processus, initializer=initialiser_processus,
+                                 initargs=(_initialiser, probleme)) as executeur:
+            resultats = list(executeur.map(_rechercher, graines, [duree_s] * processus))
+    score, solution, _ = max(resultats, key=lambda resultat: resultat[0])
+    return solution, sum(resultat[2] for resultat in resultats)
+
+###################################################################################################
+###################################################################################################
+
+# Lire le nombre de vélos de chaque station : flux station_status (JSON) ou CSV (station_id, velos)
+def lire_niveaux(fichier, table):
+    """Retourne (velos, bornes_libres), deux tableaux int64 alignés sur `table`, à -1 si inconnus."""
+    if str(fichier).endswith(".csv"):
+        velos = lire_colonne_csv(fichier, table, "velos")
+        return velos, np.full(len(table), -1, dtype=np.int64)
+    from data.historique import lire_station_status
+
+    _, valeurs = lire_station_status(fichier, table)
+    valeurs = valeurs.astype(np.int64)
+    velos = np.where(valeurs[:, 0] >= 0, valeurs[:, 0] + valeurs[:, 1], -1)
+    return velos, valeurs[:, 2]
+
+# Lire une colonne d'un fichier CSV (station_id, ...) et l'aligner sur `table` (-1 si absente)
+def lire_colonne_csv(fichier, table, colonne):
+    import csv  # Pour lire les fichiers tabulaires
+
+    with open(fichier, "r", encoding="utf-8", newline="") as f:
+        lignes = list(csv.DictReader(f))
+    valeurs = np.full(len(table), -1, dtype=np.int64)
+    if lignes:
+        numeros = table.lignes(np.array([ligne["station_id"] for ligne in lignes]))
+        connues = numeros >= 0
+        valeurs[numeros[connues]] = np.array([int(float(ligne[colonne])) for ligne in lignes])[connues]
+    return valeurs
+
+# Planifier les tournées de rééquilibrage
+@mesure("reequilibrage", lambda plan: {"arrets": plan["resume"]["arrets"],
+                                       "velos": plan["resume"]["velos_deplaces"]})
+def planifier_tournees(table, liste_adjacence, velos, cibles, depot=None, nb_camions=3, capacite=20,
+                       duree_max_min=240.0, vitesse_kmh=15.0, service_min=5.0, detour=1.3,
+                       duree_s=20.0, processus=None, graine=0):
+    """`liste_adjacence` est le couple CSR (indptr, indices) de la triangulation ; `velos` et `cibles`
+    sont alignés sur `table` (-1 si inconnus : la station est ignorée). `depot` est un couple
+    (latitude, longitude), par défaut le centre des stations. Retourne le plan (dictionnaire JSON).
+    """
+    from data.geo import projeter
+
+    if depot is None:
+        depot = (float(table.lat.mean()), float(table.lon.mean()))
+    lat0, lon0 = depot
+    xy = np.vstack((projeter(table.lat, table.lon, lat0, lon0), [[0.0, 0.0]]))  # Le dépôt est le dernier point
+    connus = (velos >= 0) & (cibles >= 0)
+    ecarts = np.where(connus, velos - cibles, 0)
+
+    indptr, indices = liste_adjacence
+    probleme = Probleme(xy, ecarts, voisines_proches(indptr, indices, xy[:-1]), nb_camions, capacite,
+                        duree_max_min * 60, vitesse_kmh / 3.6, service_min * 60, detour)
+    (stations, quantites), iterations = optimiser(probleme, duree_s, processus, graine)
+
+    tournees = []
+    for camion, (arrets, qs) in enumerate(zip(stations, quantites), start=1):
+        longueur = probleme.longueur(arrets)
+        charges = np.cumsum(qs).tolist()
+        tournees.append({
+            "camion": camion,
+            "distance_km": round(longueur / 1000, 3),
+            "duree_min": round(probleme.duree(longueur, len(arrets)) / 60, 1),
+            "velos_charges": sum(q for q in qs if q > 0),
+            "velos_deposes": -sum(q for q in qs if q < 0),
+            "arrets": [
+                {
+                    "station_id": table.station_id[s].item(),
+                    "nom": table.nom(s),
+                    "lat": float(table.lat[s]),
+                    "lon": float(table.lon[s]),
+                    "operation": "chargement" if q > 0 else "dépôt",
+                    "quantite": abs(q),
+                    "charge": charge,
+                }
+                for s, q, charge in zip(arrets, qs, charges)
+            ],
+        })
+
+    restant = ecarts.copy()
+    for arrets, qs in zip(stations, quantites):
+        restant[arrets] -= qs
+    return {
+        "depot": [float(lat0), float(lon0)],
+        "parametres": {
+            "camions": nb_camions, "capacite": capacite, "duree_max_min": duree_max_min,
+            "vitesse_kmh": vitesse_kmh, "service_min": service_min, "detour": detour,
+            "duree_recherche_s": duree_s, "graine": graine,
+        },
+        "resume": {
+            "stations_desequilibrees": int((ecarts != 0).sum()),
+            "desequilibre_initial": int(np.abs(ecarts).sum()),
+            "desequilibre_restant": int(np.abs(restant).sum()),
+            "arrets": sum(len(arrets) for arrets in stations),
+            "velos_deplaces": sum(abs(q) for qs in quantites for q in qs),
+            "distance_km": round(sum(t["distance_km"] for t in tournees), 3),
+            "iterations": iterations,
+        },
+        "tournees": tournees,
+    }
+
+###################################################################################################
+###################################################################################################
+
+# Planifier les tournées pour un fichier GBFS et écrire le plan (JSON) et sa carte
+def generer_plan(fichier_json="station_informations.json", fichier_niveaux="station_status.json",
+                 fichier_cibles=None, taux_cible=0.5, fichier_plan="results/analysis/tournees.json",
+                 fichier_carte="results/maps/velib_tournees_map.html", **options):
+    """Les cibles sont lues dans `fichier_cibles` (CSV station_id, cible) ou valent `taux_cible`
+    fois la capacité de chaque station (vélos + bornes libres si la capacité est absente).
+    Les autres options sont transmises à `planifier_tournees`. Retourne le plan (None s'il y a
+    moins de 3 stations)."""
+    import json  # Pour écrire le plan
+    from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+    from data.liste_adjacence import construire_adjacence
+    from data.station_table import StationTable
+    from data.triangulation import charger_triangulation
+    from profilage import compter_fichier
+
+    table = StationTable.charger(fichier_json)
+    if len(table) < 3:
+        print("Pas assez de stations pour planifier les tournées.")
+        return None
+    liste_adjacence = construire_adjacence(charger_triangulation(fichier_json))
+    velos, bornes = lire_niveaux(fichier_niveaux, table)
+    if fichier_cibles:
+        cibles = lire_colonne_csv(fichier_cibles, table, "cible")
+    else:
+        capacites = np.where(table.capacity > 0, table.capacity, np.where(bornes >= 0, velos + bornes, -1))
+        cibles = np.where(capacites >= 0, np.rint(taux_cible * capacites), -1).astype(np.int64)
+    plan = planifier_tournees(table, liste_adjacence, velos, cibles, **options)
+    ecarts = np.where((velos >= 0) & (cibles >= 0), velos - cibles, 0)
+
+    Path(fichier_plan).parent.mkdir(parents=True, exist_ok=True)
+    with open(fichier_plan, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=4, ensure_ascii=False)
+    compter_fichier(fichier_plan)
+
+    if fichier_carte:
+        from visualization.carte_tournees import carte_tournees
+        from visualization.rendu_geojson import sauvegarder_carte
+        sauvegarder_carte(carte_tournees(table, ecarts, plan), fichier_carte)
+    return plan
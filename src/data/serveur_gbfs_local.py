@@ -0,0 +1,86 @@
+"""
+Serveur HTTP local servant des fichiers GBFS depuis un dossier, pour tester la récupération
+des flux sans accès au réseau. Il gère les en-têtes ETag / Last-Modified et répond 304
+aux requêtes conditionnelles lorsque le fichier n'a pas changé.
+"""
+import argparse  # Pour lire les options de la ligne de commande
+import hashlib  # Pour calculer l'ETag des fichiers
+import threading  # Pour faire tourner le serveur en arrière-plan
+from email.utils import formatdate, parsedate_to_datetime  # Pour les dates HTTP
+from functools import partial  # Pour passer le dossier servi au gestionnaire de requêtes
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Serveur HTTP standard
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+###################################################################################################
+###################################################################################################
+
+class GestionnaireGBFS(BaseHTTPRequestHandler):
+    """Sert les fichiers JSON d'un dossier avec prise en charge des requêtes conditionnelles."""
+
+    def __init__(self, *args, dossier=".", **kwargs):
+        self.dossier = Path(dossier).resolve()
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        # Ne servir que les fichiers situés directement dans le dossier
+        chemin = self.dossier / Path(self.path.split("?", 1)[0]).name
+        if not chemin.is_file():
+            self.send_error(404, "Flux introuvable")
+            return
+
+        contenu = chemin.read_bytes()
+        etag = '"' + hashlib.sha256(contenu).hexdigest()[:32] + '"'
+        modification = int(chemin.stat().st_mtime)
+
+        # Requête conditionnelle : 304 si le client possède déjà cette version
+        if self.headers.get("If-None-Match") == etag or self._non_modifie(modification):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(contenu)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(modification, usegmt=True))
+        self.end_headers()
+        self.wfile.write(contenu)
+
+    # Vérifier l'en-tête If-Modified-Since (ignoré si If-None-Match est présent)
+    def _non_modifie(self, modification):
+        valeur = self.headers.get("If-Modified-Since")
+        if valeur is None or "If-None-Match" in self.headers:
+            return False
+        try:
+            return modification <= parsedate_to_datetime(valeur).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def log_message(self, format, *args):
+        pass  # Pas de journal à chaque requête
+
+###################################################################################################
+###################################################################################################
+
+# Démarrer le serveur en arrière-plan
+def demarrer_serveur(dossier, hote="127.0.0.1", port=0):
+    """Retourne (serveur, url_base) ; `port=0` choisit un port libre. Arrêt : serveur.shutdown()."""
+    serveur = ThreadingHTTPServer((hote, port), partial(GestionnaireGBFS, dossier=dossier))
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur, f"http://{hote}:{serveur.server_port}/"
+
+
+# Code principal
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servir localement des fichiers GBFS")
+    parser.add_argument("dossier", help="Dossier contenant les fichiers GBFS (station_information.json...)")
+    parser.add_argument("--port", type=int, default=8000, help="Port d'écoute")
+    args = parser.parse_args()
+
+    serveur = ThreadingHTTPServer(("127.0.0.1", args.port), partial(GestionnaireGBFS, dossier=args.dossier))
+    print(f"Flux GBFS servis sur http://127.0.0.1:{args.port}/ (Ctrl+C pour arrêter)")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        serveur.server_close()
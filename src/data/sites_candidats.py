@@ -0,0 +1,325 @@
+"""
+Évaluation de sites candidats pour de nouvelles stations : pour chaque candidat, seule la partie
+de la triangulation de Delaunay touchée par son insertion est calculée (la cavité de Bowyer-Watson,
+formée des triangles dont le cercle circonscrit contient le candidat). On en déduit les nouveaux
+voisins du candidat, les arêtes supprimées, et la variation du nombre de voisins et de l'indice de
+répartition des stations touchées. Les candidats sont répartis par lots entre plusieurs processus,
+puis classés.
+
+Chaque candidat est évalué seul, par rapport au réseau actuel (les candidats ne s'influencent pas
+entre eux) ; la capacité médiane utilisée par l'indice reste celle du réseau actuel.
+"""
+import os  # Pour connaître le nombre de processeurs
+from concurrent.futures import ProcessPoolExecutor  # Pour répartir les lots entre les processus
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.indice_repartition import indice_repartition  # Indice de répartition (vectorisé)
+from profilage import initialiser_processus, mesure  # Mesure des étapes (option --profile)
+
+# Nombre de candidats par lot transmis à un processus
+TAILLE_LOT = 4096
+
+# Contexte de chaque processus d'évaluation (transmis une seule fois par processus)
+_CONTEXTE = None
+
+###################################################################################################
+###################################################################################################
+
+# Centre et carré du rayon du cercle circonscrit de chaque triangle
+def cercles_circonscrits(points, simplices):
+    a, b, c = (points[simplices[:, k]] for k in range(3))
+    b, c = b - a, c - a  # Coordonnées relatives au premier sommet (meilleure précision)
+    d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    nb, nc = (b ** 2).sum(axis=1), (c ** 2).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ux = (c[:, 1] * nb - b[:, 1] * nc) / d
+        uy = (b[:, 0] * nc - c[:, 0] * nb) / d
+    centres = a + np.column_stack((ux, uy))
+    return centres, ux ** 2 + uy ** 2
+
+class Contexte:
+    """Tableaux de la triangulation nécessaires à l'évaluation, sous forme de listes Python
+    (accès rapides dans la boucle sur les candidats), avec les indices actuels des stations."""
+
+    def __init__(self, tri, capacites, degres, alpha, voisins_cible, seuil):
+        points, simplices, voisins = tri.points, tri.simplices, tri.neighbors
+        centres, rayons2 = cercles_circonscrits(points, simplices)
+        self.cx, self.cy = centres[:, 0].tolist(), centres[:, 1].tolist()
+        # Tolérance relative : un candidat sur le cercle (points cocycliques) ne le perturbe pas
+        self.rayons2 = np.nan_to_num(rayons2 * (1 - 1e-9), nan=-1.0, posinf=-1.0).tolist()
+        self.simplices = [tuple(t) for t in simplices.tolist()]
+        self.voisins = [tuple(t) for t in voisins.tolist()]
+
+        # Triangles de chaque station (listes indexées par station)
+        ordre = np.argsort(simplices.ravel(), kind="stable")
+        bornes = np.searchsorted(simplices.ravel()[ordre], np.arange(len(points) + 1))
+        triangles = (ordre // 3).tolist()
+        self.triangles_sommet = [triangles[bornes[i]:bornes[i + 1]] for i in range(len(points))]
+
+        # Arêtes de l'enveloppe convexe : extrémités, triangle adjacent et côté intérieur
+        t, k = np.nonzero(voisins < 0)
+        a, b = simplices[t, (k + 1) % 3], simplices[t, (k + 2) % 3]
+        self.bord_a, self.bord_b = points[a], points[b]
+        oppose = points[simplices[t, k]]
+        self.bord_signe = np.sign(self._croix(self.bord_a, self.bord_b, oppose[:, 0], oppose[:, 1]))
+        self.bord_aretes, self.bord_triangles = list(zip(a.tolist(), b.tolist())), t.tolist()
+
+        self.capacites = np.asarray(capacites, dtype=np.float64)
+        self.degres = np.asarray(degres, dtype=np.int64)
+        self.C_med = float(np.median(self.capacites)) if len(self.capacites) else 0.0
+        self.alpha, self.voisins_cible, self.seuil = alpha, voisins_cible, seuil
+        self.indices = indice_repartition(self.degres, self.capacites, self.C_med, alpha, voisins_cible)
+
+    # Produit vectoriel (b - a) × (p - a), pour chaque arête (a, b) et chaque point p
+    @staticmethod
+    def _croix(a, b, x, y):
+        return (b[..., 0] - a[..., 0]) * (y - a[..., 1]) - (b[..., 1] - a[..., 1]) * (x - a[..., 0])
+
+    # Arêtes de l'enveloppe visibles depuis chaque point (points hors de l'enveloppe) : tableau (n, nb_aretes)
+    def aretes_visibles(self, x, y):
+        croix = self._croix(self.bord_a[None], self.bord_b[None], x[:, None], y[:, None])
+        return croix * self.bord_signe[None] < 0
+
+    # Cavité d'un point : triangles dont le cercle circonscrit le contient
+    def cavite(self, x, y, graines):
+        cx, cy, rayons2, voisins = self.cx, self.cy, self.rayons2, self.voisins
+        conflit = set()
+        pile = [t for t in graines if (x - cx[t]) ** 2 + (y - cy[t]) ** 2 < rayons2[t]]
+        while pile:
+            t = pile.pop()
+            if t in conflit:
+                continue
+            conflit.add(t)
+            for u in voisins[t]:
+                if u >= 0 and u not in conflit and (x - cx[u]) ** 2 + (y - cy[u]) ** 2 < rayons2[u]:
+                    pile.append(u)
+        return conflit
+
+    # Voisins d'un point après son insertion et arêtes supprimées par station
+    def inserer(self, x, y, proche, visibles):
+        """Retourne (voisins, retraits) : l'ensemble des stations voisines du nouveau point et,
+        pour chaque station, le nombre d'arêtes supprimées qui la touchent."""
+        graines = self.triangles_sommet[proche] + [self.bord_triangles[e] for e in visibles]
+        conflit = self.cavite(x, y, graines)
+        voisins = {s for t in conflit for s in self.simplices[t]}
+        retraits = {}
+        # Arêtes intérieures à la cavité : partagées par deux triangles en conflit
+        for t in conflit:
+            sommets = self.simplices[t]
+            for k, u in enumerate(self.voisins[t]):
+                if u > t and u in conflit:
+                    for s in (sommets[(k + 1) % 3], sommets[(k + 2) % 3]):
+                        retraits[s] = retraits.get(s, 0) + 1
+        # Hors de l'enveloppe : le point est relié aux extrémités des arêtes visibles, et une arête
+        # visible dont le triangle est dans la cavité disparaît
+        for e in visibles:
+            a, b = self.bord_aretes[e]
+            voisins.update((a, b))
+            if self.bord_triangles[e] in conflit:
+                retraits[a] = retraits.get(a, 0) + 1
+                retraits[b] = retraits.get(b, 0) + 1
+        return voisins, retraits
+
+###################################################################################################
+###################################################################################################
+
+# Transmettre le contexte à chaque processus d'évaluation
+def _initialiser(contexte):
+    global _CONTEXTE
+    _CONTEXTE = contexte
+
+# Évaluer un lot de candidats (dans un processus du pool)
+def _evaluer(lot):
+    """Retourne les résultats du lot : tableaux par candidat, et détails par station touchée
+    (numéro du candidat, station, voisins avant et après, indice avant et après)."""
+    c = _CONTEXTE
+    numeros, x, y, capacites, proches = lot
+    visibles = c.aretes_visibles(x, y) if len(c.bord_triangles) else np.zeros((len(x), 0), dtype=bool)
+    hors_enveloppe = visibles.any(axis=1)
+
+    nb_voisins = np.zeros(len(x), dtype=np.int64)
+    candidats, stations, degres_apres = [], [], []
+    for j, (xj, yj, proche) in enumerate(zip(x.tolist(), y.tolist(), proches.tolist())):
+        aretes = np.flatnonzero(visibles[j]).tolist() if hors_enveloppe[j] else []
+        voisins, retraits = c.inserer(xj, yj, proche, aretes)
+        nb_voisins[j] = len(voisins)
+        for s in voisins:
+            candidats.append(j)
+            stations.append(s)
+            degres_apres.append(c.degres[s] - retraits.get(s, 0) + 1)
+
+    candidats, stations = np.array(candidats, dtype=np.int64), np.array(stations, dtype=np.int64)
+    degres_apres = np.array(degres_apres, dtype=np.int64)
+    avant = c.indices[stations]
+    apres = indice_repartition(degres_apres, c.capacites[stations], c.C_med, c.alpha, c.voisins_cible)
+    apres = np.atleast_1d(apres)
+    indice = np.atleast_1d(indice_repartition(nb_voisins, capacites, c.C_med, c.alpha, c.voisins_cible))
+
+    # Gain : réduction de l'écart total à l'indice idéal (0), nouvelle station comprise
+    n = len(x)
+    gain = np.bincount(candidats, np.abs(avant) - np.abs(apres), minlength=n) - np.abs(indice)
+    valide = nb_voisins > 0  # Candidat confondu avec une station existante : aucune insertion
+    return {
+        "numeros": numeros,
+        "nb_voisins": nb_voisins,
+        "hors_enveloppe": hors_enveloppe,
+        "indice": np.where(valide, indice, np.nan),
+        "stations_touchees": np.bincount(candidats, minlength=n),
+        "variation_voisins": np.bincount(candidats, degres_apres - c.degres[stations], minlength=n).astype(np.int64),
+        "sous_seuil_avant": np.bincount(candidats, avant < c.seuil, minlength=n).astype(np.int64),
+        "sous_seuil_apres": (np.bincount(candidats, apres < c.seuil, minlength=n)
+                             + (valide & (indice < c.seuil))).astype(np.int64),
+        "gain": np.where(valide, gain, np.nan),
+        "details": (numeros[candidats], stations, c.degres[stations], degres_apres, avant, apres),
+    }
+
+###################################################################################################
+###################################################################################################
+
+# Évaluer un lot de sites candidats et les classer
+@mesure("sites_candidats", lambda resultats: {"candidats": len(resultats["gain"])})
+def evaluer_candidats(table, tri, lat, lon, capacites=None, alpha=0.5, voisins_cible=6, seuil=0.0,
+                      processus=None, taille_lot=TAILLE_LOT):
+    """`capacites` vaut par défaut la capacité médiane des stations. Retourne un dictionnaire de
+    tableaux alignés sur les candidats (nb_voisins, indice, stations_touchees, variation_voisins,
+    sous_seuil_avant, sous_seuil_apres, gain, rang) et les détails par station touchée
+    (`details_offsets` : les lignes du candidat j sont details_*[offsets[j]:offsets[j + 1]]).
+
+    Le gain est la réduction de la somme des |indice| des stations touchées, moins |indice| de la
+    nouvelle station ; le rang 1 est le meilleur candidat.
+    """
+    from scipy.spatial import cKDTree  # Import coûteux, seulement si nécessaire
+
+    lat, lon = np.atleast_1d(np.asarray(lat, dtype=np.float64)), np.atleast_1d(np.asarray(lon, dtype=np.float64))
+    degres = np.diff(tri.vertex_neighbor_vertices[0])
+    contexte = Contexte(tri, table.capacity, degres, alpha, voisins_cible, seuil)
+    if capacites is None:
+        capacites = contexte.C_med
+    capacites = np.broadcast_to(np.asarray(capacites, dtype=np.float64), lat.shape)
+
+    # Station la plus proche de chaque candidat parmi les sommets de la triangulation (les stations
+    # aux coordonnées en double n'en font pas partie) : elle devient toujours voisine du candidat
+    sommets = np.unique(tri.simplices)
+    _, proches = cKDTree(tri.points[sommets]).query(np.column_stack((lat, lon)))
+    proches = sommets[proches]
+
+    lots = [(np.arange(i, min(i + taille_lot, len(lat))), lat[i:i + taille_lot], lon[i:i + taille_lot],
+             capacites[i:i + taille_lot], proches[i:i + taille_lot]) for i in range(0, len(lat), taille_lot)]
+    processus = min(processus or os.cpu_count(), max(len(lots), 1))
+    if processus <= 1:
+        _initialiser(contexte)
+        resultats = list(map(_evaluer, lots))
+    else:
+        with ProcessPoolExecutor(processus, initializer=initialiser_processus,
+                                 initargs=(_initialiser, contexte)) as executeur:
+            resultats = list(executeur.map(_evaluer, lots))
+
+    cles = ("nb_voisins", "hors_enveloppe", "indice", "stations_touchees", "variation_voisins",
+            "sous_seuil_avant", "sous_seuil_apres", "gain")
+    evaluation = {cle: np.concatenate([r[cle] for r in resultats]) if resultats else np.zeros(0)
+                  for cle in cles}
+    details = [np.concatenate(colonne) for colonne in zip(*(r["details"] for r in resultats))] if resultats else []
+    for cle, colonne in zip(("candidat", "station", "voisins_avant", "voisins_apres",
+                             "indice_avant", "indice_apres"), details):
+        evaluation[f"details_{cle}"] = colonne
+    evaluation["details_offsets"] = np.concatenate(([0], np.cumsum(evaluation["stations_touchees"])))
+
+    # Classement : gain décroissant (les candidats invalides en dernier)
+    ordre = np.argsort(np.where(np.isnan(evaluation["gain"]), np.inf, -evaluation["gain"]), kind="stable")
+    rang = np.empty(len(ordre), dtype=np.int64)
+    rang[ordre] = np.arange(1, len(ordre) + 1)
+    evaluation.update(lat=lat, lon=lon, capacite=capacites.copy(), rang=rang)
+    return evaluation
+
+# Grille régulière de candidats (pas en mètres) sur l'emprise des stations
+def grille_candidats(table, pas=100.0):
+    """Retourne (lat, lon) des nœuds de la grille."""
+    from data.geo import deprojeter, projeter
+
+    lat0, lon0 = float(table.lat.mean()), float(table.lon.mean())
+    xy = projeter(table.lat, table.lon, lat0, lon0)
+    xs = np.arange(xy[:, 0].min(), xy[:, 0].max() + pas / 2, pas)
+    ys = np.arange(xy[:, 1].min(), xy[:, 1].max() + pas / 2, pas)
+    grille = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
+    coordonnees = deprojeter(grille, lat0, lon0)
+    return coordonnees[:, 0], coordonnees[:, 1]
+
+###################################################################################################
+###################################################################################################
+
+# Évaluer des candidats (fichier CSV ou grille) et écrire le classement et les détails
+def generer_evaluation(fichier_json="station_informations.json", fichier_candidats=None, pas_grille=100.0,
+                       capacite=None, output_dir="results/analysis", nb_details=20, **options):
+    """Les candidats sont lus dans `fichier_candidats` (CSV lat, lon et éventuellement capacite),
+    ou forment une grille de pas `pas_grille` mètres. Écrit `candidats.csv` (un candidat par ligne,
+    dans l'ordre du classement), `candidats.npz` (tous les tableaux, détails compris) et
+    `candidats.json` (les `nb_details` meilleurs candidats et leurs stations touchées) dans
+    `output_dir`. Les autres options sont transmises à `evaluer_candidats`. Retourne l'évaluation
+    (None s'il y a moins de 3 stations)."""
+    import csv  # Pour lire les candidats et écrire le classement
+    import json  # Pour écrire les meilleurs candidats
+    from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+    from data.station_table import StationTable
+    from data.triangulation import charger_triangulation
+    from profilage import compter_fichier
+
+    table = StationTable.charger(fichier_json)
+    if len(table) < 3:
+        print("Pas assez de stations pour évaluer des candidats.")
+        return None
+    if fichier_candidats:
+        with open(fichier_candidats, "r", encoding="utf-8", newline="") as f:
+            lignes = list(csv.DictReader(f))
+        lat = np.array([float(ligne["lat"]) for ligne in lignes])
+        lon = np.array([float(ligne["lon"]) for ligne in lignes])
+        if lignes and "capacite" in lignes[0]:
+            capacite = np.array([float(ligne["capacite"] or np.nan) for ligne in lignes])
+            capacite = np.where(np.isnan(capacite), np.median(table.capacity), capacite)
+    else:
+        lat, lon = grille_candidats(table, pas_grille)
+    evaluation = evaluer_candidats(table, charger_triangulation(fichier_json), lat, lon, capacite, **options)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / "candidats.npz", "wb") as f:
+        np.savez_compressed(f, **evaluation)
+    compter_fichier(output_dir / "candidats.npz")
+
+    ordre = np.argsort(evaluation["rang"])
+    colonnes = ("rang", "lat", "lon", "capacite", "nb_voisins", "indice", "stations_touchees",
+                "variation_voisins", "sous_seuil_avant", "sous_seuil_apres", "gain")
+    with open(output_dir / "candidats.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(colonnes)
+        writer.writerows(zip(*(np.round(evaluation[cle][ordre], 6).tolist() for cle in colonnes)))
+    compter_fichier(output_dir / "candidats.csv")
+
+    offsets = evaluation["details_offsets"]
+    meilleurs = []
+    for j in ordre[:nb_details].tolist():
+        lignes = range(offsets[j], offsets[j + 1])
+        meilleurs.append({
+            "rang": int(evaluation["rang"][j]),
+            "lat": float(lat[j]),
+            "lon": float(lon[j]),
+            "capacite": float(evaluation["capacite"][j]),
+            "nb_voisins": int(evaluation["nb_voisins"][j]),
+            "indice": float(evaluation["indice"][j]),
+            "gain": float(evaluation["gain"][j]),
+            "stations_touchees": [
+                {
+                    "station_id": table.station_id[s].item(),
+                    "nom": table.nom(s),
+                    "voisins_avant": int(evaluation["details_voisins_avant"][k]),
+                    "voisins_apres": int(evaluation["details_voisins_apres"][k]),
+                    "indice_avant": round(float(evaluation["details_indice_avant"][k]), 4),
+                    "indice_apres": round(float(evaluation["details_indice_apres"][k]), 4),
+                }
+                for k, s in zip(lignes, evaluation["details_station"][offsets[j]:offsets[j + 1]].tolist())
+            ],
+        })
+    with open(output_dir / "candidats.json", "w", encoding="utf-8") as f:
+        json.dump(meilleurs, f, indent=4, ensure_ascii=False)
+    compter_fichier(output_dir / "candidats.json")
+    return evaluation
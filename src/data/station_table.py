@@ -0,0 +1,182 @@
+"""
+Table des stations en colonnes : le fichier GBFS `station_information` n'est analysé qu'une seule fois
+puis converti en tableaux NumPy contigus (identifiant, latitude, longitude, capacité, noms),
+sauvegardés dans un artefact du cache et rechargés en quelques millisecondes.
+"""
+import json  # Pour manipuler les fichiers JSON
+from functools import cached_property  # Pour ne construire l'index qu'à la première utilisation
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.cache import DOSSIER_CACHE, chemin_artefact, ecrire_atomique, elaguer_artefacts, empreinte_fichier
+from profilage import mesure
+
+# Version du format de l'artefact (à incrémenter si son contenu change)
+VERSION_FORMAT = 1
+
+###################################################################################################
+###################################################################################################
+
+# Nom d'une station : chaîne (GBFS 2) ou liste de traductions [{"text", "language"}] (GBFS 3)
+def nom_station(station):
+    nom = station.get("name") or "Inconnu"
+    if isinstance(nom, list):
+        nom = nom[0].get("text", "Inconnu") if nom else "Inconnu"
+    return nom
+
+# Convertir les identifiants des stations en tableau NumPy (entiers si possible, sinon chaînes)
+def tableau_ids(station_ids):
+    ids = np.asarray(station_ids)
+    if ids.dtype == object or ids.dtype.kind == "f":
+        ids = ids.astype(str)  # Identifiants de types mélangés : tout convertir en chaînes
+    return ids
+
+###################################################################################################
+###################################################################################################
+
+class StationTable:
+    """Stations Vélib' stockées en colonnes, dans l'ordre du fichier source.
+
+    Attributs :
+        station_id : identifiants des stations (entiers, ou chaînes si le flux en contient).
+        lat, lon : coordonnées des stations (float64).
+        capacity : capacité des stations (int32, 0 si absente).
+        noms, noms_offsets : noms encodés en UTF-8 et concaténés ; le nom de la station i
+            occupe noms[noms_offsets[i]:noms_offsets[i + 1]].
+        ordre : permutation qui trie `station_id`, pour les recherches vectorisées.
+    """
+
+    def __init__(self, station_id, lat, lon, capacity, noms, noms_offsets, ordre=None):
+        self.station_id = station_id
+        self.lat = lat
+        self.lon = lon
+        self.capacity = capacity
+        self.noms = noms
+        self.noms_offsets = noms_offsets
+        self.ordre = np.argsort(station_id, kind="stable") if ordre is None else ordre
+
+    def __len__(self):
+        return len(self.station_id)
+
+    # Construire la table à partir de la liste de stations du flux GBFS
+    @classmethod
+    def depuis_stations(cls, stations):
+        noms = [nom_station(station).encode("utf-8") for station in stations]
+        longueurs = np.fromiter((len(nom) for nom in noms), dtype=np.int64, count=len(noms))
+        return cls(
+            tableau_ids([station["station_id"] for station in stations]),
+            np.array([station["lat"] for station in stations], dtype=np.float64),
+            np.array([station["lon"] for station in stations], dtype=np.float64),
+            np.array([station.get("capacity") or 0 for station in stations], dtype=np.int32),
+            np.frombuffer(b"".join(noms), dtype=np.uint8),
+            np.concatenate(([0], np.cumsum(longueurs))),
+        )
+
+    # Table sans aucune station
+    @classmethod
+    def vide(cls):
+        return cls.depuis_stations([])
+
+    # Nouvelle table : cette table suivie des lignes `lignes` d'une autre table
+    def etendre(self, autre, lignes):
+        lignes = np.asarray(lignes, dtype=np.int64)
+        ids_ajoutes = autre.station_id[lignes]
+        if ids_ajoutes.dtype.kind != self.station_id.dtype.kind:
+            station_id = np.concatenate((self.station_id.astype(str), ids_ajoutes.astype(str)))
+        else:
+            station_id = np.concatenate((self.station_id, ids_ajoutes))
+        noms = [autre.noms[autre.noms_offsets[i]:autre.noms_offsets[i + 1]] for i in lignes.tolist()]
+        longueurs = np.array([len(nom) for nom in noms], dtype=np.int64)
+        return StationTable(
+            station_id,
+            np.concatenate((self.lat, autre.lat[lignes])),
+            np.concatenate((self.lon, autre.lon[lignes])),
+            np.concatenate((self.capacity, autre.capacity[lignes])),
+            np.concatenate([self.noms] + noms).astype(np.uint8),
+            np.concatenate((self.noms_offsets, self.noms_offsets[-1] + np.cumsum(longueurs))),
+        )
+
+    # Sauvegarder la table dans un artefact .npz
+    def sauvegarder(self, chemin):
+        ecrire_atomique(chemin, lambda fichier: np.savez(
+            fichier,
+            version=VERSION_FORMAT,
+            station_id=self.station_id,
+            lat=self.lat,
+            lon=self.lon,
+            capacity=self.capacity,
+            noms=self.noms,
+            noms_offsets=self.noms_offsets,
+            ordre=self.ordre,
+        ))
+
+    # Recharger une table depuis un artefact .npz
+    @classmethod
+    def depuis_fichier(cls, chemin):
+        with np.load(chemin) as donnees:
+            if int(donnees["version"]) != VERSION_FORMAT:
+                raise ValueError(f"Format d'artefact obsolète : {chemin}")
+            return cls(*(donnees[nom] for nom in
+                         ("station_id", "lat", "lon", "capacity", "noms", "noms_offsets", "ordre")))
+
+    ###############################################################################################
+
+    # Coordonnées (latitude, longitude) de toutes les stations
+    @property
+    def coordonnees(self):
+        return np.column_stack((self.lat, self.lon))
+
+    # Nom de la station à la ligne i
+    def nom(self, i):
+        return self.noms[self.noms_offsets[i]:self.noms_offsets[i + 1]].tobytes().decode("utf-8")
+
+    # Noms de toutes les stations
+    def liste_noms(self):
+        texte = self.noms.tobytes()
+        bornes = self.noms_offsets.tolist()
+        return [texte[bornes[i]:bornes[i + 1]].decode("utf-8") for i in range(len(self))]
+
+    # Index identifiant → numéro de ligne (table de hachage construite une seule fois)
+    @cached_property
+    def index(self):
+        return dict(zip(self.station_id.tolist(), range(len(self))))
+
+    # Numéro de ligne d'une station (KeyError si elle est inconnue)
+    def ligne(self, station_id):
+        if isinstance(station_id, str) and self.station_id.dtype.kind in "iu":
+            station_id = int(station_id)  # Identifiant reçu sous forme de texte (clé JSON)
+        return self.index[station_id]
+
+    # Numéros de ligne d'un tableau d'identifiants (-1 pour les stations inconnues)
+    def lignes(self, station_ids):
+        station_ids = np.asarray(station_ids)
+        if len(self) == 0:
+            return np.full(station_ids.shape, -1, dtype=np.int64)
+        if station_ids.dtype.kind != self.station_id.dtype.kind:
+            station_ids = station_ids.astype(self.station_id.dtype)
+        tries = self.station_id[self.ordre]
+        positions = np.searchsorted(tries, station_ids).clip(max=len(self) - 1)
+        trouve = tries[positions] == station_ids
+        return np.where(trouve, self.ordre[positions], -1)
+
+    # Charger la table d'un fichier GBFS (depuis le cache si le fichier n'a pas changé)
+    @classmethod
+    @mesure("chargement_stations", lambda table: {"stations": len(table)})
+    def charger(cls, fichier_json="station_informations.json", dossier_cache=DOSSIER_CACHE):
+        """Retourne la table des stations de `fichier_json`.
+
+        Le fichier JSON n'est analysé que si aucun artefact ne correspond à son contenu actuel.
+        """
+        chemin = chemin_artefact("stations", empreinte_fichier(fichier_json), dossier_cache)
+        if chemin.exists():
+            try:
+                return cls.depuis_fichier(chemin)
+            except (OSError, KeyError, ValueError) as e:
+                # Artefact illisible ou obsolète : on le reconstruit
+                print(f"Artefact de la table des stations ignoré ({e}), reconstruction en cours...")
+
+        with open(fichier_json, "r", encoding="utf-8") as fichier:
+            data = json.load(fichier)  # Charger le contenu du fichier JSON
+        table = cls.depuis_stations(data.get("data", {}).get("stations", []))
+        table.sauvegarder(chemin)
+        elaguer_artefacts(chemin)
+        return table
@@ -0,0 +1,176 @@
+"""
+Triangulation de Delaunay (et diagramme de Voronoi dual) des stations, calculée une seule fois.
+Le résultat est sauvegardé dans un artefact du cache indexé par l'empreinte du fichier des stations,
+puis rechargé directement par tous les scripts tant que ce fichier ne change pas.
+"""
+from functools import cached_property  # Pour ne reconstruire les régions qu'une seule fois
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from data.cache import DOSSIER_CACHE, chemin_artefact, ecrire_atomique, elaguer_artefacts, empreinte_fichier
+from data.station_table import StationTable
+from profilage import mesure
+
+# Version du format de l'artefact (à incrémenter si son contenu change)
+VERSION_FORMAT = 1
+
+###################################################################################################
+###################################################################################################
+
+class Triangulation:
+    """Triangulation de Delaunay des stations, avec les mêmes attributs que `scipy.spatial.Delaunay`.
+
+    Attributs :
+        points : coordonnées (latitude, longitude) des stations, dans l'ordre du fichier source.
+        simplices : indices des sommets de chaque triangle.
+        neighbors : indices des triangles voisins de chaque triangle (-1 sur le bord).
+        vertex_neighbor_vertices : couple (indptr, indices) donnant les voisins de chaque station.
+        voronoi : diagramme de Voronoi dual (voir `Voronoi`).
+    """
+
+    def __init__(self, points, simplices, neighbors, indptr, indices, voronoi):
+        self.points = points
+        self.simplices = simplices
+        self.neighbors = neighbors
+        self.vertex_neighbor_vertices = (indptr, indices)
+        self.voronoi = voronoi
+
+    # Sauvegarder la triangulation dans un artefact .npz
+    def sauvegarder(self, chemin):
+        indptr, indices = self.vertex_neighbor_vertices
+        ecrire_atomique(chemin, lambda fichier: np.savez(
+            fichier,
+            version=VERSION_FORMAT,
+            points=self.points,
+            simplices=self.simplices,
+            neighbors=self.neighbors,
+            indptr=indptr,
+            indices=indices,
+            **self.voronoi.tableaux(),
+        ))
+
+    # Recharger une triangulation depuis un artefact .npz
+    @classmethod
+    def depuis_fichier(cls, chemin):
+        with np.load(chemin) as donnees:
+            if int(donnees["version"]) != VERSION_FORMAT:
+                raise ValueError(f"Format d'artefact obsolète : {chemin}")
+            return cls(
+                donnees["points"],
+                donnees["simplices"],
+                donnees["neighbors"],
+                donnees["indptr"],
+                donnees["indices"],
+                Voronoi.depuis_tableaux(donnees),
+            )
+
+###################################################################################################
+###################################################################################################
+
+class Voronoi:
+    """Diagramme de Voronoi, avec les attributs de `scipy.spatial.Voronoi` utilisés par le projet.
+
+    Les régions sont stockées à plat (`regions_indices` découpé par `regions_offsets`)
+    et l'attribut `regions` reconstruit la liste de listes attendue par le code existant.
+    """
+
+    furthest_site = False  # Attribut lu par scipy.spatial.voronoi_plot_2d
+
+    def __init__(self, points, vertices, ridge_points, ridge_vertices, regions_indices,
+                 regions_offsets, point_region):
+        self.points = points
+        self.vertices = vertices
+        self.ridge_points = ridge_points
+        self.ridge_vertices = ridge_vertices
+        self.regions_indices = regions_indices
+        self.regions_offsets = regions_offsets
+        self.point_region = point_region
+
+    # Reconstituer la liste des régions (une liste d'indices de sommets par région)
+    @cached_property
+    def regions(self):
+        return [r.tolist() for r in np.split(self.regions_indices, self.regions_offsets[1:-1])]
+
+    # Construire le diagramme à partir d'un objet scipy.spatial.Voronoi
+    @classmethod
+    def depuis_scipy(cls, vor):
+        longueurs = np.array([len(region) for region in vor.regions], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(longueurs)))
+        indices = (np.concatenate([np.asarray(r, dtype=np.int64) for r in vor.regions])
+                   if offsets[-1] else np.empty(0, dtype=np.int64))
+        return cls(
+            vor.points,
+            vor.vertices,
+            vor.ridge_points,
+            np.asarray(vor.ridge_vertices, dtype=np.int64).reshape(-1, 2),
+            indices,
+            offsets,
+            vor.point_region,
+        )
+
+    # Tableaux à sauvegarder dans l'artefact
+    def tableaux(self):
+        return {
+            "vor_vertices": self.vertices,
+            "vor_ridge_points": self.ridge_points,
+            "vor_ridge_vertices": self.ridge_vertices,
+            "vor_regions_indices": self.regions_indices,
+            "vor_regions_offsets": self.regions_offsets,
+            "vor_point_region": self.point_region,
+        }
+
+    # Reconstruire le diagramme à partir des tableaux de l'artefact
+    @classmethod
+    def depuis_tableaux(cls, donnees):
+        return cls(
+            donnees["points"],
+            donnees["vor_vertices"],
+            donnees["vor_ridge_points"],
+            donnees["vor_ridge_vertices"],
+            donnees["vor_regions_indices"],
+            donnees["vor_regions_offsets"],
+            donnees["vor_point_region"],
+        )
+
+###################################################################################################
+###################################################################################################
+
+# Calculer la triangulation de Delaunay et le diagramme de Voronoi d'un ensemble de points
+def calculer_triangulation(points):
+    from scipy.spatial import Delaunay, Voronoi as VoronoiScipy  # Import coûteux, seulement si nécessaire
+
+    tri = Delaunay(points)  # Effectuer la triangulation de Delaunay
+    indptr, indices = tri.vertex_neighbor_vertices  # Voisins de chaque station
+    vor = VoronoiScipy(points)  # Calculer le diagramme de Voronoi
+    return Triangulation(
+        np.asarray(points, dtype=np.float64),
+        tri.simplices,
+        tri.neighbors,
+        indptr,
+        indices,
+        Voronoi.depuis_scipy(vor),
+    )
+
+###################################################################################################
+###################################################################################################
+
+# Charger la triangulation des stations depuis le cache (ou la calculer si besoin)
+@mesure("triangulation", lambda tri: {"simplexes": len(tri.simplices)})
+def charger_triangulation(fichier_json="station_informations.json", dossier_cache=DOSSIER_CACHE):
+    """Retourne la triangulation des stations du fichier `fichier_json`.
+
+    Si un artefact correspondant au contenu actuel du fichier existe dans `dossier_cache`,
+    il est rechargé directement ; sinon la triangulation est calculée puis sauvegardée.
+    """
+    chemin = chemin_artefact("triangulation", empreinte_fichier(fichier_json), dossier_cache)
+    if chemin.exists():
+        try:
+            return Triangulation.depuis_fichier(chemin)
+        except (OSError, KeyError, ValueError) as e:
+            # Artefact illisible ou obsolète : on le recalcule
+            print(f"Artefact de triangulation ignoré ({e}), recalcul en cours...")
+
+    tri = calculer_triangulation(StationTable.charger(fichier_json, dossier_cache).coordonnees)
+    tri.sauvegarder(chemin)
+    elaguer_artefacts(chemin)
+    return tri
+
@@ -6,12 +6,21 @@ import argparse
 import sys
 from pathlib import Path
 
-# Ajout du répertoire parent au chemin Python pour les imports
-sys.path.append(str(Path(__file__).parent.parent))
+# Ajout du répertoire src au chemin Python pour les imports
+# (les modules lourds - folium, matplotlib, scipy... - ne sont importés que par la commande qui s'en sert)
+sys.path.append(str(Path(__file__).resolve().parent))
 
 def main():
     parser = argparse.ArgumentParser(description="Analyse des données Vélib'")
     
+    # Profilage des étapes (durée, temps CPU, pic de mémoire, compteurs)
+    parser.add_argument('--profile', action='store_true',
+                        help='Mesurer chaque étape et écrire un rapport JSON')
+    parser.add_argument('--profile-output', type=str, default='results/profile.json',
+                        help='Fichier du rapport de profilage')
+    parser.add_argument('--profile-cprofile', type=str, default=None,
+                        help='Dossier où écrire un profil cProfile (.prof) par étape')
+    
     # Sous-commandes
     subparsers = parser.add_subparsers(dest='command', help='Commandes disponibles')
     
@@ -19,11 +28,175 @@ def main():
     map_parser = subparsers.add_parser('generate-map', help='Générer la carte des stations')
     map_parser.add_argument('--output', '-o', type=str, default='results/maps/stations_map.html',
                           help='Fichier de sortie pour la carte')
+    map_parser.add_argument('--stations', type=str, default='station_informations.json',
+                          help='Fichier GBFS des stations')
     
     # Commande pour analyser la répartition
     analyze_parser = subparsers.add_parser('analyze', help='Analyser la répartition des stations')
     analyze_parser.add_argument('--output-dir', '-o', type=str, default='results/analysis',
                               help='Dossier de sortie pour les analyses')
+    analyze_parser.add_argument('--stations', type=str, default='station_informations.json',
+                              help='Fichier GBFS des stations')
+    analyze_parser.add_argument('--alpha', type=float, default=0.5,
+                              help="Poids du nombre de voisins dans l'indice de répartition")
+    
+    # Commande pour balayer une grille de paramètres de l'indice de répartition (sans carte)
+    sweep_parser = subparsers.add_parser('sweep', help="Balayer les paramètres de l'indice de répartition")
+    sweep_parser.add_argument('--stations', type=str, default='station_informations.json',
+                            help='Fichier GBFS des stations')
+    sweep_parser.add_argument('--output-dir', '-o', type=str, default='results/analysis',
+                            help='Dossier de balayage.npz et balayage.csv')
+    sweep_parser.add_argument('--alphas', type=float, nargs='+', default=[i / 10 for i in range(11)],
+                            help='Valeurs de alpha (par défaut : 0 à 1 par pas de 0,1)')
+    sweep_parser.add_argument('--neighbors', type=float, nargs='+', default=[4, 5, 6, 7, 8],
+                            help='Nombres de voisins idéaux (par défaut : 4 à 8)')
+    sweep_parser.add_argument('--threshold', type=float, default=0.0,
+                            help='Seuil sous lequel une station est comptée comme mal desservie')
+    
+    # Commande pour évaluer des sites candidats pour de nouvelles stations
+    candidates_parser = subparsers.add_parser('candidates', help='Évaluer et classer des sites candidats')
+    candidates_parser.add_argument('--stations', type=str, default='station_informations.json',
+                                 help='Fichier GBFS des stations')
+    candidates_parser.add_argument('--input', '-i', type=str, default=None,
+                                 help='Candidats : CSV (lat, lon et éventuellement capacite)')
+    candidates_parser.add_argument('--grid', type=float, default=100.0,
+                                 help='Sans --input : pas de la grille de candidats (mètres)')
+    candidates_parser.add_argument('--capacity', type=float, default=None,
+                                 help='Capacité des candidats (par défaut : capacité médiane des stations)')
+    candidates_parser.add_argument('--output-dir', '-o', type=str, default='results/analysis',
+                                 help='Dossier de candidats.csv, candidats.npz et candidats.json')
+    candidates_parser.add_argument('--alpha', type=float, default=0.5,
+                                 help="Poids du nombre de voisins dans l'indice de répartition")
+    candidates_parser.add_argument('--neighbors', type=float, default=6,
+                                 help='Nombre de voisins idéal')
+    candidates_parser.add_argument('--threshold', type=float, default=0.0,
+                                 help='Seuil sous lequel une station est comptée comme mal desservie')
+    candidates_parser.add_argument('--top', type=int, default=20,
+                                 help='Nombre de meilleurs candidats détaillés dans candidats.json')
+    candidates_parser.add_argument('--jobs', '-j', type=int, default=None,
+                                 help='Nombre de processus (par défaut : un par processeur)')
+    
+    # Commande pour calculer l'indice de répartition dynamique sur l'historique des instantanés
+    dynamic_parser = subparsers.add_parser('dynamic-index',
+                                           help="Calculer l'indice dynamique sur l'historique d'occupation")
+    dynamic_parser.add_argument('--history', type=str, default='historique',
+                              help='Dossier de l\'historique des instantanés station_status')
+    dynamic_parser.add_argument('--output-dir', '-o', type=str, default='results/analysis',
+                              help="Dossier des résultats (indice_dynamique*.csv et .npz)")
+    dynamic_parser.add_argument('--days', type=float, default=None,
+                              help="Fenêtre : derniers jours de l'historique (par défaut : tout l'historique)")
+    dynamic_parser.add_argument('--alpha', type=float, default=0.5,
+                              help='Poids du terme de connectivité (nombre de voisins)')
+    dynamic_parser.add_argument('--neighbors', type=float, default=6,
+                              help='Nombre de voisins idéal')
+    dynamic_parser.add_argument('--timezone', type=str, default='Europe/Paris',
+                              help='Fuseau horaire des heures de la journée (vide : UTC)')
+    dynamic_parser.add_argument('--memory', type=float, default=64,
+                              help='Mémoire des blocs d\'instantanés traités à la fois (Mo)')
+    
+    # Commande pour analyser le graphe des stations (composantes, degrés, centralités)
+    graph_parser = subparsers.add_parser('graph', help='Analyser le graphe des stations')
+    graph_parser.add_argument('--stations', type=str, default='station_informations.json',
+                            help='Fichier GBFS des stations')
+    graph_parser.add_argument('--output-dir', '-o', type=str, default='results/analysis',
+                            help='Dossier de graphe.csv et graphe.json')
+    graph_parser.add_argument('--map', type=str, default='results/maps/velib_graphe_map.html',
+                            help='Fichier de la carte des centralités')
+    graph_parser.add_argument('--sources', type=int, default=256,
+                            help='Nombre de stations sources échantillonnées (0 : toutes, calcul exact)')
+    graph_parser.add_argument('--seed', type=int, default=0,
+                            help="Graine de l'échantillonnage des sources")
+    graph_parser.add_argument('--jobs', '-j', type=int, default=None,
+                            help='Nombre de processus (par défaut : un par processeur)')
+    
+    # Commande pour planifier les tournées de rééquilibrage des camions
+    rebalance_parser = subparsers.add_parser('rebalance', help='Planifier les tournées de rééquilibrage')
+    rebalance_parser.add_argument('--stations', type=str, default='station_informations.json',
+                                help='Fichier GBFS des stations')
+    rebalance_parser.add_argument('--status', type=str, default='station_status.json',
+                                help='Vélos de chaque station : flux station_status (JSON) ou CSV (station_id, velos)')
+    rebalance_parser.add_argument('--targets', type=str, default=None,
+                                help='Cibles de chaque station : CSV (station_id, cible)')
+    rebalance_parser.add_argument('--target-ratio', type=float, default=0.5,
+                                help='Cible par défaut, en part de la capacité de la station')
+    rebalance_parser.add_argument('--output', '-o', type=str, default='results/analysis/tournees.json',
+                                help='Fichier du plan des tournées')
+    rebalance_parser.add_argument('--map', type=str, default='results/maps/velib_tournees_map.html',
+                                help='Fichier de la carte des tournées')
+    rebalance_parser.add_argument('--trucks', type=int, default=3, help='Nombre de camions')
+    rebalance_parser.add_argument('--capacity', type=int, default=20, help='Capacité des camions (vélos)')
+    rebalance_parser.add_argument('--shift', type=float, default=240.0,
+                                help='Durée maximale de chaque tournée (minutes)')
+    rebalance_parser.add_argument('--speed', type=float, default=15.0, help='Vitesse moyenne des camions (km/h)')
+    rebalance_parser.add_argument('--service', type=float, default=5.0, help="Durée de chaque arrêt (minutes)")
+    rebalance_parser.add_argument('--depot', type=str, default=None,
+                                help='Position du dépôt « latitude,longitude » (par défaut : centre des stations)')
+    rebalance_parser.add_argument('--time-limit', type=float, default=20.0,
+                                help='Durée maximale de la recherche (secondes)')
+    rebalance_parser.add_argument('--seed', type=int, default=0, help='Graine de la recherche')
+    rebalance_parser.add_argument('--jobs', '-j', type=int, default=None,
+                                help='Nombre de recherches en parallèle (par défaut : une par processeur)')
+    
+    # Commande pour servir les stations, les indices et les recherches spatiales en JSON
+    serve_parser = subparsers.add_parser('serve', help='Servir les stations et les indices en JSON (HTTP)')
+    serve_parser.add_argument('--stations', type=str, default='station_informations.json',
+                            help='Fichier GBFS des stations (rechargé dès que son contenu change)')
+    serve_parser.add_argument('--host', type=str, default='127.0.0.1', help="Adresse d'écoute")
+    serve_parser.add_argument('--port', type=int, default=8080, help="Port d'écoute")
+    serve_parser.add_argument('--alpha', type=float, default=0.5,
+                            help="Poids du nombre de voisins dans l'indice de répartition")
+    serve_parser.add_argument('--reload-interval', type=float, default=2.0,
+                            help='Intervalle de surveillance du fichier des stations (secondes)')
+    serve_parser.add_argument('--cache-size', type=int, default=1024,
+                            help='Nombre de réponses /bbox gardées en cache')
+    
+    # Commande pour rendre toutes les cartes en parallèle
+    render_parser = subparsers.add_parser('render-all', help='Générer toutes les cartes en parallèle')
+    render_parser.add_argument('--stations', type=str, default='station_informations.json',
+                             help='Fichier GBFS des stations')
+    render_parser.add_argument('--output-dir', '-o', type=str, default='results/maps',
+                             help='Dossier des cartes HTML')
+    render_parser.add_argument('--jobs', '-j', type=int, default=None,
+                             help='Nombre de processus (par défaut : un par processeur)')
+    
+    # Commande pour calculer le raster de couverture (distance à la station la plus proche)
+    coverage_parser = subparsers.add_parser('coverage', help='Calculer le raster de couverture des stations')
+    coverage_parser.add_argument('--stations', type=str, default='station_informations.json',
+                               help='Fichier GBFS des stations')
+    coverage_parser.add_argument('--output-dir', '-o', type=str, default='results/analysis',
+                               help='Dossier de sortie du raster et de la carte de chaleur')
+    coverage_parser.add_argument('--resolution', '-r', type=float, default=10.0,
+                               help='Taille des cellules en mètres')
+    coverage_parser.add_argument('-k', type=int, default=2,
+                               help='Nombre de stations les plus proches (redondance)')
+    coverage_parser.add_argument('--tile', type=int, default=1024,
+                               help='Taille des tuiles (en cellules de côté)')
+    coverage_parser.add_argument('--jobs', '-j', type=int, default=None,
+                               help='Nombre de processus (par défaut : un par processeur)')
+    
+    # Commande pour exécuter tout le pipeline (seules les étapes dont les entrées ont changé)
+    run_parser = subparsers.add_parser('run-all', help='Exécuter toutes les analyses et cartes')
+    run_parser.add_argument('--stations', type=str, default='station_informations.json',
+                          help='Fichier GBFS des stations')
+    run_parser.add_argument('--output-dir', '-o', type=str, default='results',
+                          help='Dossier des résultats (analyses, cartes, liste d\'adjacence)')
+    run_parser.add_argument('--jobs', '-j', type=int, default=None,
+                          help='Nombre de processus (par défaut : un par processeur)')
+    run_parser.add_argument('--force', action='store_true',
+                          help='Réexécuter toutes les étapes, même inchangées')
+    
+    # Commande pour traiter plusieurs réseaux (villes) en parallèle
+    batch_parser = subparsers.add_parser('batch', help='Traiter plusieurs réseaux GBFS en parallèle')
+    batch_parser.add_argument('sources', nargs='*',
+                            help='Dossiers, fichiers ou URL GBFS (« nom=source » pour nommer la ville)')
+    batch_parser.add_argument('--villes', type=str, default=None,
+                            help='Fichier listant une source par ligne')
+    batch_parser.add_argument('--output-dir', '-o', type=str, default='results/villes',
+                            help='Dossier des résultats (un sous-dossier par ville)')
+    batch_parser.add_argument('--jobs', '-j', type=int, default=None,
+                            help='Nombre de villes traitées en parallèle (par défaut : un par processeur)')
+    batch_parser.add_argument('--force', action='store_true',
+                            help='Réexécuter toutes les étapes, même inchangées')
     
     args = parser.parse_args()
     
@@ -31,22 +204,200 @@ def main():
         parser.print_help()
         return
     
+    # Avec --profile, chaque étape est mesurée et le rapport est écrit à la fin (même en cas d'erreur)
+    if args.profile:
+        from profilage import Profileur
+        with Profileur(args.profile_output, args.profile_cprofile):
+            executer(args)
+        print(f"Rapport de profilage : {args.profile_output}")
+    else:
+        executer(args)
+
+# Exécuter la sous-commande demandée
+def executer(args):
     if args.command == 'generate-map':
         from visualization.view_map_stations import generate_map
-        generate_map(args.output)
+        generate_map(args.output, args.stations)
         print(f"Carte générée avec succès : {args.output}")
     
     elif args.command == 'analyze':
         from data.indice_repartition import analyze_distribution
         from data.liste_adjacence import generate_adjacency_list
         
-        print("Analyse de la répartition des stations...")
-        analyze_distribution()
+        # La liste d'adjacence est nécessaire au calcul des indices : elle est générée en premier
+        print("Génération de la liste d'adjacence...")
+        ids, _, indices = generate_adjacency_list(args.stations)
+        print(f"{len(ids)} stations, {len(indices) // 2} arêtes")
+        
+        print("\nAnalyse de la répartition des stations...")
+        resume = analyze_distribution(args.stations, output_dir=args.output_dir, alpha=args.alpha)
+        if resume is None:
+            return
+        print(f"Indice moyen : {resume['indice_moyen']:.3f} "
+              f"({resume['indices_negatifs']} négatifs, {resume['indices_nuls']} nuls, "
+              f"{resume['indices_positifs']} positifs)")
+        print(f"Densité médiane : {resume['densite_mediane_km2']:.1f} stations/km²")
+        
+        print(f"\nAnalyse terminée. Les résultats sont disponibles dans le dossier '{args.output_dir}'")
+    
+    elif args.command == 'sweep':
+        from data.indice_repartition import generer_balayage
+        
+        lignes = generer_balayage(args.stations, args.output_dir, args.alphas, args.neighbors, args.threshold)
+        if lignes is None:
+            return
+        print(f"{len(args.alphas)} valeurs de alpha x {len(args.neighbors)} nombres de voisins idéaux")
+        print(f"{'alpha':>6} {'voisins':>8} {'sous le seuil':>14} {'indice moyen':>13}")
+        for ligne in lignes:
+            print(f"{ligne['alpha']:>6.2f} {ligne['voisins_cible']:>8g} {ligne['part_sous_seuil']:>14.1%} "
+                  f"{ligne['indice_moyen']:>13.3f}")
+        print(f"\nCube des indices et résumé dans '{args.output_dir}' (balayage.npz, balayage.csv)")
+    
+    elif args.command == 'candidates':
+        import numpy as np
+        from data.sites_candidats import generer_evaluation
+        
+        evaluation = generer_evaluation(args.stations, args.input, args.grid, args.capacity, args.output_dir,
+                                        args.top, alpha=args.alpha, voisins_cible=args.neighbors,
+                                        seuil=args.threshold, processus=args.jobs)
+        if evaluation is None:
+            return
+        print(f"{len(evaluation['gain'])} candidats évalués "
+              f"({int(evaluation['hors_enveloppe'].sum())} hors de l'enveloppe des stations)")
+        print(f"{'rang':>5} {'latitude':>10} {'longitude':>10} {'voisins':>8} {'touchées':>9} {'gain':>8}")
+        for j in np.argsort(evaluation['rang'])[:10].tolist():
+            print(f"{evaluation['rang'][j]:>5} {evaluation['lat'][j]:>10.5f} {evaluation['lon'][j]:>10.5f} "
+                  f"{evaluation['nb_voisins'][j]:>8} {evaluation['stations_touchees'][j]:>9} "
+                  f"{evaluation['gain'][j]:>8.3f}")
+        print(f"\nClassement et détails dans '{args.output_dir}' (candidats.csv, candidats.npz, candidats.json)")
+    
+    elif args.command == 'dynamic-index':
+        from data.indice_dynamique import generer_indice_dynamique
+        
+        heures = generer_indice_dynamique(args.history, args.output_dir, args.days, args.alpha, args.neighbors,
+                                          args.timezone or None, args.memory)
+        if heures is None:
+            return
+        print(f"{sum(h['instantanes'] for h in heures)} instantanés analysés")
+        print(f"{'heure':>5} {'instantanés':>11} {'vide':>7} {'pleine':>7} {'bornes':>7} {'indice':>7}")
+        for h in heures:
+            if h['instantanes']:
+                print(f"{h['heure']:>5} {h['instantanes']:>11} {h['part_vide']:>7.1%} {h['part_pleine']:>7.1%} "
+                      f"{h['bornes_moyennes']:>7.1f} {h['indice_moyen']:>7.3f}")
+        print(f"\nRésultats dans '{args.output_dir}' (indice_dynamique.csv, indice_dynamique_horaire.csv, "
+              "indice_dynamique_heures.csv, indice_dynamique.npz)")
+    
+    elif args.command == 'graph':
+        from data.graphe import generer_analyse_graphe
+        
+        resume = generer_analyse_graphe(args.stations, args.output_dir, args.map,
+                                        args.sources or None, args.seed, args.jobs)
+        if resume is None:
+            return
+        print(f"{resume['nb_stations']} stations, {resume['nb_aretes']} arêtes, "
+              f"{resume['nb_composantes']} composante(s) connexe(s)")
+        print(f"Degré moyen : {resume['degre_moyen']:.2f}")
+        methode = 'exacte' if resume['exact'] else f"{resume['nb_sources']} sources"
+        print(f"Stations les plus critiques (intermédiarité {methode}) :")
+        for station in resume['stations_critiques']:
+            print(f"  {station['station_id']:<12} {station['intermediarite']:.4f}  {station['nom']}")
+        print(f"\nRésultats dans '{args.output_dir}' et carte '{args.map}'")
+    
+    elif args.command == 'rebalance':
+        from data.reequilibrage import generer_plan
+        
+        depot = tuple(float(x) for x in args.depot.split(',')) if args.depot else None
+        plan = generer_plan(args.stations, args.status, args.targets, args.target_ratio, args.output, args.map,
+                            depot=depot, nb_camions=args.trucks, capacite=args.capacity,
+                            duree_max_min=args.shift, vitesse_kmh=args.speed, service_min=args.service,
+                            duree_s=args.time_limit, processus=args.jobs, graine=args.seed)
+        if plan is None:
+            return
+        resume = plan['resume']
+        print(f"{resume['stations_desequilibrees']} stations déséquilibrées "
+              f"(écart total {resume['desequilibre_initial']} vélos)")
+        for tournee in plan['tournees']:
+            print(f"  camion {tournee['camion']} : {len(tournee['arrets'])} arrêts, "
+                  f"{tournee['velos_charges']} chargés, {tournee['velos_deposes']} déposés, "
+                  f"{tournee['distance_km']:.1f} km, {tournee['duree_min']:.0f} min")
+        print(f"{resume['velos_deplaces']} vélos déplacés, écart restant {resume['desequilibre_restant']} vélos")
+        print(f"\nPlan écrit dans '{args.output}' et carte '{args.map}'")
+    
+    elif args.command == 'run-all':
+        from pipeline import run_all
+        
+        from profilage import etape
+        
+        with etape('pipeline'):  # Les mesures des étapes exécutées dans le pool y sont ajoutées
+            resultats = run_all(args.stations, args.output_dir, args.jobs, args.force)
+        for nom, (etat, duree) in resultats.items():
+            print(f"  {nom:<20} {etat}" + (f" ({duree:.2f} s)" if etat == "exécutée" else ""))
+        executees = sum(etat == "exécutée" for etat, _ in resultats.values())
+        print(f"{executees} étape(s) exécutée(s) sur {len(resultats)} ; résultats dans '{args.output_dir}'")
+        if any(etat in ("échec", "annulée") for etat, _ in resultats.values()):
+            sys.exit(1)
+    
+    elif args.command == 'batch':
+        from multi_villes import lire_sources, traiter_villes
+        
+        villes = lire_sources(args.sources, args.villes)
+        if not villes:
+            print("Aucune source à traiter.")
+            sys.exit(1)
+        
+        def afficher(ligne):
+            print(f"  {ligne['ville']:<15} {ligne['statut']} ({ligne['duree_s']:.1f} s)")
+        
+        print(f"Traitement de {len(villes)} réseau(x)...")
+        lignes = traiter_villes(villes, args.output_dir, args.jobs, args.force, rappel=afficher)
+        print(f"\n{'ville':<15} {'stations':>8} {'cap. méd.':>9} {'indice moy.':>11} {'ACM (km)':>9}")
+        for ligne in lignes:
+            if ligne['statut'] != 'ok':
+                print(f"{ligne['ville']:<15} {ligne['statut']}")
+                continue
+            print(f"{ligne['ville']:<15} {ligne['nb_stations']:>8} {ligne['capacite_mediane']:>9.1f} "
+                  f"{ligne['indice_moyen']:>11.3f} {ligne['longueur_acm_km']:>9.1f}")
+        print(f"\nRésumé écrit dans '{args.output_dir}/resume_villes.csv'")
+        if any(ligne['statut'] != 'ok' for ligne in lignes):
+            sys.exit(1)
+    
+    elif args.command == 'serve':
+        import asyncio
+        from serveur_api import servir
+        
+        try:
+            asyncio.run(servir(args.stations, args.host, args.port, args.alpha, args.reload_interval,
+                               args.cache_size))
+        except KeyboardInterrupt:
+            print("Serveur arrêté.")
+    
+    elif args.command == 'render-all':
+        from visualization.rendu_parallele import rendre_tout
+        
+        from profilage import etape
+        
+        with etape('rendu_parallele'):  # Les mesures du rendu de chaque carte y sont ajoutées
+            cartes = rendre_tout(args.stations, args.output_dir, args.jobs)
+        for carte, (fichier, duree) in cartes.items():
+            print(f"  {carte:<15} {fichier} ({duree:.2f} s)")
+    
+    elif args.command == 'coverage':
+        from data.couverture import calculer_couverture, rendre_couverture
         
-        print("\nGénération de la liste d'adjacence...")
-        generate_adjacency_list()
+        sortie = Path(args.output_dir) / 'couverture.npy'
+        print(f"Calcul du raster de couverture ({args.resolution:g} m)...")
+        resume = calculer_couverture(args.stations, sortie, args.resolution, args.k,
+                                     args.tile, args.jobs)
+        grille = resume['grille']
+        print(f"Grille : {grille['lignes']} x {grille['colonnes']} cellules")
+        print(f"Distance médiane à la station la plus proche : {resume['distance_mediane_m']} m "
+              f"(90 % : {resume['distance_90_m']} m)")
+        for seuil, part in resume['part_couverte'].items():
+            print(f"  à moins de {seuil} m : {part:.1%} de la zone")
         
-        print("\nAnalyse terminée. Les résultats sont disponibles dans le dossier 'results/analysis'")
+        rendre_couverture(sortie, grille, Path(args.output_dir) / 'couverture.png',
+                          Path(args.output_dir) / 'velib_couverture_map.html')
+        print(f"\nRaster, carte de chaleur et carte disponibles dans le dossier '{args.output_dir}'")
 
 if __name__ == "__main__":
     main()
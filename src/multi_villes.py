@@ -0,0 +1,179 @@
+"""
+Traitement par lots de plusieurs réseaux de vélos en libre-service (commande `batch` de main.py).
+
+Chaque source est un dossier GBFS, un fichier station_information, l'URL d'un flux
+station_information, l'URL de découverte `gbfs.json` ou l'adresse de base des flux. Chaque ville
+est traitée dans son propre processus par le pipeline complet (pipeline.py), avec son propre dossier
+de résultats ; les cartes sont centrées sur les stations de la ville. Un résumé agrégé (nombre de
+stations, capacité médiane, indice de répartition moyen, longueur de l'ACM) est ensuite écrit.
+"""
+import csv  # Pour écrire le résumé tabulaire
+import json  # Pour lire les résultats et écrire le résumé
+import re  # Pour dériver le nom des villes
+import time  # Pour mesurer la durée de traitement de chaque ville
+from concurrent.futures import ProcessPoolExecutor, as_completed  # Une ville par processus
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+from profilage import fusionner, initialiser_processus, mesurer_processus, options_processus
+
+# Noms possibles du fichier des stations dans un dossier GBFS
+FICHIERS_STATIONS = ("station_information.json", "station_informations.json")
+
+# Colonnes du résumé agrégé
+COLONNES = ("ville", "statut", "nb_stations", "capacite_mediane", "indice_moyen", "longueur_acm_km",
+            "centre_lat", "centre_lon", "duree_s", "source")
+
+###################################################################################################
+###################################################################################################
+
+# Nom d'une ville déduit de sa source (dossier, fichier ou URL)
+def nom_ville(source):
+    if re.match(r"^https?://", source):
+        parties = [p for p in re.sub(r"^https?://", "", source).split("/") if p]
+        parties = [p for p in parties if not p.endswith(".json")] or parties
+        brut = parties[-1] if len(parties) > 1 else parties[0]
+    else:
+        chemin = Path(source)
+        brut = chemin.parent.name if chemin.suffix == ".json" else chemin.name
+    return re.sub(r"[^\w-]+", "_", brut).strip("_").lower() or "ville"
+
+# Lire les sources : « nom=source » ou « source » (le nom est alors déduit de la source)
+def lire_sources(sources=(), fichier_villes=None):
+    """Retourne une liste de couples (nom, source) ; `fichier_villes` contient une source par ligne."""
+    lignes = list(sources)
+    if fichier_villes:
+        with open(fichier_villes, "r", encoding="utf-8") as f:
+            lignes += [ligne.strip() for ligne in f if ligne.strip() and not ligne.lstrip().startswith("#")]
+
+    villes = []
+    for ligne in lignes:
+        nom, _, source = ligne.partition("=") if re.match(r"^[\w-]+=", ligne) else ("", "", ligne)
+        villes.append((nom or nom_ville(source), source))
+    noms = [nom for nom, _ in villes]
+    doublons = sorted({nom for nom in noms if noms.count(nom) > 1})
+    if doublons:
+        raise ValueError(f"Noms de villes en double : {', '.join(doublons)} (utilisez « nom=source »)")
+    return villes
+
+###################################################################################################
+###################################################################################################
+
+# URL du flux station_information annoncé par un fichier de découverte gbfs.json (GBFS 2 ou 3)
+def url_station_information(decouverte):
+    donnees = decouverte.get("data", {})
+    if "feeds" in donnees:  # GBFS 3 : une seule liste de flux
+        flux = donnees["feeds"]
+    else:  # GBFS 2 : une liste de flux par langue
+        flux = next(iter(donnees.values()), {}).get("feeds", [])
+    for entree in flux:
+        if entree.get("name") == "station_information":
+            return entree["url"]
+    raise ValueError("Le fichier gbfs.json n'annonce pas de flux station_information")
+
+# Fichier local des stations d'une source (téléchargé dans `dossier` si la source est une URL)
+def resoudre_flux(source, dossier):
+    if not re.match(r"^https?://", source):
+        chemin = Path(source)
+        if chemin.is_dir():
+            for nom in FICHIERS_STATIONS:
+                if (chemin / nom).exists():
+                    return chemin / nom
+            raise FileNotFoundError(f"Aucun fichier {' ou '.join(FICHIERS_STATIONS)} dans '{source}'")
+        if not chemin.exists():
+            raise FileNotFoundError(f"Fichier introuvable : '{source}'")
+        return chemin
+
+    import requests  # Pour effectuer des requêtes HTTP (seulement pour les sources distantes)
+    from data.process_data import telecharger_donnees
+
+    if source.endswith("gbfs.json"):  # Découverte automatique des flux
+        reponse = requests.get(source, timeout=30)
+        reponse.raise_for_status()
+        url = url_station_information(reponse.json())
+    elif source.endswith(".json"):
+        url = source
+    else:  # Adresse de base des flux
+        url = source.rstrip("/") + "/station_information.json"
+    fichier = Path(dossier) / "station_information.json"
+    Path(dossier).mkdir(parents=True, exist_ok=True)
+    if not telecharger_donnees(url, str(fichier)):
+        raise RuntimeError(f"Téléchargement impossible : {url}")
+    return fichier
+
+###################################################################################################
+###################################################################################################
+
+# Lire un fichier JSON de résultats (None s'il n'existe pas)
+def _lire_json(chemin):
+    try:
+        with open(chemin, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+# Traiter une ville (dans un processus dédié) ; retourne sa ligne du résumé agrégé
+def traiter_ville(nom, source, dossier, forcer=False):
+    from data.station_table import StationTable
+    from pipeline import run_all
+
+    debut = time.perf_counter()
+    dossier = Path(dossier)
+    ligne = {"ville": nom, "source": source, "dossier": str(dossier)}
+    try:
+        fichier = resoudre_flux(source, dossier)
+        # Les étapes de la ville sont exécutées dans un seul processus : les villes sont déjà en parallèle
+        etats = run_all(str(fichier), dossier, processus=1, forcer=forcer)
+        echecs = [etape for etape, (etat, _) in etats.items() if etat in ("échec", "annulée")]
+
+        table = StationTable.charger(str(fichier))
+        resume = _lire_json(dossier / "analysis" / "resume.json") or {}
+        acm = _lire_json(dossier / "analysis" / "acm.json") or {}
+        ligne.update({
+            "statut": "échec : " + ", ".join(echecs) if echecs else "ok",
+            "nb_stations": len(table),
+            "capacite_mediane": resume.get("capacite_mediane"),
+            "indice_moyen": resume.get("indice_moyen"),
+            "longueur_acm_km": acm.get("longueur_totale_km"),
+        })
+        if len(table):
+            ligne.update({
+                "centre_lat": float((table.lat.min() + table.lat.max()) / 2),
+                "centre_lon": float((table.lon.min() + table.lon.max()) / 2),
+                "emprise": [[float(table.lat.min()), float(table.lon.min())],
+                            [float(table.lat.max()), float(table.lon.max())]],
+            })
+    except Exception as e:  # Une ville en erreur n'interrompt pas le lot
+        ligne["statut"] = f"erreur : {e}"
+    ligne["duree_s"] = time.perf_counter() - debut
+    return ligne
+
+# Traiter toutes les villes en parallèle et écrire le résumé agrégé
+def traiter_villes(villes, dossier="results/villes", processus=None, forcer=False, rappel=None):
+    """`villes` est une liste de couples (nom, source) ; chaque ville écrit ses résultats dans
+    `dossier/<nom>/`. Retourne les lignes du résumé, écrit dans `resume_villes.json` et `.csv`.
+    `rappel(ligne)` est appelé dès qu'une ville est terminée. Avec --profile, les mesures de chaque
+    ville (étape `ville_<nom>`) sont ajoutées à l'étape en cours.
+    """
+    dossier = Path(dossier)
+    lignes = []
+    options_profilage = options_processus()
+    with ProcessPoolExecutor(processus, initializer=initialiser_processus) as executeur:
+        futurs = [executeur.submit(mesurer_processus, f"ville_{nom}", options_profilage, traiter_ville,
+                                   nom, source, dossier / nom, forcer) for nom, source in villes]
+        for futur in as_completed(futurs):
+            ligne, mesures = futur.result()
+            fusionner(mesures)
+            lignes.append(ligne)
+            if rappel is not None:
+                rappel(lignes[-1])
+    ordre = {nom: i for i, (nom, _) in enumerate(villes)}
+    lignes.sort(key=lambda ligne: ordre[ligne["ville"]])
+
+    dossier.mkdir(parents=True, exist_ok=True)
+    with open(dossier / "resume_villes.json", "w", encoding="utf-8") as f:
+        json.dump(lignes, f, indent=4, ensure_ascii=False)
+    with open(dossier / "resume_villes.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLONNES, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(lignes)
+    return lignes
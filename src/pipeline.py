@@ -0,0 +1,247 @@
+"""
+Pipeline complet (commande `run-all` de main.py) : chargement → triangulation → adjacence →
+indices, ACM, analyse du graphe et cartes. Chaque étape déclare ses fichiers d'entrée et de sortie ; une étape
+dont les entrées n'ont pas changé (même empreinte SHA-256) et dont les sorties existent est
+ignorée, et les étapes indépendantes sont exécutées en parallèle dans des processus séparés.
+"""
+import hashlib  # Pour calculer la clé de chaque étape
+import json  # Pour lire et écrire le manifeste
+import time  # Pour mesurer la durée des étapes
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait  # Exécution parallèle
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+from data.cache import DOSSIER_CACHE, chemin_artefact, ecrire_atomique, empreinte_fichier
+from profilage import fusionner, initialiser_processus, mesurer_processus, options_processus
+
+# Version du pipeline (à incrémenter pour forcer la réexécution de toutes les étapes)
+VERSION_PIPELINE = 2
+
+# Nom du manifeste des étapes déjà exécutées, dans le dossier des résultats
+MANIFESTE = ".pipeline.json"
+
+###################################################################################################
+###################################################################################################
+
+class Etape:
+    """Étape du pipeline : `fonction(**parametres)` lit `entrees` et écrit `sorties`.
+
+    `dependances` sont les noms des étapes qui doivent être terminées avant celle-ci
+    (en général, celles qui produisent ses entrées).
+    """
+
+    def __init__(self, nom, fonction, parametres, entrees, sorties, dependances=()):
+        self.nom = nom
+        self.fonction = fonction
+        self.parametres = parametres
+        self.entrees = [str(e) for e in entrees]
+        self.sorties = [str(s) for s in sorties]
+        self.dependances = tuple(dependances)
+
+    # Clé de l'étape : empreinte de ses paramètres et du contenu de ses entrées
+    def cle(self, empreintes):
+        h = hashlib.sha256(f"{VERSION_PIPELINE}|{self.nom}|{self.fonction}|".encode("utf-8"))
+        h.update(json.dumps(self.parametres, sort_keys=True).encode("utf-8"))
+        for entree in sorted(self.entrees):
+            if entree not in empreintes:
+                empreintes[entree] = empreinte_fichier(entree) if Path(entree).exists() else "absent"
+            h.update(f"|{entree}={empreintes[entree]}".encode("utf-8"))
+        return h.hexdigest()
+
+###################################################################################################
+###################################################################################################
+
+# Fonctions des étapes (importées au moment de l'exécution, dans le processus qui les exécute)
+
+def _stations(fichier_json):
+    from data.station_table import StationTable
+    StationTable.charger(fichier_json)
+
+def _triangulation(fichier_json):
+    from data.triangulation import charger_triangulation
+    charger_triangulation(fichier_json)
+
+def _cellules(fichier_json):
+    from data.cellules_voronoi import charger_cellules
+    charger_cellules(fichier_json)
+
+def _adjacence(fichier_json, dossier_csr):
+    from data.liste_adjacence import generate_adjacency_list
+    generate_adjacency_list(fichier_json, dossier_csr)
+
+def _indices(fichier_json, dossier_csr, dossier_analyse):
+    from data.indice_repartition import analyze_distribution
+    analyze_distribution(fichier_json, dossier_csr, dossier_analyse)
+
+def _acm(fichier_json, dossier_csr, fichier_stats, fichier_carte):
+    from data.liste_adjacence import charger_csr
+    from data.station_table import StationTable
+    from visualization.arbre_couvrant import afficher_acm_folium, calculer_acm_geographique, statistiques_acm
+    from visualization.rendu_geojson import sauvegarder_carte
+
+    table = StationTable.charger(fichier_json)
+    u, v, longueurs = calculer_acm_geographique(charger_csr(dossier_csr), table)
+    stats = statistiques_acm(u, v, longueurs, len(table))
+    Path(fichier_stats).parent.mkdir(parents=True, exist_ok=True)
+    with open(fichier_stats, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=4, ensure_ascii=False, default=str)
+    sauvegarder_carte(afficher_acm_folium((u, v), table), fichier_carte)
+
+def _carte_stations(fichier_json, fichier_carte):
+    from visualization.view_map_stations import generate_map
+    generate_map(fichier_carte, fichier_json)
+
+def _carte_triangulation(fichier_json, fichier_carte):
+    from visualization.map_triangulation import generer_carte_triangulation
+    generer_carte_triangulation(fichier_json, fichier_carte)
+
+def _carte_indices(fichier_json, dossier_csr, fichier_carte):
+    from data.indice_repartition import generer_carte_indices
+    generer_carte_indices(fichier_json, dossier_csr, fichier_carte)
+
+def _carte_voronoi(fichier_json, dossier_csr, fichier_carte):
+    from visualization.voronoi_map import generer_carte_voronoi
+    generer_carte_voronoi(fichier_json, dossier_csr, fichier_carte)
+
+def _graphe(fichier_json, dossier_analyse, fichier_carte):
+    from data.graphe import generer_analyse_graphe
+    # Un seul processus : les étapes du pipeline sont déjà exécutées en parallèle
+    generer_analyse_graphe(fichier_json, dossier_analyse, fichier_carte, processus=1)
+
+# Exécuter une étape (dans un processus du pool) ; retourne sa durée en secondes et ses mesures
+def _executer(nom, fonction, parametres, options_profilage):
+    debut = time.perf_counter()
+    _, mesures = mesurer_processus(nom, options_profilage, globals()[fonction], **parametres)
+    return time.perf_counter() - debut, mesures
+
+###################################################################################################
+###################################################################################################
+
+# Définir les étapes du pipeline pour un fichier de stations et un dossier de résultats
+def definir_etapes(fichier_json="station_informations.json", dossier="results"):
+    dossier = Path(dossier)
+    # Artefacts du cache produits par les premières étapes (nommés d'après l'empreinte des stations)
+    empreinte = empreinte_fichier(fichier_json)
+    stations = chemin_artefact("stations", empreinte, DOSSIER_CACHE)
+    triangulation = chemin_artefact("triangulation", empreinte, DOSSIER_CACHE)
+    cellules = chemin_artefact("cellules", empreinte, DOSSIER_CACHE)
+    csr = dossier / "liste_adjacence_csr"
+    fichiers_csr = [csr / nom for nom in ("ids.npy", "indptr.npy", "indices.npy")]
+    analyse, cartes = dossier / "analysis", dossier / "maps"
+    json_ = str(fichier_json)
+
+    return [
+        Etape("stations", "_stations", {"fichier_json": json_}, [fichier_json], [stations]),
+        Etape("triangulation", "_triangulation", {"fichier_json": json_},
+              [fichier_json, stations], [triangulation], ["stations"]),
+        Etape("cellules", "_cellules", {"fichier_json": json_}, [fichier_json, stations], [cellules], ["stations"]),
+        Etape("adjacence", "_adjacence", {"fichier_json": json_, "dossier_csr": str(csr)},
+              [fichier_json, triangulation], fichiers_csr + [csr / "stations.npz", csr / "triangles.npz"],
+              ["triangulation"]),
+        Etape("indices", "_indices",
+              {"fichier_json": json_, "dossier_csr": str(csr), "dossier_analyse": str(analyse)},
+              [fichier_json, cellules] + fichiers_csr,
+              [analyse / "indices_repartition.csv", analyse / "resume.json"], ["adjacence", "cellules"]),
+        Etape("acm", "_acm",
+              {"fichier_json": json_, "dossier_csr": str(csr), "fichier_stats": str(analyse / "acm.json"),
+               "fichier_carte": str(cartes / "velib_acm_map.html")},
+              [fichier_json] + fichiers_csr, [analyse / "acm.json", cartes / "velib_acm_map.html"], ["adjacence"]),
+        Etape("carte_stations", "_carte_stations",
+              {"fichier_json": json_, "fichier_carte": str(cartes / "stations_map.html")},
+              [fichier_json], [cartes / "stations_map.html"], ["stations"]),
+        Etape("carte_triangulation", "_carte_triangulation",
+              {"fichier_json": json_, "fichier_carte": str(cartes / "velib_triangulation_map.html")},
+              [fichier_json, triangulation], [cartes / "velib_triangulation_map.html"], ["triangulation"]),
+        Etape("carte_indices", "_carte_indices",
+              {"fichier_json": json_, "dossier_csr": str(csr), "fichier_carte": str(cartes / "velib_indices_map.html")},
+              [fichier_json, triangulation] + fichiers_csr, [cartes / "velib_indices_map.html"], ["adjacence"]),
+        Etape("carte_voronoi", "_carte_voronoi",
+              {"fichier_json": json_, "dossier_csr": str(csr), "fichier_carte": str(cartes / "velib_voronoi_map.html")},
+              [fichier_json, cellules] + fichiers_csr, [cartes / "velib_voronoi_map.html"], ["adjacence", "cellules"]),
+        Etape("graphe", "_graphe",
+              {"fichier_json": json_, "dossier_analyse": str(analyse),
+               "fichier_carte": str(cartes / "velib_graphe_map.html")},
+              [fichier_json, triangulation],
+              [analyse / "graphe.csv", analyse / "graphe.json", cartes / "velib_graphe_map.html"], ["triangulation"]),
+    ]
+
+###################################################################################################
+###################################################################################################
+
+# Exécuter les étapes dans l'ordre de leurs dépendances, en ignorant celles qui sont à jour
+def executer_pipeline(etapes, manifeste, processus=None, forcer=False):
+    """Retourne un dictionnaire nom → état ("inchangée", "exécutée", "échec" ou "annulée")
+    et durée (en secondes) de chaque étape. Avec --profile, les mesures des étapes exécutées dans
+    les processus du pool sont ajoutées à l'étape en cours.
+    """
+    manifeste = Path(manifeste)
+    try:
+        cles = json.loads(manifeste.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        cles = {}
+
+    restantes = {etape.nom: etape for etape in etapes}
+    resultats = {}
+    empreintes = {}  # Empreinte de chaque fichier d'entrée, calculée une seule fois
+    en_cours = {}
+    executeur = None
+    options_profilage = options_processus()
+
+    def enregistrer():
+        contenu = json.dumps(cles, indent=4).encode("utf-8")
+        manifeste.parent.mkdir(parents=True, exist_ok=True)
+        ecrire_atomique(manifeste, lambda f: f.write(contenu))
+
+    try:
+        while restantes or en_cours:
+            # Lancer (ou ignorer) toutes les étapes dont les dépendances sont terminées
+            progression = True
+            while progression:
+                progression = False
+                for nom, etape in list(restantes.items()):
+                    etats = [resultats.get(d, (None,))[0] for d in etape.dependances]
+                    if any(e in ("échec", "annulée") for e in etats):
+                        resultats[nom] = ("annulée", 0.0)  # Une dépendance a échoué
+                    elif all(e in ("inchangée", "exécutée") for e in etats):
+                        cle = etape.cle(empreintes)
+                        if (not forcer and cles.get(nom) == cle
+                                and all(Path(s).exists() for s in etape.sorties)):
+                            resultats[nom] = ("inchangée", 0.0)
+                        else:
+                            if executeur is None:
+                                executeur = ProcessPoolExecutor(processus, initializer=initialiser_processus)
+                            futur = executeur.submit(_executer, etape.nom, etape.fonction, etape.parametres,
+                                                     options_profilage)
+                            en_cours[futur] = (etape, cle)
+                    else:
+                        continue
+                    del restantes[nom]
+                    progression = True
+
+            if not en_cours:
+                break
+            # Attendre la fin d'au moins une étape
+            terminees, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for futur in terminees:
+                etape, cle = en_cours.pop(futur)
+                try:
+                    duree, mesures = futur.result()
+                    fusionner(mesures)
+                    resultats[etape.nom] = ("exécutée", duree)
+                    cles[etape.nom] = cle
+                except Exception as e:
+                    print(f"Erreur dans l'étape '{etape.nom}' : {e}")  # Gérer les erreurs
+                    resultats[etape.nom] = ("échec", 0.0)
+                    cles.pop(etape.nom, None)
+                enregistrer()
+    finally:
+        if executeur is not None:
+            executeur.shutdown()
+
+    for nom in restantes:
+        resultats[nom] = ("annulée", 0.0)  # Dépendance inconnue
+    return resultats
+
+# Exécuter tout le pipeline pour un fichier de stations
+def run_all(fichier_json="station_informations.json", dossier="results", processus=None, forcer=False):
+    etapes = definir_etapes(fichier_json, dossier)
+    return executer_pipeline(etapes, Path(dossier) / MANIFESTE, processus, forcer)
@@ -0,0 +1,276 @@
+"""
+Profilage des étapes (option --profile de main.py) : durée, temps CPU, pic de mémoire
+(tracemalloc) et compteurs (stations, simplexes, arêtes, polygones, marqueurs, octets écrits) de
+chaque étape, réunis dans un rapport JSON ; un profil cProfile peut aussi être enregistré pour
+chaque étape de premier niveau. Sans profileur actif, une fonction instrumentée ne coûte qu'un test.
+
+Dans les processus d'un pool, tracemalloc (hérité du parent) est arrêté : chaque tâche est mesurée
+par son propre profileur, dont le pic de mémoire est celui de la mémoire résidente (bien moins
+coûteux que tracemalloc), et ses mesures sont renvoyées au parent avec le résultat de la tâche.
+"""
+import cProfile  # Pour le profil détaillé des étapes
+import functools  # Pour écrire le décorateur des étapes
+import json  # Pour écrire le rapport
+import os  # Pour le temps CPU des processus enfants et la taille des fichiers
+import sys  # Pour la ligne de commande profilée
+import tempfile  # Pour donner un nom unique à chaque profil cProfile
+import time  # Pour mesurer les durées
+import tracemalloc  # Pour mesurer le pic de mémoire des étapes
+from contextlib import contextmanager  # Pour définir les étapes avec `with`
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+# Version du format du rapport (à incrémenter si sa structure change)
+VERSION_RAPPORT = 1
+
+# Profileur actif (None : profilage désactivé)
+_ACTIF = None
+
+###################################################################################################
+###################################################################################################
+
+# Temps CPU cumulé des processus enfants terminés (pools de processus)
+def _cpu_enfants():
+    temps = os.times()
+    return temps.children_user + temps.children_system
+
+# Mémoire résidente actuelle et pic depuis la dernière réinitialisation, en octets (Linux ; 0 sinon)
+def _memoire_residente():
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            champs = dict(ligne.split(":", 1) for ligne in f if ligne.startswith(("VmRSS", "VmHWM")))
+        return int(champs["VmRSS"].split()[0]) * 1024, int(champs["VmHWM"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+# Ramener le pic de mémoire résidente à la mémoire actuelle (Linux 4.0+)
+def _reinitialiser_pic_residente():
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+class Profileur:
+    """Mesure les étapes exécutées tant qu'il est actif (`with Profileur(...)`).
+
+    Les étapes imbriquées sont nommées par leur chemin (« analyse_repartition/chargement_stations ») ;
+    les mesures d'un même chemin sont cumulées et le pic de mémoire est celui des allocations faites
+    pendant l'étape, au-delà de la mémoire déjà allouée à son début : allocations suivies par
+    tracemalloc (`memoire="tracemalloc"`) ou mémoire résidente du processus (`memoire="rss"`).
+    Le rapport est écrit dans `fichier` (s'il est donné) à la sortie du bloc, même en cas d'erreur.
+    Dans un processus d'un pool, `prefixe` est le chemin de l'étape du parent qui a lancé la tâche :
+    il entre dans le nom des profils cProfile, qui ne se confondent pas d'une tâche à l'autre.
+    """
+
+    def __init__(self, fichier="results/profile.json", dossier_cprofile=None, memoire="tracemalloc", prefixe=""):
+        self.fichier = fichier
+        self.dossier_cprofile = dossier_cprofile
+        self.memoire = memoire
+        self.prefixe = prefixe
+        self.etapes = {}  # Chemin de l'étape → mesures cumulées
+        self.pile = []  # Étapes en cours, de la plus externe à la plus interne
+        self.pic_total = 0
+
+    def __enter__(self):
+        global _ACTIF
+        self._demarrer_tracemalloc = self.memoire == "tracemalloc" and not tracemalloc.is_tracing()
+        if self._demarrer_tracemalloc:
+            tracemalloc.start()
+        self.debut, self.debut_cpu, self.debut_enfants = time.perf_counter(), time.process_time(), _cpu_enfants()
+        _ACTIF = self
+        return self
+
+    def __exit__(self, *exc):
+        global _ACTIF
+        _ACTIF = None
+        self.duree = time.perf_counter() - self.debut
+        self.cpu = time.process_time() - self.debut_cpu
+        self.cpu_enfants = _cpu_enfants() - self.debut_enfants
+        self._relever_pic()
+        if self._demarrer_tracemalloc:
+            tracemalloc.stop()
+        if self.fichier:
+            self.ecrire(self.fichier)
+        return False
+
+    # Mémoire actuelle et pic depuis le dernier relevé, en octets
+    def _memoire(self):
+        if self.memoire == "rss":
+            return _memoire_residente()
+        return tracemalloc.get_traced_memory()
+
+    # Reporter le pic de mémoire atteint sur toutes les étapes en cours, puis le réinitialiser
+    def _relever_pic(self):
+        pic = self._memoire()[1]
+        for mesure in self.pile:
+            mesure["pic"] = max(mesure["pic"], pic)
+        self.pic_total = max(self.pic_total, pic)
+        if self.memoire == "rss":
+            _reinitialiser_pic_residente()
+        elif hasattr(tracemalloc, "reset_peak"):  # Python 3.9+ (sinon : pic depuis le début du profilage)
+            tracemalloc.reset_peak()
+
+    # Mesurer une étape
+    @contextmanager
+    def etape(self, nom):
+        chemin = f"{self.pile[-1]['chemin']}/{nom}" if self.pile else nom
+        self._relever_pic()
+        memoire = self._memoire()[0]
+        mesure = {"chemin": chemin, "memoire": memoire, "pic": memoire, "compteurs": {}}
+        # cProfile ne peut pas être imbriqué : seules les étapes de premier niveau sont profilées
+        profil = cProfile.Profile() if self.dossier_cprofile and not self.pile else None
+        self.pile.append(mesure)
+        debut, debut_cpu = time.perf_counter(), time.process_time()
+        if profil is not None:
+            profil.enable()
+        try:
+            yield mesure
+        finally:
+            if profil is not None:
+                profil.disable()
+            duree, cpu = time.perf_counter() - debut, time.process_time() - debut_cpu
+            self._relever_pic()
+            self.pile.pop()
+            cumul = self.etapes.setdefault(chemin, {
+                "appels": 0, "duree_s": 0.0, "cpu_s": 0.0, "memoire_max_mo": 0.0, "compteurs": {},
+            })
+            cumul["appels"] += 1
+            cumul["duree_s"] += duree
+            cumul["cpu_s"] += cpu
+            cumul["memoire_max_mo"] = max(cumul["memoire_max_mo"], (mesure["pic"] - memoire) / 1024 ** 2)
+            for cle, valeur in mesure["compteurs"].items():
+                cumul["compteurs"][cle] = cumul["compteurs"].get(cle, 0) + valeur
+            if profil is not None:
+                cumul.setdefault("profils", []).append(self._ecrire_profil(profil, chemin))
+
+    # Chemin complet de l'étape en cours, depuis le processus principal ("" hors de toute étape)
+    def chemin_complet(self):
+        return "/".join(c for c in (self.prefixe, self.pile[-1]["chemin"] if self.pile else "") if c)
+
+    # Écrire un profil cProfile sous un nom unique : chemin complet de l'étape, processus, suffixe aléatoire
+    def _ecrire_profil(self, profil, chemin):
+        Path(self.dossier_cprofile).mkdir(parents=True, exist_ok=True)
+        nom = "/".join(c for c in (self.prefixe, chemin) if c).replace("/", ".")
+        descripteur, sortie = tempfile.mkstemp(suffix=".prof", prefix=f"{nom}_{os.getpid()}_",
+                                               dir=self.dossier_cprofile)
+        os.close(descripteur)
+        profil.dump_stats(sortie)
+        return sortie
+
+    # Ajouter les compteurs de l'étape en cours
+    def compter(self, quantites):
+        if self.pile:
+            compteurs = self.pile[-1]["compteurs"]
+            for cle, valeur in quantites.items():
+                compteurs[cle] = compteurs.get(cle, 0) + int(valeur)
+
+    # Ajouter, sous l'étape en cours, les étapes mesurées dans un processus d'un pool
+    def fusionner(self, etapes):
+        prefixe = f"{self.pile[-1]['chemin']}/" if self.pile else ""
+        for chemin, mesures in etapes.items():
+            cumul = self.etapes.setdefault(prefixe + chemin, {
+                "appels": 0, "duree_s": 0.0, "cpu_s": 0.0, "memoire_max_mo": 0.0, "compteurs": {},
+                "processus_enfant": True,
+            })
+            cumul["appels"] += mesures["appels"]
+            cumul["duree_s"] += mesures["duree_s"]
+            cumul["cpu_s"] += mesures["cpu_s"]
+            cumul["memoire_max_mo"] = max(cumul["memoire_max_mo"], mesures["memoire_max_mo"])
+            for cle, valeur in mesures["compteurs"].items():
+                cumul["compteurs"][cle] = cumul["compteurs"].get(cle, 0) + valeur
+            if "profils" in mesures:
+                cumul.setdefault("profils", []).extend(mesures["profils"])
+
+    ###############################################################################################
+
+    # Rapport complet, prêt à être sérialisé en JSON
+    def rapport(self):
+        return {
+            "version": VERSION_RAPPORT,
+            "commande": sys.argv[1:],
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duree_s": self.duree,
+            "cpu_s": self.cpu,
+            "cpu_processus_enfants_s": self.cpu_enfants,
+            "memoire_max_mo": self.pic_total / 1024 ** 2,
+            "etapes": self.etapes,
+        }
+
+    # Écrire le rapport JSON
+    def ecrire(self, fichier):
+        Path(fichier).parent.mkdir(parents=True, exist_ok=True)
+        with open(fichier, "w", encoding="utf-8") as f:
+            json.dump(self.rapport(), f, indent=4, ensure_ascii=False)
+
+###################################################################################################
+###################################################################################################
+
+# Mesurer un bloc de code comme une étape (sans effet si le profilage est désactivé)
+@contextmanager
+def etape(nom):
+    if _ACTIF is None:
+        yield None
+    else:
+        with _ACTIF.etape(nom) as mesure:
+            yield mesure
+
+# Décorateur : mesurer chaque appel de la fonction comme une étape
+def mesure(nom, compteurs=None):
+    """`compteurs(resultat)` retourne éventuellement les quantités produites par l'appel."""
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            if _ACTIF is None:
+                return fonction(*args, **kwargs)
+            with _ACTIF.etape(nom):
+                resultat = fonction(*args, **kwargs)
+                if compteurs is not None:
+                    _ACTIF.compter(compteurs(resultat))
+            return resultat
+        return enveloppe
+    return decorateur
+
+# Ajouter des quantités (marqueurs=..., octets_ecrits=...) aux compteurs de l'étape en cours
+def compter(**quantites):
+    if _ACTIF is not None:
+        _ACTIF.compter(quantites)
+
+# Compter les octets d'un fichier qui vient d'être écrit
+def compter_fichier(chemin):
+    if _ACTIF is not None:
+        _ACTIF.compter({"octets_ecrits": os.path.getsize(chemin), "fichiers_ecrits": 1})
+
+###################################################################################################
+###################################################################################################
+
+# Initialiser un processus d'un pool : ne plus suivre les allocations héritées du parent
+def initialiser_processus(initialiser=None, *args):
+    """`initialiser(*args)` est ensuite appelé (initialisation propre au pool)."""
+    global _ACTIF
+    _ACTIF = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    if initialiser is not None:
+        initialiser(*args)
+
+# Options de profilage à transmettre aux tâches d'un pool (None si le profilage est désactivé)
+def options_processus():
+    if _ACTIF is None:
+        return None
+    return {"dossier_cprofile": _ACTIF.dossier_cprofile, "prefixe": _ACTIF.chemin_complet()}
+
+# Exécuter une tâche dans un processus d'un pool, mesurée comme l'étape `nom` si `options` est donné
+def mesurer_processus(nom, options, fonction, *args, **kwargs):
+    """Retourne (résultat, étapes) ; les étapes (None sans profilage) sont à passer à `fusionner`
+    dans le processus parent."""
+    if options is None:
+        return fonction(*args, **kwargs), None
+    with Profileur(None, options["dossier_cprofile"], memoire="rss", prefixe=options["prefixe"]) as profileur:
+        with profileur.etape(nom):
+            resultat = fonction(*args, **kwargs)
+    return resultat, profileur.etapes
+
+# Ajouter les étapes mesurées dans un processus d'un pool sous l'étape en cours
+def fusionner(etapes):
+    if _ACTIF is not None and etapes:
+        _ACTIF.fusionner(etapes)
@@ -0,0 +1,297 @@
+"""
+Serveur HTTP local de requêtes sur les stations (commande `serve` de main.py), en JSON.
+
+La table des stations, la liste d'adjacence, les indices de répartition et l'index spatial sont
+chargés une seule fois en mémoire (depuis le cache si le fichier n'a pas changé), puis rechargés
+dès que l'empreinte du fichier des stations change. Le serveur repose uniquement sur asyncio
+(bibliothèque standard) et garde les connexions ouvertes (HTTP/1.1 keep-alive).
+
+Routes :
+    /                                       état du serveur (stations, empreinte, cache)
+    /stations/{id}                          une station, ses voisins et son indice
+    /nearest?lat=..&lon=..&k=..             k stations les plus proches d'un point
+    /bbox?sud=..&ouest=..&nord=..&est=..    stations d'un rectangle (réponses en cache LRU)
+    /indices                                indice de répartition de toutes les stations
+"""
+import asyncio  # Pour le serveur HTTP
+import json  # Pour encoder les réponses
+import math  # Pour refuser les coordonnées non finies
+import os  # Pour surveiller le fichier des stations
+import time  # Pour dater le chargement des données
+from functools import lru_cache  # Pour le cache des réponses /bbox
+from http import HTTPStatus  # Pour les libellés des codes de réponse
+from urllib.parse import parse_qs, unquote, urlsplit  # Pour lire les requêtes
+
+import numpy as np  # Pour manipuler des tableaux numériques
+
+# Nombre maximal de réponses /bbox gardées en cache
+TAILLE_CACHE = 1024
+
+# Nombre maximal de stations renvoyées par /nearest
+K_MAX = 100
+
+###################################################################################################
+###################################################################################################
+
+class ErreurRequete(Exception):
+    """Requête invalide : le code HTTP et le message sont renvoyés au client."""
+
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+class Donnees:
+    """Données servies, chargées une seule fois pour une version du fichier des stations."""
+
+    def __init__(self, fichier_json, empreinte, table, indptr, indices, index_spatial, indices_repartition,
+                 alpha, taille_cache=TAILLE_CACHE):
+        self.fichier_json = fichier_json
+        self.empreinte = empreinte
+        self.charge_le = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.table = table
+        self.indptr, self.indices = indptr, indices
+        self.index_spatial = index_spatial
+        self.indices_repartition = indices_repartition
+        self.alpha = alpha
+        self.noms = table.liste_noms()
+        self.ids = table.station_id.tolist()
+        # Stations triées par latitude : un rectangle ne parcourt que sa bande de latitudes
+        self.ordre_lat = np.argsort(table.lat, kind="stable")
+        self.lat_triees = table.lat[self.ordre_lat]
+        # Cache propre à cette version des données (abandonné avec elle au rechargement)
+        self.bbox = lru_cache(maxsize=taille_cache)(self._bbox)
+        self._indices_json = None
+
+    # Charger les données d'un fichier GBFS (artefacts du cache si le fichier n'a pas changé)
+    @classmethod
+    def charger(cls, fichier_json, alpha=0.5, taille_cache=TAILLE_CACHE):
+        from data.cache import empreinte_fichier
+        from data.index_spatial import charger_index_spatial
+        from data.indice_repartition import calculer_indices
+        from data.liste_adjacence import construire_adjacence
+        from data.station_table import StationTable
+        from data.triangulation import charger_triangulation
+
+        empreinte = empreinte_fichier(fichier_json)
+        table = StationTable.charger(fichier_json)
+        if len(table) >= 3:
+            indptr, indices = construire_adjacence(charger_triangulation(fichier_json))
+        else:  # Pas de triangulation possible : aucune station n'a de voisin
+            indptr, indices = np.zeros(len(table) + 1, dtype=np.int64), np.zeros(0, dtype=np.int32)
+        indices_repartition = calculer_indices(table, np.diff(indptr), alpha)
+        return cls(fichier_json, empreinte, table, indptr, indices, charger_index_spatial(fichier_json),
+                   np.atleast_1d(indices_repartition), alpha, taille_cache)
+
+    ###############################################################################################
+
+    # Description courte d'une station
+    def station(self, i):
+        return {
+            "station_id": self.ids[i],
+            "nom": self.noms[i],
+            "lat": float(self.table.lat[i]),
+            "lon": float(self.table.lon[i]),
+            "capacite": int(self.table.capacity[i]),
+            "indice": round(float(self.indices_repartition[i]), 4),
+        }
+
+    # Réponse /stations/{id}
+    def detail_station(self, station_id):
+        try:
+            i = self.table.ligne(station_id)
+        except (KeyError, ValueError):
+            raise ErreurRequete(404, f"Station inconnue : {station_id}") from None
+        voisins = self.indices[self.indptr[i]:self.indptr[i + 1]].tolist()
+        return {**self.station(i), "nb_voisins": len(voisins), "voisins": [self.ids[j] for j in voisins]}
+
+    # Réponse /nearest
+    def plus_proches(self, lat, lon, k):
+        k = min(k, len(self.table))
+        if k == 0:
+            return {"stations": []}
+        distances, lignes = self.index_spatial.plus_proches(lat, lon, k=k, workers=1)
+        return {"stations": [{**self.station(i), "distance_m": round(d, 1)}
+                             for d, i in zip(distances.reshape(-1).tolist(), lignes.reshape(-1).tolist())]}
+
+    # Réponse /bbox, déjà encodée (mise en cache par `self.bbox`)
+    def _bbox(self, sud, ouest, nord, est):
+        debut = np.searchsorted(self.lat_triees, sud, side="left")
+        fin = np.searchsorted(self.lat_triees, nord, side="right")
+        bande = self.ordre_lat[debut:fin]
+        lignes = np.sort(bande[(self.table.lon[bande] >= ouest) & (self.table.lon[bande] <= est)])
+        return encoder({"nb_stations": len(lignes), "stations": [self.station(i) for i in lignes.tolist()]})
+
+    # Réponse /indices, déjà encodée (calculée une seule fois)
+    def indices_json(self):
+        if self._indices_json is None:
+            valeurs = np.round(self.indices_repartition, 4).tolist()
+            self._indices_json = encoder({
+                "alpha": self.alpha,
+                "nb_stations": len(self.ids),
+                "indices": [{"station_id": s, "indice": v} for s, v in zip(self.ids, valeurs)],
+            })
+        return self._indices_json
+
+    # Réponse / (état du serveur)
+    def etat(self):
+        cache = self.bbox.cache_info()
+        return {
+            "fichier": str(self.fichier_json),
+            "empreinte": self.empreinte,
+            "charge_le": self.charge_le,
+            "nb_stations": len(self.table),
+            "nb_aretes": int(len(self.indices) // 2),
+            "cache_bbox": {"succes": cache.hits, "echecs": cache.misses, "taille": cache.currsize},
+        }
+
+###################################################################################################
+###################################################################################################
+
+# Encoder une réponse JSON
+def encoder(objet):
+    return json.dumps(objet, ensure_ascii=False).encode("utf-8")
+
+# Lire un paramètre numérique de la requête (obligatoire si aucune valeur par défaut n'est donnée)
+def parametre(parametres, nom, type_=float, defaut=None):
+    valeurs = parametres.get(nom)
+    if not valeurs:
+        if defaut is None:
+            raise ErreurRequete(400, f"Paramètre manquant : {nom}")
+        return defaut
+    try:
+        valeur = type_(valeurs[0])
+    except ValueError:
+        valeur = None
+    if valeur is None or not math.isfinite(valeur):
+        raise ErreurRequete(400, f"Paramètre invalide : {nom}={valeurs[0]}")
+    return valeur
+
+class ServeurStations:
+    """Répond aux requêtes HTTP à partir des données chargées, et les recharge si le fichier change."""
+
+    def __init__(self, fichier_json, alpha=0.5, taille_cache=TAILLE_CACHE):
+        self.fichier_json = fichier_json
+        self.alpha = alpha
+        self.taille_cache = taille_cache
+        self.signature = self._signature()
+        self.donnees = Donnees.charger(fichier_json, alpha, taille_cache)
+
+    # Date de modification et taille du fichier (l'empreinte n'est recalculée que si elles changent)
+    def _signature(self):
+        etat = os.stat(self.fichier_json)
+        return etat.st_mtime_ns, etat.st_size
+
+    # Réponse à une requête : (code HTTP, corps encodé)
+    def repondre(self, methode, cible):
+        if methode not in ("GET", "HEAD"):
+            raise ErreurRequete(405, f"Méthode non prise en charge : {methode}")
+        url = urlsplit(cible)
+        chemin, parametres = url.path.rstrip("/") or "/", parse_qs(url.query)
+        donnees = self.donnees  # Même version des données pendant toute la requête
+
+        if chemin == "/":
+            return encoder(donnees.etat())
+        if chemin.startswith("/stations/"):
+            return encoder(donnees.detail_station(unquote(chemin[len("/stations/"):])))
+        if chemin == "/nearest":
+            lat, lon = parametre(parametres, "lat"), parametre(parametres, "lon")
+            k = parametre(parametres, "k", int, 1)
+            if not 1 <= k <= K_MAX:
+                raise ErreurRequete(400, f"k doit être compris entre 1 et {K_MAX}")
+            return encoder(donnees.plus_proches(lat, lon, k))
+        if chemin == "/bbox":
+            sud, ouest, nord, est = (round(parametre(parametres, nom), 6) for nom in ("sud", "ouest", "nord", "est"))
+            if sud > nord or ouest > est:
+                raise ErreurRequete(400, "Rectangle invalide (sud > nord ou ouest > est)")
+            return donnees.bbox(sud, ouest, nord, est)
+        if chemin == "/indices":
+            return donnees.indices_json()
+        raise ErreurRequete(404, f"Route inconnue : {chemin}")
+
+    ###############################################################################################
+
+    # Servir une connexion (plusieurs requêtes successives si le client garde la connexion)
+    async def servir_client(self, lecteur, ecrivain):
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne:
+                    break
+                try:
+                    methode, cible, version = ligne.decode("latin-1").split()
+                except ValueError:
+                    await self._envoyer(ecrivain, 400, encoder({"erreur": "Requête mal formée"}), False)
+                    break
+                entetes = {}
+                while True:
+                    ligne = await lecteur.readline()
+                    if ligne in (b"\r\n", b"\n", b""):
+                        break
+                    cle, _, valeur = ligne.decode("latin-1").partition(":")
+                    entetes[cle.strip().lower()] = valeur.strip().lower()
+                if int(entetes.get("content-length", 0) or 0):
+                    await lecteur.readexactly(int(entetes["content-length"]))  # Corps ignoré
+
+                connexion = entetes.get("connection", "")
+                garder = connexion == "keep-alive" if version == "HTTP/1.0" else connexion != "close"
+                try:
+                    statut, corps = 200, self.repondre(methode, cible)
+                except ErreurRequete as e:
+                    statut, corps = e.statut, encoder({"erreur": str(e)})
+                await self._envoyer(ecrivain, statut, b"" if methode == "HEAD" else corps, garder, len(corps))
+                if not garder:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Client déconnecté, ou ligne trop longue
+        finally:
+            ecrivain.close()
+
+    # Envoyer une réponse JSON
+    @staticmethod
+    async def _envoyer(ecrivain, statut, corps, garder, longueur=None):
+        entetes = (f"HTTP/1.1 {statut} {HTTPStatus(statut).phrase}\r\n"
+                   "Content-Type: application/json; charset=utf-8\r\n"
+                   f"Content-Length: {len(corps) if longueur is None else longueur}\r\n"
+                   f"Connection: {'keep-alive' if garder else 'close'}\r\n\r\n")
+        ecrivain.write(entetes.encode("latin-1") + corps)
+        await ecrivain.drain()
+
+    # Recharger les données dès que l'empreinte du fichier des stations change
+    async def surveiller(self, intervalle=2.0):
+        boucle = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(intervalle)
+            try:
+                signature = self._signature()
+                if signature == self.signature:
+                    continue
+                self.signature = signature
+                from data.cache import empreinte_fichier
+                empreinte = await boucle.run_in_executor(None, empreinte_fichier, self.fichier_json)
+                if empreinte == self.donnees.empreinte:
+                    continue
+                # Chargement dans un thread : les requêtes continuent d'être servies avec les anciennes données
+                self.donnees = await boucle.run_in_executor(
+                    None, Donnees.charger, self.fichier_json, self.alpha, self.taille_cache,
+                )
+                print(f"Données rechargées : {len(self.donnees.table)} stations "
+                      f"(empreinte {self.donnees.empreinte[:12]})", flush=True)
+            except (OSError, ValueError, KeyError) as e:  # Fichier absent ou en cours d'écriture
+                print(f"Rechargement impossible ({e}), les données précédentes sont conservées", flush=True)
+
+###################################################################################################
+###################################################################################################
+
+# Démarrer le serveur et le faire tourner jusqu'à son arrêt
+async def servir(fichier_json="station_informations.json", hote="127.0.0.1", port=8080, alpha=0.5,
+                 intervalle=2.0, taille_cache=TAILLE_CACHE):
+    serveur_stations = ServeurStations(fichier_json, alpha, taille_cache)
+    serveur = await asyncio.start_server(serveur_stations.servir_client, hote, port)
+    print(f"{len(serveur_stations.donnees.table)} stations servies sur http://{hote}:{port}/ "
+          "(Ctrl+C pour arrêter)", flush=True)
+    surveillance = asyncio.ensure_future(serveur_stations.surveiller(intervalle))
+    try:
+        async with serveur:
+            await serveur.serve_forever()
+    finally:
+        surveillance.cancel()
@@ -1,74 +1,82 @@
 # Importation des bibliothèques nécessaires
-import json  # Pour manipuler les fichiers JSON
-import networkx as nx  # Pour créer et manipuler des graphes
-import matplotlib.pyplot as plt  # Pour visualiser les graphes
-import folium  # Pour créer des cartes interactives
-import branca  # Pour ajouter une légende aux cartes
+import argparse  # Pour lire les options de la ligne de commande
+import sys  # Pour modifier le chemin des imports
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+import numpy as np  # Pour manipuler des tableaux numériques
+
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data.geo import ponderer_aretes  # Longueur géographique des arêtes
+from data.liste_adjacence import charger_csr  # Liste d'adjacence au format CSR
+from data.station_table import StationTable  # Table des stations en colonnes
+from visualization.rendu_statique import rendre_acm  # Rendu statique sans écran
+from profilage import mesure  # Mesure des étapes (option --profile)
 
 # Étape 1 : Chargement des Données
-def charger_donnees(fichier_json):
-    # Ouvre et charge le contenu d'un fichier JSON
-    with open(fichier_json, "r") as file:
-        return json.load(file)
-
-# Étape 2 : Construction du graphe à partir de la liste d'adjacence
-def construire_graphe(liste_adjacence):
-    # Crée un graphe non orienté
-    G = nx.Graph()
-    # Ajoute les arêtes au graphe à partir de la liste d'adjacence
-    for station, voisins in liste_adjacence.items():
-        for voisin in voisins:
-            G.add_edge(int(station), int(voisin))  # Ajoute une arête entre deux stations
-    return G
-
-# Étape 3 : Calcul de l'Arbre Couvrant Minimum (ACM) avec Kruskal
-def calculer_acm(graphe):
-    # Calcule l'ACM en utilisant l'algorithme de Kruskal
-    return nx.minimum_spanning_tree(graphe, algorithm="kruskal")
-
-# Étape 4 : Visualisation de l'ACM
-def afficher_acm(acm):
-    # Configure la taille de la figure pour l'affichage
-    plt.figure(figsize=(12, 8))
-    # Calcule la disposition des nœuds pour le graphe
-    pos = nx.spring_layout(acm)
-    # Dessine le graphe avec les nœuds et les arêtes
-    nx.draw(acm, pos, with_labels=False, node_size=50, edge_color="blue")
-    # Ajoute un titre au graphique
-    plt.title("Arbre Couvrant Minimum des Stations")
-    # Affiche le graphique
-    plt.show()
+def charger_donnees(dossier_csr):
+    # Projette en mémoire la liste d'adjacence CSR (ids, indptr, indices)
+    return charger_csr(dossier_csr)
+
+# Étape 2 : Calcul de l'ACM géographique sur une matrice creuse
+@mesure("acm", lambda acm: {"aretes": len(acm[0])})
+def calculer_acm_geographique(liste_adjacence, coordonnees_stations):
+    """Retourne les arêtes (u, v, longueurs) de l'arbre couvrant de longueur totale minimale."""
+    from scipy.sparse import csr_matrix  # Import coûteux, seulement si nécessaire
+    from scipy.sparse.csgraph import minimum_spanning_tree
+
+    u, v, longueurs = ponderer_aretes(liste_adjacence, coordonnees_stations)
+    n = len(coordonnees_stations)
+    # Une longueur nulle serait vue comme une arête absente : on la remplace par une valeur infime
+    poids = csr_matrix((np.maximum(longueurs, 1e-6), (u, v)), shape=(n, n))
+    acm = minimum_spanning_tree(poids).tocoo()
+    return acm.row.astype(np.int64), acm.col.astype(np.int64), acm.data
+
+# Statistiques de l'ACM : longueur totale et degrés des stations
+def statistiques_acm(u, v, longueurs, nb_stations):
+    degres = np.bincount(np.concatenate((u, v)), minlength=nb_stations)
+    return {
+        "nb_aretes": int(len(longueurs)),
+        "longueur_totale_km": float(longueurs.sum() / 1000),
+        "longueur_moyenne_m": float(longueurs.mean()) if len(longueurs) else 0.0,
+        "longueur_max_m": float(longueurs.max()) if len(longueurs) else 0.0,
+        "nb_composantes": int(nb_stations - len(longueurs)),  # Une forêt si le graphe n'est pas connexe
+        "degre_moyen": float(degres.mean()) if nb_stations else 0.0,
+        "degre_max": int(degres.max()) if nb_stations else 0,
+        "nb_feuilles": int((degres == 1).sum()),
+        "repartition_degres": np.bincount(degres).tolist(),
+    }
+
+# Étape 3 : Visualisation de l'ACM
+def afficher_acm(acm, coordonnees_stations, sortie=None):
+    # acm : couple (u, v) des lignes de la table reliées par chaque arête de l'ACM
+    u, v = acm
+    # Dessine les arêtes en une seule collection, aux vraies coordonnées des stations,
+    # puis écrit l'image dans `sortie` (PNG, SVG...) ou l'affiche si aucun fichier n'est donné
+    rendre_acm(coordonnees_stations.lat, coordonnees_stations.lon, u, v, sortie=sortie)
 
 # Chargement des coordonnées des stations depuis un fichier JSON
 def charger_coordonnees(fichier_json):
-    # Ouvre et charge le fichier JSON
-    with open(fichier_json, 'r') as file:
-        data = json.load(file)
-    # Extrait les coordonnées des stations
-    stations = data.get("data", {}).get("stations", [])
-    # Retourne un dictionnaire avec les coordonnées (latitude, longitude) des stations
-    return {str(station["station_id"]): (station["lat"], station["lon"]) for station in stations}
+    # Retourne la table des stations (colonnes lat/lon et index identifiant → ligne)
+    return StationTable.charger(fichier_json)
 
 # Affichage de l'ACM sur une carte interactive avec folium
+@mesure("carte_acm")
 def afficher_acm_folium(acm, coordonnees_stations):
-    # Crée une carte centrée sur Paris
-    m = folium.Map(location=[48.8566, 2.3522], zoom_start=12)
-
-    # Ajoute les stations sur la carte
-    for station, (lat, lon) in coordonnees_stations.items():
-        folium.CircleMarker(location=[lat, lon], radius=3, color="red", fill=True, fill_color="red").add_to(m)
-
-    # Ajoute les connexions de l'ACM sur la carte
-    for u, v in acm.edges():
-        # Vérifie que les stations existent dans les coordonnées
-        if str(u) in coordonnees_stations and str(v) in coordonnees_stations:
-            lat1, lon1 = coordonnees_stations[str(u)]
-            lat2, lon2 = coordonnees_stations[str(v)]
-            # Trace une ligne entre les deux stations
-            folium.PolyLine([(lat1, lon1), (lat2, lon2)], color="blue", weight=1.5).add_to(m)
-        else:
-            # Affiche un message si une station est manquante
-            print(f"Pas de correspondance pour l'arête ({u}, {v}) dans les coordonnées des stations.")
+    import folium  # Pour créer des cartes interactives (import coûteux)
+    from visualization.rendu_geojson import carte_centree, couche_segments, couche_stations  # Couches GeoJSON
+
+    # acm : couple (u, v) des lignes de la table reliées par chaque arête de l'ACM
+    u, v = acm
+    lat, lon = coordonnees_stations.lat, coordonnees_stations.lon
+    # Crée une carte centrée sur les stations
+    m = carte_centree(lat, lon, zoom_start=12)
+
+    # Ajoute les stations sur la carte (une seule couche GeoJSON)
+    couche_stations(lat, lon, couleurs="red", rayons=3, style={"fill": True}).add_to(m)
+
+    # Ajoute les connexions de l'ACM sur la carte (une seule couche GeoJSON)
+    couche_segments(lat[u], lon[u], lat[v], lon[v], style={"color": "blue", "weight": 1.5}).add_to(m)
 
     # Ajoute une légende à la carte
     legend_html = """
@@ -95,33 +103,42 @@ def afficher_acm_folium(acm, coordonnees_stations):
 
 # Programme principal
 if __name__ == "__main__":
-    # Nom du fichier contenant la liste d'adjacence
-    fichier_json = "liste_adjacence.json"
+    # Option --figure : écrire l'image de l'ACM au lieu de l'afficher (utilisable sans écran)
+    parser = argparse.ArgumentParser(description="Calculer et visualiser l'ACM des stations")
+    parser.add_argument("--figure", help="Fichier image de l'ACM (PNG, SVG...)")
+    args = parser.parse_args()
+
+    # Nom du dossier contenant la liste d'adjacence CSR
+    dossier_csr = "liste_adjacence_csr"
     # Charge la liste d'adjacence
-    liste_adjacence = charger_donnees(fichier_json)
-    # Construit le graphe à partir de la liste d'adjacence
-    G = construire_graphe(liste_adjacence)
-   
-    # Affiche le nombre de nœuds et d'arêtes dans le graphe
-    print(f"Nombre de stations (nœuds) : {G.number_of_nodes()}")
-    print(f"Nombre de connexions (arêtes) : {G.number_of_edges()}")
- 
-    # Calcule l'ACM du graphe
-    ACM = calculer_acm(G)
-    # Affiche le nombre d'arêtes dans l'ACM
-    print(f"Nombre de connexions dans l'ACM : {ACM.number_of_edges()}")
-   
-    # Affiche l'ACM sous forme de graphe
-    afficher_acm(ACM)
+    liste_adjacence = charger_donnees(dossier_csr)
     # Nom du fichier contenant les informations des stations
     fichier_stations = "station_informations.json"
     # Charge les coordonnées des stations
     coordonnees_stations = charger_coordonnees(fichier_stations)
-    
+
+    # Affiche le nombre de nœuds et d'arêtes dans le graphe
+    ids, indptr, indices = liste_adjacence
+    print(f"Nombre de stations (nœuds) : {len(ids)}")
+    print(f"Nombre de connexions (arêtes) : {len(indices) // 2}")
+
+    # Calcule l'ACM géographique (arêtes pondérées par leur longueur)
+    u, v, longueurs = calculer_acm_geographique(liste_adjacence, coordonnees_stations)
+    stats = statistiques_acm(u, v, longueurs, len(coordonnees_stations))
+    # Affiche les statistiques de l'ACM
+    print(f"Nombre de connexions dans l'ACM : {stats['nb_aretes']}")
+    print(f"Longueur totale de l'ACM : {stats['longueur_totale_km']:.2f} km")
+    print(f"Degré moyen : {stats['degre_moyen']:.2f} (max {stats['degre_max']}, "
+          f"{stats['nb_feuilles']} feuilles)")
+
+    # Affiche l'ACM sous forme de graphe, aux positions géographiques des stations
+    afficher_acm((u, v), coordonnees_stations, sortie=args.figure)
+
     # Affiche l'ACM sur une carte interactive
-    carte = afficher_acm_folium(ACM, coordonnees_stations)
+    carte = afficher_acm_folium((u, v), coordonnees_stations)
     
     # Sauvegarde la carte dans un fichier HTML
-    carte.save("velib_acm_map.html")
+    from visualization.rendu_geojson import sauvegarder_carte
+    sauvegarder_carte(carte, "velib_acm_map.html")
     # Retourne la carte (utile pour l'affichage dans certains environnements)
     carte
\ No newline at end of file
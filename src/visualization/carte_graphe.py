@@ -0,0 +1,74 @@
+"""
+Couches cartographiques de l'analyse du graphe des stations (data/graphe.py) : composantes connexes,
+degré, proximité et intermédiarité, chacune dans une couche GeoJSON que l'on peut afficher ou
+masquer depuis le contrôle des couches.
+"""
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from profilage import mesure  # Mesure des étapes (option --profile)
+
+# Couleurs des classes, de la valeur la plus faible à la plus forte
+PALETTE = ("#2c7bb6", "#abd9e9", "#ffffbf", "#fdae61", "#d7191c")
+
+# Couleurs des composantes connexes (la plus grande composante est en gris)
+COULEURS_COMPOSANTES = ("#1b9e77", "#d95f02", "#7570b3", "#e7298a", "#66a61e", "#e6ab02", "#a6761d")
+
+###################################################################################################
+###################################################################################################
+
+# Couleur de chaque valeur selon sa classe (quantiles)
+def couleurs_quantiles(valeurs, palette=PALETTE):
+    valeurs = np.nan_to_num(np.asarray(valeurs, dtype=np.float64))
+    if len(valeurs) == 0:
+        return []
+    seuils = np.quantile(valeurs, np.linspace(0, 1, len(palette) + 1)[1:-1])
+    classes = np.searchsorted(seuils, valeurs, side="right")
+    return [palette[c] for c in classes.tolist()]
+
+# Ajouter les couches de l'analyse du graphe à une carte Folium
+def ajouter_couches_graphe(m, table, analyse):
+    """Seule la couche de l'intermédiarité est affichée au départ."""
+    from visualization.rendu_geojson import couche_stations  # Couches GeoJSON
+
+    noms = table.liste_noms()
+    composante, degre = analyse["composante"], analyse["degre"]
+    proximite, intermediarite = analyse["proximite"], analyse["intermediarite"]
+
+    # Composantes connexes : la plus grande en gris, les autres en couleurs
+    principale = np.argmax(np.bincount(composante)) if len(composante) else -1
+    couleurs = ["#808080" if c == principale else COULEURS_COMPOSANTES[c % len(COULEURS_COMPOSANTES)]
+                for c in composante.tolist()]
+    infos = [f"{nom}<br>Composante {c} ({taille} stations)"
+             for nom, c, taille in zip(noms, composante.tolist(), analyse["taille_composante"].tolist())]
+    couches = [couche_stations(table.lat, table.lon, couleurs, rayons=4, infos=infos,
+                               style={"fill": True, "fill_opacity": 0.8}, nom="Composantes connexes")]
+
+    # Degré, proximité et intermédiarité : couleur selon la classe de la valeur
+    distances = np.nan_to_num(analyse["distance_moyenne_m"]).tolist()
+    for nom_couche, valeurs, rayons, texte in (
+        ("Degré", degre, np.clip(degre, 2, 10), lambda i: f"Degré : {degre[i]}"),
+        ("Proximité", proximite, 4,
+         lambda i: f"Proximité : {proximite[i]:.3g} (distance moyenne {distances[i]:.0f} m)"),
+        ("Intermédiarité", intermediarite,
+         4 + 8 * np.sqrt(intermediarite / max(intermediarite.max(), 1e-12)) if len(intermediarite) else 4,
+         lambda i: f"Intermédiarité : {intermediarite[i]:.4f}"),
+    ):
+        infos = [f"{nom}<br>{texte(i)}" for i, nom in enumerate(noms)]
+        couches.append(couche_stations(table.lat, table.lon, couleurs_quantiles(valeurs), rayons=rayons,
+                                       infos=infos, style={"fill": True, "fill_opacity": 0.8}, nom=nom_couche))
+
+    for couche in couches:
+        couche.show = couche.layer_name == "Intermédiarité"
+        couche.add_to(m)
+    return m
+
+# Carte de l'analyse du graphe des stations
+@mesure("carte_graphe")
+def carte_graphe(table, analyse):
+    import folium  # Pour créer des cartes interactives (import coûteux)
+    from visualization.rendu_geojson import carte_centree
+
+    m = carte_centree(table.lat, table.lon, zoom_start=12)
+    ajouter_couches_graphe(m, table, analyse)
+    folium.LayerControl(collapsed=False).add_to(m)
+    return m
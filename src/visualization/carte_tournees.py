@@ -0,0 +1,49 @@
+"""
+Carte des tournées de rééquilibrage (data/reequilibrage.py) : écart de chaque station à sa cible
+(vélos en trop en rouge, manquants en bleu) et une couche par camion avec son itinéraire et ses arrêts.
+"""
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from profilage import mesure  # Mesure des étapes (option --profile)
+
+# Couleurs des tournées (une par camion)
+COULEURS_CAMIONS = ("#1b9e77", "#d95f02", "#7570b3", "#e7298a", "#66a61e", "#e6ab02", "#a6761d")
+
+###################################################################################################
+###################################################################################################
+
+# Carte des tournées de rééquilibrage
+@mesure("carte_tournees")
+def carte_tournees(table, ecarts, plan):
+    """`ecarts` donne, pour chaque station de `table`, le nombre de vélos en trop (> 0) ou manquants (< 0)."""
+    import folium  # Pour créer des cartes interactives (import coûteux)
+    from visualization.rendu_geojson import carte_centree, couche_segments, couche_stations
+
+    m = carte_centree(table.lat, table.lon, zoom_start=12)
+
+    # Écart de chaque station à sa cible
+    couleurs = np.where(ecarts > 0, "#d7191c", np.where(ecarts < 0, "#2c7bb6", "#bdbdbd")).tolist()
+    infos = [f"{nom}<br>Écart à la cible : {e:+d}" for nom, e in zip(table.liste_noms(), ecarts.tolist())]
+    couche_stations(table.lat, table.lon, couleurs, rayons=np.clip(2 + np.abs(ecarts) / 3, 2, 10), infos=infos,
+                    style={"fill": True, "fill_opacity": 0.6}, nom="Écarts aux cibles").add_to(m)
+
+    # Itinéraire et arrêts de chaque camion
+    depot = plan["depot"]
+    for tournee in plan["tournees"]:
+        couleur = COULEURS_CAMIONS[(tournee["camion"] - 1) % len(COULEURS_CAMIONS)]
+        arrets = tournee["arrets"]
+        points = np.array([depot] + [[a["lat"], a["lon"]] for a in arrets] + [depot])
+        nom = (f"Camion {tournee['camion']} ({len(arrets)} arrêts, {tournee['distance_km']:.1f} km, "
+               f"{tournee['duree_min']:.0f} min)")
+        groupe = folium.FeatureGroup(name=nom)
+        couche_segments(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1],
+                        style={"color": couleur, "weight": 3, "opacity": 0.8}).add_to(groupe)
+        infos = [f"{k}. {a['nom']}<br>{a['operation'].capitalize()} de {a['quantite']} vélo(s)"
+                 f"<br>Charge du camion : {a['charge']}" for k, a in enumerate(arrets, start=1)]
+        couche_stations(points[1:-1, 0], points[1:-1, 1], couleur, rayons=6, infos=infos,
+                        style={"fill": True, "fill_opacity": 1.0}).add_to(groupe)
+        groupe.add_to(m)
+
+    folium.Marker(depot, tooltip="Dépôt", icon=folium.Icon(color="black", icon="home")).add_to(m)
+    folium.LayerControl(collapsed=False).add_to(m)
+    return m
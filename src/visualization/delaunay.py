@@ -1,32 +1,29 @@
 # Importation des bibliothèques nécessaires
-import numpy as np  # Pour manipuler des tableaux de données numériques
-from scipy.spatial import Delaunay  # Pour effectuer la triangulation de Delaunay
-import matplotlib.pyplot as plt  # Pour visualiser les données
+import argparse  # Pour lire les options de la ligne de commande
+import sys  # Pour modifier le chemin des imports
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 ###################################################################################################
 ###################################################################################################
 
-# Importation d'une fonction personnalisée pour charger les données des stations
-from process_data import load_station_data
-
-# Charger les données des stations Vélib' à partir d'une source externe
-stations, _ = load_station_data()
+# Importation de la triangulation de Delaunay mise en cache et du rendu statique
+from data.triangulation import charger_triangulation
+from visualization.rendu_statique import rendre_triangulation
 
-# Extraction des coordonnées (latitude, longitude) des stations
-coords = np.array([[station['lat'], station['lon']] for station in stations])
+# Option --sortie : écrire l'image (PNG, SVG...) au lieu de l'afficher (utilisable sans écran)
+parser = argparse.ArgumentParser(description="Visualiser la triangulation de Delaunay des stations")
+parser.add_argument("--sortie", "-o", help="Fichier image de sortie (format déduit de l'extension)")
+args = parser.parse_args()
 
-# Création de la triangulation de Delaunay à partir des coordonnées
-delaunay = Delaunay(coords)
+# Charger la triangulation des stations (calculée une seule fois puis mise en cache)
+delaunay = charger_triangulation("station_informations.json")
 
 ###################################################################################################
 ###################################################################################################
 
 
-# Visualisation de la triangulation
-plt.figure(figsize=(8, 6))  # Définir la taille de la figure
-plt.triplot(coords[:, 1], coords[:, 0], delaunay.simplices, color='r')  # Dessiner les triangles
-plt.scatter(coords[:, 1], coords[:, 0], marker='o', color='b')  # Dessiner les points des stations
-plt.xlabel("Longitude")  # Étiquette pour l'axe des X
-plt.ylabel("Latitude")  # Étiquette pour l'axe des Y
-plt.title("Triangulation de Delaunay des stations Vélib'")  # Titre du graphique
-plt.show()  # Afficher le graphique
\ No newline at end of file
+# Visualisation de la triangulation (triangles dessinés en une seule collection)
+rendre_triangulation(delaunay.points, delaunay.simplices, sortie=args.sortie)
\ No newline at end of file
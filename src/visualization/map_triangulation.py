@@ -1,63 +1,49 @@
-import json  # Pour manipuler les fichiers JSON
-import folium  # Pour créer des cartes interactives
-from folium.plugins import MarkerCluster  # Pour regrouper les marqueurs sur la carte
-from scipy.spatial import Delaunay  # Pour effectuer la triangulation de Delaunay
+import sys  # Pour modifier le chemin des imports
+from pathlib import Path  # Pour manipuler les chemins de fichiers
 import numpy as np  # Pour manipuler des tableaux numériques
-import branca  # Pour ajouter des éléments personnalisés à la carte
 
-###################################################################################################
-###################################################################################################
-
-# Charger les données depuis le fichier JSON
-with open("station_informations.json", "r", encoding="utf-8") as file:
-    data = json.load(file)  # Charger le contenu du fichier JSON
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-# Extraire les stations
-stations_data = data.get("data", {}).get("stations", [])  # Récupérer la liste des stations
+from data.station_table import StationTable  # Table des stations en colonnes
+from data.triangulation import charger_triangulation  # Triangulation de Delaunay mise en cache
+from profilage import mesure  # Mesure des étapes (option --profile)
 
 ###################################################################################################
 ###################################################################################################
 
-# Vérifier si on a assez de points pour la triangulation
-if len(stations_data) < 3:
-    print("Pas assez de points pour effectuer la triangulation de Delaunay.")
-else:
-    # Récupérer les coordonnées des stations sous forme de tableau NumPy
-    points = np.array([[station["lat"], station["lon"]] for station in stations_data])
-
-    # Appliquer la triangulation de Delaunay
-    tri = Delaunay(points)
-
-    # Créer une carte Folium centrée sur Paris
-    m = folium.Map(location=[48.8566, 2.3522], zoom_start=11)
-
-    # Ajouter la triangulation de Delaunay sous forme de polygones
-    for simplex in tri.simplices:  # Parcourir chaque triangle de la triangulation
-        triangle = [points[i].tolist() for i in simplex]  # Convertir en liste de listes
-        folium.Polygon(
-            locations=triangle,  # Ajouter les sommets du triangle
-            color='black',  # Couleur des lignes
-            weight=1,  # Épaisseur des lignes
-            fill=True,  # Remplir les triangles
-            fill_color='grey',  # Couleur de remplissage
-            fill_opacity=0.25  # Opacité du remplissage
-        ).add_to(m)
+# Construire la carte de la triangulation à partir des tableaux déjà chargés
+@mesure("carte_triangulation")
+def carte_triangulation(table, points, simplices):
+    import branca  # Pour ajouter des éléments personnalisés à la carte
+    import folium  # Pour créer des cartes interactives (import coûteux, seulement pour la carte)
+    from folium.plugins import MarkerCluster  # Pour regrouper les marqueurs sur la carte
+    from visualization.rendu_geojson import carte_centree, couche_stations, couche_triangles  # Couches GeoJSON
+
+    # Créer une carte Folium centrée sur les stations
+    m = carte_centree(table.lat, table.lon, zoom_start=11)
+
+    # Ajouter la triangulation de Delaunay sous forme d'une seule couche GeoJSON
+    couche_triangles(points, simplices, style={
+        "color": "black",  # Couleur des lignes
+        "weight": 1,  # Épaisseur des lignes
+        "fillColor": "grey",  # Couleur de remplissage
+        "fillOpacity": 0.25,  # Opacité du remplissage
+    }).add_to(m)
 
     # Créer un MarkerCluster pour gérer le regroupement des marqueurs
     marker_cluster = MarkerCluster().add_to(m)
 
-    # Ajouter des marqueurs pour chaque station
-    for station in stations_data:
-        folium.CircleMarker(
-            location=[station['lat'], station['lon']],  # Position du marqueur
-            radius=max(station.get('capacity', 0) // 5, 3),  # Taille du marqueur (éviter un rayon trop petit)
-            color='blue',  # Couleur du contour
-            weight=2,  # Épaisseur du contour
-            fill=True,  # Remplir le marqueur
-            fill_color='blue',  # Couleur de remplissage
-            fill_opacity=0.6,  # Opacité du remplissage
-            tooltip=f"{station.get('name', 'Inconnu')}<br> Capacité: {station.get('capacity', 0)}"  # Info-bulle avec nom et capacité
-        ).add_to(marker_cluster)
+    # Ajouter les marqueurs de toutes les stations en une seule couche GeoJSON
+    infos = [f"{nom}<br> Capacité: {capacite}"  # Info-bulle avec nom et capacité
+             for nom, capacite in zip(table.liste_noms(), table.capacity.tolist())]
+    couche_stations(
+        table.lat, table.lon,
+        couleurs='blue',  # Couleur du contour et du remplissage
+        rayons=np.maximum(table.capacity // 5, 3),  # Taille du marqueur (éviter un rayon trop petit)
+        infos=infos,
+        style={"weight": 2, "fill": True, "fill_opacity": 0.6},  # Épaisseur du contour et opacité
+    ).add_to(marker_cluster)
 
     # Créer une légende en HTML
     legend_html = '''
@@ -80,7 +66,29 @@ else:
     legende = branca.element.MacroElement()
     legende._template = branca.element.Template(legend_html)
     m.get_root().add_child(legende)
+    return m  # Retourner la carte (utile dans certains environnements)
+
+# Générer la carte de la triangulation de Delaunay des stations
+def generer_carte_triangulation(fichier_json="station_informations.json",
+                                fichier_carte="velib_triangulation_map.html"):
+    # Charger la table des stations (le fichier JSON n'est analysé que s'il a changé)
+    table = StationTable.charger(fichier_json)
+
+    # Vérifier si on a assez de points pour la triangulation
+    if len(table) < 3:
+        print("Pas assez de points pour effectuer la triangulation de Delaunay.")
+        return None
+
+    # Charger la triangulation de Delaunay (calculée une seule fois puis mise en cache)
+    tri = charger_triangulation(fichier_json)
+
+    # Construire puis sauvegarder la carte dans un fichier HTML
+    from visualization.rendu_geojson import sauvegarder_carte
+    m = carte_triangulation(table, tri.points, tri.simplices)
+    sauvegarder_carte(m, fichier_carte)
+    return m
+
 
-    # Sauvegarder la carte dans un fichier HTML
-    m.save('velib_stations_map.html')  # Sauvegarder la carte dans un fichier HTML
-    m  # Retourner la carte (utile dans certains environnements)
\ No newline at end of file
+# Code principal
+if __name__ == "__main__":
+    generer_carte_triangulation()
@@ -0,0 +1,139 @@
+"""
+Rendu des couches Folium sous forme de GeoJSON construit directement à partir des tableaux NumPy.
+Chaque couche (triangles, cellules, stations) devient un seul objet `folium.GeoJson`
+au lieu d'un objet Folium (et d'un bloc JavaScript) par élément.
+"""
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+import folium  # Pour créer des cartes interactives
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from profilage import compter, compter_fichier, mesure  # Mesure des étapes (option --profile)
+
+# Centre utilisé lorsqu'il n'y a aucune station (Paris)
+CENTRE_DEFAUT = (48.8566, 2.3522)
+
+# Fonction JavaScript appliquant à chaque station la couleur, le rayon et l'info-bulle
+# stockés dans ses propriétés GeoJSON (un seul bloc de code pour toute la couche)
+STYLE_STATIONS = folium.JsCode("""
+function(feature, layer) {
+    var p = feature.properties;
+    layer.setStyle({color: p.couleur, fillColor: p.couleur});
+    layer.setRadius(p.rayon);
+    if (p.info) {
+        layer.bindTooltip(p.info);
+    }
+}
+""")
+
+###################################################################################################
+###################################################################################################
+
+# Carte centrée sur des stations, le zoom initial étant ajusté à leur emprise
+def carte_centree(lat, lon, zoom_start=12):
+    if len(lat) == 0:
+        return folium.Map(location=list(CENTRE_DEFAUT), zoom_start=zoom_start)
+    sud, nord, ouest, est = float(np.min(lat)), float(np.max(lat)), float(np.min(lon)), float(np.max(lon))
+    m = folium.Map(location=[(sud + nord) / 2, (ouest + est) / 2], zoom_start=zoom_start)
+    m.fit_bounds([[sud, ouest], [nord, est]])
+    return m
+
+# Convertir des anneaux (latitude, longitude) en anneaux GeoJSON fermés (longitude, latitude)
+def _anneaux_geojson(coords, offsets):
+    anneaux = np.split(np.asarray(coords)[:, ::-1], np.asarray(offsets)[1:-1])
+    return [[np.vstack((anneau, anneau[:1])).tolist()] for anneau in anneaux]
+
+# Couche de polygones : une entité MultiPolygon par couleur
+def couche_polygones(coords, offsets, couleurs=None, style=None, nom=None):
+    """Retourne une couche GeoJSON contenant tous les polygones.
+
+    Les sommets du polygone k sont coords[offsets[k]:offsets[k + 1]] (latitude, longitude).
+    Les polygones de même couleur sont regroupés dans une seule entité MultiPolygon.
+    """
+    style = dict(style or {})
+    anneaux = _anneaux_geojson(coords, offsets)
+    compter(polygones=len(anneaux))
+    if couleurs is None:
+        groupes = {style.get("color"): anneaux}
+    else:
+        groupes = {}
+        for anneau, couleur in zip(anneaux, couleurs):
+            groupes.setdefault(couleur, []).append(anneau)
+
+    entites = []
+    for couleur, polygones in groupes.items():
+        style_entite = dict(style)
+        if couleurs is not None:
+            style_entite.update(color=couleur, fillColor=couleur)
+        entites.append({
+            "type": "Feature",
+            "geometry": {"type": "MultiPolygon", "coordinates": polygones},
+            "properties": {"style": style_entite},
+        })
+    return folium.GeoJson(
+        {"type": "FeatureCollection", "features": entites},
+        name=nom,
+        style_function=lambda feature: feature["properties"]["style"],
+    )
+
+# Couche des triangles d'une triangulation (une seule entité pour tous les triangles)
+def couche_triangles(points, simplices, style=None, nom=None):
+    coords = np.asarray(points)[np.asarray(simplices)].reshape(-1, 2)
+    offsets = np.arange(0, len(coords) + 1, 3)
+    return couche_polygones(coords, offsets, style=style, nom=nom)
+
+# Couche de segments : une seule entité MultiLineString pour tous les segments
+def couche_segments(lat1, lon1, lat2, lon2, style=None, nom=None):
+    debuts = np.column_stack((lon1, lat1))
+    fins = np.column_stack((lon2, lat2))
+    segments = np.stack((debuts, fins), axis=1).tolist()
+    compter(segments=len(segments))
+    entite = {
+        "type": "Feature",
+        "geometry": {"type": "MultiLineString", "coordinates": segments},
+        "properties": {"style": dict(style or {})},
+    }
+    return folium.GeoJson(
+        {"type": "FeatureCollection", "features": [entite]},
+        name=nom,
+        style_function=lambda feature: feature["properties"]["style"],
+    )
+
+# Couche des stations : une entité Point par station, stylée par ses propriétés
+def couche_stations(lat, lon, couleurs, rayons, infos=None, style=None, nom=None):
+    """Retourne une couche GeoJSON de cercles, un par station.
+
+    `couleurs`, `rayons` et `infos` (info-bulles HTML) sont des séquences alignées sur `lat`/`lon` ;
+    `couleurs` peut aussi être une seule couleur, et `rayons` un seul nombre.
+    """
+    n = len(lat)
+    if isinstance(couleurs, str):
+        couleurs = [couleurs] * n
+    rayons = np.broadcast_to(np.asarray(rayons), (n,)).tolist()
+    infos = [None] * n if infos is None else infos
+    compter(marqueurs=n)
+
+    entites = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [x, y]},
+            "properties": {"couleur": couleur, "rayon": rayon, "info": info},
+        }
+        for x, y, couleur, rayon, info in zip(np.asarray(lon).tolist(), np.asarray(lat).tolist(),
+                                              couleurs, rayons, infos)
+    ]
+    return folium.GeoJson(
+        {"type": "FeatureCollection", "features": entites},
+        name=nom,
+        marker=folium.CircleMarker(**(style or {})),
+        on_each_feature=STYLE_STATIONS,
+    )
+
+###################################################################################################
+###################################################################################################
+
+# Sauvegarder une carte dans un fichier HTML
+@mesure("ecriture_html")
+def sauvegarder_carte(m, fichier):
+    Path(fichier).parent.mkdir(parents=True, exist_ok=True)
+    m.save(str(fichier))
+    compter_fichier(fichier)
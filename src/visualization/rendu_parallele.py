@@ -0,0 +1,152 @@
+"""
+Rendu parallèle de toutes les cartes : les tableaux des stations, de la triangulation, des cellules
+de Voronoi, des indices et de l'ACM sont calculés une seule fois puis placés en mémoire partagée ;
+chaque carte est construite et sérialisée en HTML dans un processus séparé, qui lit ces tableaux
+sans copie, et écrite dans son propre fichier.
+"""
+import time  # Pour mesurer la durée du rendu de chaque carte
+from concurrent.futures import ProcessPoolExecutor  # Pour répartir les cartes entre les processus
+from multiprocessing import shared_memory  # Pour partager les tableaux entre les processus
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+import numpy as np  # Pour manipuler des tableaux numériques
+
+from profilage import fusionner, initialiser_processus, mesurer_processus, options_processus
+
+# Fichier produit pour chaque carte
+CARTES = {
+    "stations": "stations_map.html",
+    "triangulation": "velib_triangulation_map.html",
+    "indices": "velib_indices_map.html",
+    "voronoi": "velib_voronoi_map.html",
+    "acm": "velib_acm_map.html",
+}
+
+###################################################################################################
+###################################################################################################
+
+# Copier des tableaux dans des segments de mémoire partagée
+def partager(tableaux):
+    """Retourne (segments, descripteurs) ; descripteurs associe à chaque nom de tableau le nom
+    de son segment, sa forme et son type, suffisants pour l'ouvrir dans un autre processus."""
+    segments, descripteurs = [], {}
+    for nom, tableau in tableaux.items():
+        tableau = np.ascontiguousarray(tableau)
+        segment = shared_memory.SharedMemory(create=True, size=max(tableau.nbytes, 1))
+        np.ndarray(tableau.shape, tableau.dtype, buffer=segment.buf)[...] = tableau
+        segments.append(segment)
+        descripteurs[nom] = (segment.name, tableau.shape, tableau.dtype.str)
+    return segments, descripteurs
+
+# Ouvrir, sans copie, les tableaux partagés décrits par `descripteurs`
+def attacher(descripteurs):
+    segments, tableaux = [], {}
+    for nom, (nom_segment, forme, type_) in descripteurs.items():
+        segment = shared_memory.SharedMemory(name=nom_segment)
+        segments.append(segment)
+        tableaux[nom] = np.ndarray(forme, np.dtype(type_), buffer=segment.buf)
+    return segments, tableaux
+
+###################################################################################################
+###################################################################################################
+
+# Construire une carte à partir des tableaux partagés
+def _construire(carte, t):
+    from data.cellules_voronoi import CellulesVoronoi
+    from data.station_table import StationTable
+
+    table = StationTable(t["station_id"], t["lat"], t["lon"], t["capacity"],
+                         t["noms"], t["noms_offsets"], t["ordre"])
+    if carte == "stations":
+        from visualization.view_map_stations import carte_stations
+        return carte_stations(table)
+    if carte == "triangulation":
+        from visualization.map_triangulation import carte_triangulation
+        return carte_triangulation(table, t["points"], t["simplices"])
+    if carte == "indices":
+        from data.indice_repartition import carte_indices
+        return carte_indices(table, t["points"], t["simplices"], t["indices"])
+    if carte == "voronoi":
+        from visualization.voronoi_map import carte_voronoi
+        cellules = CellulesVoronoi(t["cellules_coords"], t["cellules_offsets"], t["cellules_aires"])
+        return carte_voronoi(table, cellules, t["indices"])
+    if carte == "acm":
+        from visualization.arbre_couvrant import afficher_acm_folium
+        return afficher_acm_folium((t["acm_u"], t["acm_v"]), table)
+    raise ValueError(f"Carte inconnue : {carte}")
+
+# Construire et écrire une carte à partir des tableaux partagés décrits par `descripteurs`
+def _construire_et_ecrire(carte, descripteurs, sortie):
+    from visualization.rendu_geojson import sauvegarder_carte
+
+    segments, tableaux = attacher(descripteurs)
+    try:
+        sauvegarder_carte(_construire(carte, tableaux), sortie)
+    finally:
+        del tableaux  # Plus aucune vue sur les segments : ils peuvent être fermés
+        for segment in segments:
+            segment.close()
+
+# Rendre une carte dans un processus du pool ; retourne la durée du rendu en secondes et ses mesures
+def _rendre(carte, descripteurs, sortie, options_profilage):
+    debut = time.perf_counter()
+    _, mesures = mesurer_processus(f"rendu_{carte}", options_profilage, _construire_et_ecrire,
+                                   carte, descripteurs, sortie)
+    return time.perf_counter() - debut, mesures
+
+###################################################################################################
+###################################################################################################
+
+# Rendre toutes les cartes en parallèle
+def rendre_tout(fichier_json="station_informations.json", dossier="results/maps", processus=None,
+                cartes=tuple(CARTES)):
+    """Écrit chaque carte de `cartes` dans `dossier` ; retourne {carte: (fichier, durée)}.
+
+    Avec --profile, les mesures du rendu de chaque carte (étape `rendu_<carte>`) sont ajoutées à
+    l'étape en cours."""
+    from data.cellules_voronoi import charger_cellules
+    from data.indice_repartition import calculer_indices
+    from data.liste_adjacence import construire_adjacence
+    from data.station_table import StationTable
+    from data.triangulation import charger_triangulation
+    from visualization.arbre_couvrant import calculer_acm_geographique
+
+    # Données communes, chargées (ou calculées) une seule fois
+    table = StationTable.charger(fichier_json)
+    if len(table) < 3:
+        print("Pas assez de stations pour effectuer la triangulation de Delaunay.")
+        return {}
+    tri = charger_triangulation(fichier_json)
+    cellules = charger_cellules(fichier_json)
+    # Liste d'adjacence déduite de la triangulation, dans l'ordre de la table
+    indptr, indices = construire_adjacence(tri)
+    u, v, _ = calculer_acm_geographique((table.station_id, indptr, indices), table)
+
+    segments, descripteurs = partager({
+        "station_id": table.station_id, "lat": table.lat, "lon": table.lon, "capacity": table.capacity,
+        "noms": table.noms, "noms_offsets": table.noms_offsets, "ordre": table.ordre,
+        "points": tri.points, "simplices": tri.simplices,
+        "indices": calculer_indices(table, np.diff(indptr)),
+        "cellules_coords": cellules.coords, "cellules_offsets": cellules.offsets,
+        "cellules_aires": cellules.aires,
+        "acm_u": u, "acm_v": v,
+    })
+    Path(dossier).mkdir(parents=True, exist_ok=True)
+    try:
+        options_profilage = options_processus()
+        with ProcessPoolExecutor(processus, initializer=initialiser_processus) as executeur:
+            futurs = {
+                carte: executeur.submit(_rendre, carte, descripteurs, str(Path(dossier) / CARTES[carte]),
+                                        options_profilage)
+                for carte in cartes
+            }
+            resultats = {}
+            for carte, futur in futurs.items():
+                duree, mesures = futur.result()
+                fusionner(mesures)
+                resultats[carte] = (str(Path(dossier) / CARTES[carte]), duree)
+            return resultats
+    finally:
+        # Libérer la mémoire partagée
+        for segment in segments:
+            segment.close()
+            segment.unlink()
@@ -0,0 +1,114 @@
+"""
+Rendu statique (PNG, SVG...) des graphes de stations avec matplotlib, utilisable sans écran.
+Les arêtes et les polygones sont dessinés en une seule collection (LineCollection, PolyCollection)
+aux vraies coordonnées (longitude, latitude) des stations.
+"""
+import numpy as np  # Pour manipuler des tableaux numériques
+
+###################################################################################################
+###################################################################################################
+
+# Créer une figure : interactive (pyplot) ou autonome, sans dépendance à un affichage
+def creer_figure(titre, taille=(12, 8), interactif=False):
+    if interactif:
+        import matplotlib.pyplot as plt  # Nécessite un affichage
+        fig = plt.figure(figsize=taille)
+    else:
+        from matplotlib.figure import Figure  # Rendu sans écran (backend Agg)
+        fig = Figure(figsize=taille)
+    ax = fig.add_subplot()
+    ax.set_title(titre)  # Titre du graphique
+    ax.set_xlabel("Longitude")  # Étiquette pour l'axe des X
+    ax.set_ylabel("Latitude")  # Étiquette pour l'axe des Y
+    return fig, ax
+
+# Cadrer les axes sur les stations et corriger le rapport d'aspect pour respecter les distances
+def ajuster_axes(ax, lat, lon, marge=0.05):
+    for borner, valeurs in ((ax.set_xlim, lon), (ax.set_ylim, lat)):
+        bas, haut = np.min(valeurs), np.max(valeurs)
+        borner(bas - marge * (haut - bas), haut + marge * (haut - bas))
+    ax.set_aspect(1 / np.cos(np.radians(np.mean(lat))))
+
+# Enregistrer la figure dans un fichier (format déduit de l'extension), ou l'afficher
+def terminer_figure(fig, sortie=None, dpi=150):
+    if sortie:
+        fig.savefig(sortie, dpi=dpi, bbox_inches="tight")
+    else:
+        import matplotlib.pyplot as plt
+        plt.show()  # Afficher le graphique (bloquant)
+
+###################################################################################################
+###################################################################################################
+
+# Dessiner des segments (lat1, lon1) → (lat2, lon2) en une seule collection
+def tracer_segments(ax, lat1, lon1, lat2, lon2, **style):
+    from matplotlib.collections import LineCollection
+
+    segments = np.stack((np.column_stack((lon1, lat1)), np.column_stack((lon2, lat2))), axis=1)
+    collection = LineCollection(segments, **style)
+    ax.add_collection(collection)
+    return collection
+
+# Dessiner des polygones (sommets coords[offsets[k]:offsets[k + 1]] en latitude, longitude)
+def tracer_polygones(ax, coords, offsets, **style):
+    from matplotlib.collections import PolyCollection
+
+    polygones = np.split(np.asarray(coords)[:, ::-1], np.asarray(offsets)[1:-1])
+    collection = PolyCollection(polygones, **style)
+    ax.add_collection(collection)
+    return collection
+
+# Dessiner les stations
+def tracer_stations(ax, lat, lon, **style):
+    style.setdefault("s", 4)  # Taille des points
+    return ax.scatter(lon, lat, **style)
+
+###################################################################################################
+###################################################################################################
+
+# Rendu de l'arbre couvrant minimum
+def rendre_acm(lat, lon, u, v, sortie=None, titre="Arbre Couvrant Minimum des Stations"):
+    fig, ax = creer_figure(titre, interactif=sortie is None)
+    tracer_segments(ax, lat[u], lon[u], lat[v], lon[v], colors="blue", linewidths=0.8)
+    tracer_stations(ax, lat, lon, color="red", s=2)
+    ajuster_axes(ax, lat, lon)
+    terminer_figure(fig, sortie)
+
+# Rendu de la triangulation de Delaunay
+def rendre_triangulation(points, simplices, sortie=None,
+                         titre="Triangulation de Delaunay des stations Vélib'"):
+    points = np.asarray(points)
+    fig, ax = creer_figure(titre, taille=(8, 6), interactif=sortie is None)
+    coords = points[np.asarray(simplices)].reshape(-1, 2)
+    tracer_polygones(ax, coords, np.arange(0, len(coords) + 1, 3),
+                     facecolors="none", edgecolors="r", linewidths=0.5)  # Dessiner les triangles
+    tracer_stations(ax, points[:, 0], points[:, 1], color="b", marker="o")  # Dessiner les stations
+    ajuster_axes(ax, points[:, 0], points[:, 1])
+    terminer_figure(fig, sortie)
+
+# Rendu du diagramme de Voronoi (arêtes infinies tronquées, comme scipy.spatial.voronoi_plot_2d)
+def rendre_voronoi(vor, sortie=None, titre="Diagramme de Voronoi des stations Vélib'"):
+    points, sommets = np.asarray(vor.points), np.asarray(vor.vertices)
+    ridge_points, ridge_vertices = np.asarray(vor.ridge_points), np.asarray(vor.ridge_vertices)
+    fig, ax = creer_figure(titre, taille=(8, 6), interactif=sortie is None)
+
+    # Arêtes finies : les deux sommets sont connus
+    finies = (ridge_vertices >= 0).all(axis=1)
+    a, b = sommets[ridge_vertices[finies, 0]], sommets[ridge_vertices[finies, 1]]
+    tracer_segments(ax, a[:, 0], a[:, 1], b[:, 0], b[:, 1], colors="k", linewidths=0.5)
+
+    # Arêtes infinies : prolongées depuis leur sommet fini, vers l'extérieur du nuage de points
+    infinies = ~finies
+    p0, p1 = points[ridge_points[infinies, 0]], points[ridge_points[infinies, 1]]
+    tangente = (p1 - p0) / np.linalg.norm(p1 - p0, axis=1, keepdims=True)
+    normale = np.column_stack((-tangente[:, 1], tangente[:, 0]))
+    milieu = (p0 + p1) / 2
+    sens = np.sign(np.einsum("ij,ij->i", milieu - points.mean(axis=0), normale))[:, None]
+    depart = sommets[ridge_vertices[infinies].max(axis=1)]
+    arrivee = depart + sens * normale * np.ptp(points, axis=0).max()
+    tracer_segments(ax, depart[:, 0], depart[:, 1], arrivee[:, 0], arrivee[:, 1],
+                    colors="k", linewidths=0.5, linestyles="dashed")
+
+    tracer_stations(ax, points[:, 0], points[:, 1], color="b")
+    ajuster_axes(ax, points[:, 0], points[:, 1])
+    terminer_figure(fig, sortie)
@@ -1,30 +1,46 @@
-import folium  # Pour créer des cartes interactives
-from process_data import load_station_data  # Importer la fonction pour charger les données des stations
-from folium.plugins import MarkerCluster  # Pour regrouper les marqueurs sur la carte
+import sys  # Pour modifier le chemin des imports
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data.process_data import FICHIER_ENTREE, load_station_data  # Importer la fonction pour charger les données des stations
+from profilage import mesure  # Mesure des étapes (option --profile)
 
 ###################################################################################################
 ###################################################################################################
 
-# Charger les données des stations
-stations, _ = load_station_data()
-
-# Création de la carte centrée sur Paris
-m = folium.Map(location=[48.8566, 2.3522], zoom_start=12)
-
-# Ajouter un marqueur pour chaque station
-for station in stations:
-    folium.CircleMarker(
-        location=[station['lat'], station['lon']],  # Position du marqueur (latitude, longitude)
-        popup=station["name"],  # Info-bulle affichant le nom de la station
-        radius=station['capacity'] // 4,  # Taille du marqueur proportionnelle à la capacité
-        color='blue',  # Couleur du contour
-        weight=1,  # Épaisseur du contour
-        fill=True,  # Remplir le marqueur
-        fill_color='blue'  # Couleur de remplissage
+# Construire la carte des stations à partir de la table déjà chargée
+@mesure("carte_stations")
+def carte_stations(stations):
+    from visualization.rendu_geojson import carte_centree, couche_stations  # Couches GeoJSON
+
+    # Création de la carte centrée sur les stations
+    m = carte_centree(stations.lat, stations.lon, zoom_start=12)
+
+    # Ajouter un cercle pour chaque station (une seule couche GeoJSON)
+    couche_stations(
+        stations.lat, stations.lon,
+        couleurs="blue",  # Couleur du contour et du remplissage
+        rayons=stations.capacity // 4,  # Taille du marqueur proportionnelle à la capacité
+        infos=stations.liste_noms(),  # Info-bulle affichant le nom de la station
+        style={"weight": 1, "fill": True},  # Épaisseur du contour, marqueur rempli
     ).add_to(m)
+    return m
+
+# Générer la carte des stations
+def generate_map(output="stations_map.html", fichier_json=FICHIER_ENTREE):
+    """Enregistre la carte des stations dans `output` et la retourne."""
+    # Charger les données des stations
+    stations, _ = load_station_data(fichier_json)
+    m = carte_stations(stations)
+
+    # Sauvegarde de la carte dans un fichier HTML
+    from visualization.rendu_geojson import sauvegarder_carte
+    sauvegarder_carte(m, output)
+    return m
 
-# Sauvegarde de la carte dans un fichier HTML
-m.save("stations_map.html")
 
-# Affichage de la carte (utile dans un environnement Jupyter Notebook)
-m
\ No newline at end of file
+# Code principal
+if __name__ == "__main__":
+    generate_map()
@@ -1,28 +1,26 @@
-import numpy as np  # Pour manipuler des tableaux numériques
-import matplotlib.pyplot as plt  # Pour visualiser les données
-import json  # Pour manipuler les fichiers JSON
-from scipy.spatial import Voronoi, voronoi_plot_2d  # Pour calculer et visualiser le diagramme de Voronoi
+import argparse  # Pour lire les options de la ligne de commande
+import sys  # Pour modifier le chemin des imports
+from pathlib import Path  # Pour manipuler les chemins de fichiers
 
-###################################################################################################
-###################################################################################################
-
-# Charger les données depuis le fichier JSON
-with open("station_informations.json", "r", encoding="utf-8") as file:
-    data = json.load(file)  # Charger le contenu du fichier JSON
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-# Extraire les données des stations
-stations_data = data.get("data", {}).get("stations", [])  # Récupérer la liste des stations
+from data.triangulation import charger_triangulation  # Triangulation et Voronoi mis en cache
+from visualization.rendu_statique import rendre_voronoi  # Rendu statique sans écran
 
-# Extraire les coordonnées des stations sous forme de tableau NumPy
-points = np.array([[station["lat"], station["lon"]] for station in stations_data])
+###################################################################################################
+###################################################################################################
 
-# Calculer le diagramme de Voronoi à partir des coordonnées
-vor = Voronoi(points)
+# Option --sortie : écrire l'image (PNG, SVG...) au lieu de l'afficher (utilisable sans écran)
+parser = argparse.ArgumentParser(description="Visualiser le diagramme de Voronoi des stations")
+parser.add_argument("--sortie", "-o", help="Fichier image de sortie (format déduit de l'extension)")
+args = parser.parse_args()
 
-# Visualiser le diagramme de Voronoi
-fig = voronoi_plot_2d(vor)  # Générer la figure du diagramme
+# Charger le diagramme de Voronoi, calculé une seule fois avec la triangulation puis mis en cache
+vor = charger_triangulation("station_informations.json").voronoi
 
 ###################################################################################################
 ###################################################################################################
 
-plt.show()  # Afficher la figure
\ No newline at end of file
+# Visualiser le diagramme de Voronoi (arêtes dessinées en une seule collection)
+rendre_voronoi(vor, sortie=args.sortie)
\ No newline at end of file
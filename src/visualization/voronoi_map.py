@@ -1,138 +1,95 @@
-import json  # Pour manipuler les fichiers JSON
-import folium  # Pour créer des cartes interactives
-from scipy.spatial import Voronoi  # Pour calculer le diagramme de Voronoi
+import sys  # Pour modifier le chemin des imports
+from pathlib import Path  # Pour manipuler les chemins de fichiers
 import numpy as np  # Pour manipuler des tableaux numériques
 
-###################################################################################################
-###################################################################################################
+# Ajout du répertoire src au chemin Python pour les imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-# Charger les données des stations
-def charger_donnees(fichier_json):
-    try:
-        with open(fichier_json, "r", encoding="utf-8") as file:
-            data = json.load(file)  # Charger le contenu du fichier JSON
-        return data.get("data", {}).get("stations", [])  # Retourner la liste des stations
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Erreur lors de la lecture du fichier JSON : {e}")  # Gérer les erreurs
-        return []
-    
-###################################################################################################
-###################################################################################################
+from data.cellules_voronoi import charger_cellules  # Cellules de Voronoi bornées, mises en cache
+from profilage import mesure  # Mesure des étapes (option --profile)
+from data.indice_repartition import (  # Indices de répartition et densités
+    calculer_densites, calculer_indices, charger_degres, charger_donnees,
+)
 
-# Charger la liste d'adjacence
-def charger_liste_adjacence(fichier):
-    try:
-        with open(fichier, 'r', encoding="utf-8") as f:
-            return json.load(f)  # Charger le contenu du fichier JSON
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Erreur lors du chargement de la liste d'adjacence : {e}")  # Gérer les erreurs
-        return {}
-    
 ###################################################################################################
 ###################################################################################################
 
-# Fonction pour calculer l'indice de répartition
-def indice_repartition(Nv, C, C_med, alpha=0.5):
-    # Si le nombre de voisins est égal à 6, l'indice est 0
-    if Nv == 6:
-        Ir = 0
-    else:
-        # Normalisation des valeurs
-        Nv_norm = (Nv - 6) / 6
-        C_norm = max(C_med - C, 0) / C_med if C_med > 0 else 0
-        # Calcul de l'indice (mélange connectivité + capacité restante)
-        Ir = alpha * Nv_norm + (1 - alpha) * C_norm
-    return Ir
+# Construire la carte des cellules de Voronoi à partir des tableaux déjà chargés
+@mesure("carte_voronoi")
+def carte_voronoi(table, cellules, indices):
+    from visualization.rendu_geojson import carte_centree, couche_polygones, couche_stations  # Couches GeoJSON
 
+    densites = calculer_densites(cellules.aires)  # Stations par km²
+    indices = np.asarray(indices).tolist()
 
-###################################################################################################
-###################################################################################################
+    # Création de la carte centrée sur les stations
+    m = carte_centree(table.lat, table.lon, zoom_start=12)
 
-# Charger les données
-stations_data = charger_donnees("station_informations.json")
-adjacence_data = charger_liste_adjacence("liste_adjacence.json")
-
-# Vérifier si on a assez de stations pour le diagramme de Voronoi
-if len(stations_data) < 3:
-    print("Pas assez de stations pour effectuer le diagramme de Voronoi.")
-else:
-    # Extraction des points valides
-    points = np.array([
-        [station["lat"], station["lon"]]
-        for station in stations_data if "lat" in station and "lon" in station
-    ])
-
-    # Vérifier si on a assez de points valides
-    if len(points) < 3:
-        print("Pas assez de points valides pour le diagramme de Voronoi.")
-    else:
-        # Calcul du diagramme de Voronoi
-        vor = Voronoi(points)
-
-        # Création de la carte centrée sur Paris
-        m = folium.Map(location=[48.8566, 2.3522], zoom_start=12)
-
-        # Calcul des indices de répartition
-        if adjacence_data:
-            # Médiane des capacités pour normaliser C
-            capacites = [station.get('capacity') for station in stations_data]
-            C_med = np.median(capacites)
-            indices = {
-                station_id: indice_repartition(
-                    len(voisins),
-                    next((s.get('capacity', 0) for s in stations_data if str(s["station_id"]) == station_id), 0),
-                    C_med
-                )
-                for station_id, voisins in adjacence_data.items()
-            }
+    # Définition de la fonction pour obtenir une couleur en fonction de l'indice
+    def get_color(indice):
+        if indice < 0:
+            r, g, b = 255, 0, 0  # Rouge pour les indices négatifs
+        elif indice == 0:
+            r, g, b = 0, 255, 0  # Vert pour un indice nul
         else:
-            indices = {}
-
-        # Définition de la fonction pour obtenir une couleur en fonction de l'indice
-        def get_color(indice):
-            if indice < 0:
-                r, g, b = 255, 0, 0  # Rouge pour les indices négatifs
-            elif indice == 0:
-                r, g, b = 0, 255, 0  # Vert pour un indice nul
-            else:
-                r, g, b = 0, 0, 255  # Bleu pour les indices positifs
-            return f"#{r:02x}{g:02x}{b:02x}"  # Retourner la couleur en format hexadécimal
-
-        # Ajout des cellules de Voronoi à la carte
-        for i, region_index in enumerate(vor.point_region):
-            if region_index != -1 and len(vor.regions[region_index]) > 0:
-                station_id = str(stations_data[i]["station_id"])  # Identifier la station
-                indice_rep = indices.get(station_id, 0)  # Récupérer l'indice de répartition
-                color = get_color(indice_rep)  # Déterminer la couleur
-                polygon = [vor.vertices[j].tolist() for j in vor.regions[region_index]]  # Points du polygone
-                folium.Polygon(
-                    locations=polygon,  # Ajouter les sommets du polygone
-                    color=color,  # Couleur des bords
-                    weight=1,  # Épaisseur des bords
-                    fill=True,  # Remplir le polygone
-                    fill_color=color,  # Couleur de remplissage
-                    fill_opacity=0.2  # Opacité du remplissage
-                ).add_to(m)
-
-        # Ajout des marqueurs de stations
-        for station in stations_data:
-            if "lat" in station and "lon" in station:
-                station_id = str(station["station_id"])  # Identifier la station
-                indice_rep = indices.get(station_id, 0)  # Récupérer l'indice de répartition
-                color = get_color(indice_rep)  # Déterminer la couleur
-                folium.CircleMarker(
-                    location=[station['lat'], station['lon']],  # Position du marqueur
-                    radius=5,  # Taille du marqueur
-                    color=color,  # Couleur du contour
-                    fill=True,  # Remplir le marqueur
-                    fill_color=color,  # Couleur de remplissage
-                    fill_opacity=0.7,  # Opacité du remplissage
-                    tooltip=(  # Info-bulle avec des informations sur la station
-                        f"{station.get('name', 'Inconnu')}<br>"
-                        f"Capacité: {station.get('capacity', 0)}<br>"
-                        f"Indice de répartition: {indice_rep:.3f}"
-                    )
-                ).add_to(m)
-
-        # Sauvegarde de la carte dans un fichier HTML
-        m.save('velib_voronoi_map.html')
\ No newline at end of file
+            r, g, b = 0, 0, 255  # Bleu pour les indices positifs
+        return f"#{r:02x}{g:02x}{b:02x}"  # Retourner la couleur en format hexadécimal
+
+    # Couleur de chaque station selon son indice de répartition
+    couleurs = [get_color(indice_rep) for indice_rep in indices]
+
+    # Ajout des cellules de Voronoi à la carte (une seule couche GeoJSON)
+    lignes, offsets = cellules.non_vides()  # Une cellule par position (stations de mêmes coordonnées : une seule)
+    couche_polygones(
+        cellules.coords, offsets,
+        couleurs=[couleurs[i] for i in lignes.tolist()],  # Couleur selon l'indice de la station
+        style={"weight": 1, "fillOpacity": 0.2},  # Épaisseur des bords et opacité du remplissage
+    ).add_to(m)
+
+    # Ajout des marqueurs de stations (une seule couche GeoJSON)
+    infos = [  # Info-bulles avec des informations sur la station
+        f"{nom}<br>"
+        f"Capacité: {capacite}<br>"
+        f"Indice de répartition: {indice_rep:.3f}<br>"
+        f"Aire de la cellule: {aire / 1e6:.3f} km² ({densite:.1f} stations/km²)"
+        for nom, capacite, indice_rep, aire, densite in zip(
+            table.liste_noms(), table.capacity.tolist(), indices,
+            cellules.aires.tolist(), densites.tolist(),
+        )
+    ]
+    couche_stations(
+        table.lat, table.lon, couleurs,
+        rayons=5,  # Taille du marqueur
+        infos=infos,
+        style={"fill": True, "fill_opacity": 0.7},  # Remplir le marqueur
+    ).add_to(m)
+    return m
+
+# Générer la carte des cellules de Voronoi colorées selon l'indice de répartition
+def generer_carte_voronoi(fichier_json="station_informations.json", dossier_csr="liste_adjacence_csr",
+                          fichier_carte="velib_voronoi_map.html"):
+    # Charger la table des stations
+    table = charger_donnees(fichier_json)
+
+    # Vérifier si on a assez de stations pour le diagramme de Voronoi
+    if len(table) < 3:
+        print("Pas assez de stations pour effectuer le diagramme de Voronoi.")
+        return None
+
+    # Cellules de Voronoi découpées par l'enveloppe convexe des stations (calculées une seule fois)
+    cellules = charger_cellules(fichier_json)
+
+    # Calcul des indices de répartition de toutes les stations en un seul appel vectorisé
+    degres = charger_degres(table, dossier_csr)
+    indices = calculer_indices(table, degres) if degres is not None else np.zeros(len(table))
+
+    # Construire puis sauvegarder la carte dans un fichier HTML
+    from visualization.rendu_geojson import sauvegarder_carte
+    m = carte_voronoi(table, cellules, indices)
+    sauvegarder_carte(m, fichier_carte)
+    return m
+
+
+# Code principal
+if __name__ == "__main__":
+    generer_carte_voronoi()
@@ -0,0 +1,26 @@
+"""
+Configuration commune des tests : les modules de `src/` (et le générateur de flux synthétiques
+de `benchmarks/`) sont importés comme le fait `src/main.py`.
+"""
+import sys  # Pour compléter le chemin d'import
+from pathlib import Path  # Pour manipuler les chemins de fichiers
+
+import pytest
+
+RACINE = Path(__file__).resolve().parent.parent
+for dossier in (RACINE / "src", RACINE / "benchmarks"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+# Chaque test s'exécute dans un dossier temporaire (caches, résultats et deltas y sont écrits)
+@pytest.fixture(autouse=True)
+def dossier_temporaire(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+# Flux station_information synthétique de 300 stations
+@pytest.fixture
+def flux_stations(tmp_path):
+    from generer_gbfs import ecrire_flux
+
+    return ecrire_flux(tmp_path / "station_informations.json", 300, graine=1, part_doublons=0)
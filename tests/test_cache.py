@@ -0,0 +1,34 @@
+import json
+import os
+
+from data.cache import NB_VERSIONS, chemin_artefact, elaguer_artefacts, empreinte_fichier
+from data.station_table import StationTable
+from data.triangulation import charger_triangulation
+
+
+def test_anciennes_versions_supprimees(tmp_path):
+    chemins = [chemin_artefact("stations", f"{k:016x}" + "0" * 48, tmp_path) for k in range(5)]
+    for date, chemin in enumerate(chemins):
+        chemin.write_bytes(b"")
+        os.utime(chemin, (date, date))
+    autres = [tmp_path / "stations_0123.npz", chemin_artefact("triangulation", "0" * 64, tmp_path),
+              chemin_artefact("stations", "0" * 64, tmp_path, extension=".pkl")]
+    for chemin in autres:
+        chemin.write_bytes(b"")
+
+    # Artefact courant et la version la plus récente conservés, autres noms et extensions ignorés
+    assert sorted(elaguer_artefacts(chemins[2], conserves=2)) == sorted(chemins[:2] + chemins[3:4])
+    assert sorted(tmp_path.iterdir()) == sorted([chemins[2], chemins[4]] + autres)
+
+
+def test_le_cache_ne_grossit_pas_quand_le_flux_change(flux_stations):
+    flux = json.loads(flux_stations.read_text(encoding="utf-8"))
+    for k in range(NB_VERSIONS + 4):
+        flux["data"]["stations"][0]["capacity"] = k
+        flux_stations.write_text(json.dumps(flux), encoding="utf-8")
+        StationTable.charger(flux_stations)
+        charger_triangulation(flux_stations)
+    for nom in ("stations", "triangulation"):
+        assert len(list((flux_stations.parent / "cache").glob(f"{nom}_*.npz"))) == NB_VERSIONS
+    # La version courante est toujours en cache
+    assert chemin_artefact("triangulation", empreinte_fichier(flux_stations)).exists()
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from data.cellules_voronoi import aires_polygones, calculer_cellules, enveloppe_convexe
+from data.geo import projeter
+from generer_gbfs import generer_coordonnees
+
+
+# Aire (m²) d'un polygone convexe de coordonnées (latitude, longitude), dans la projection des cellules
+def aire_zone(lat, lon, polygone=None):
+    lat0, lon0 = float(np.mean(lat)), float(np.mean(lon))
+    if polygone is None:
+        xy = enveloppe_convexe(projeter(lat, lon, lat0, lon0))
+    else:
+        xy = projeter(polygone[:, 0], polygone[:, 1], lat0, lon0)
+    return abs(aires_polygones(xy, np.array([0, len(xy)]))[0])
+
+
+@pytest.mark.parametrize("part_doublons", [0, 0.02])
+def test_aires_somment_a_l_enveloppe(part_doublons):
+    lat, lon = generer_coordonnees(2000, np.random.default_rng(3), part_doublons=part_doublons)
+    cellules = calculer_cellules(lat, lon)
+    assert len(cellules) == 2000
+    assert (cellules.aires > 0).all()
+    assert cellules.aires.sum() == pytest.approx(aire_zone(lat, lon), rel=1e-9)
+
+
+def test_doublons_partagent_une_seule_cellule():
+    lat = np.array([48.85, 48.86, 48.87, 48.86, 48.86, 48.855])
+    lon = np.array([2.35, 2.33, 2.35, 2.37, 2.33, 2.35])  # Stations 1 et 4 aux mêmes coordonnées
+    cellules = calculer_cellules(lat, lon)
+    assert len(cellules.polygone(1)) > 0 and len(cellules.polygone(4)) == 0
+    assert cellules.aires[1] == cellules.aires[4] > 0
+    lignes, offsets = cellules.non_vides()
+    assert 4 not in lignes.tolist() and len(offsets) == 6
+    # Les cellules dessinées ne se recouvrent pas : leur aire totale est celle de l'enveloppe
+    xy = projeter(cellules.coords[:, 0], cellules.coords[:, 1], float(np.mean(lat)), float(np.mean(lon)))
+    assert aires_polygones(xy, offsets).sum() == pytest.approx(aire_zone(lat, lon), rel=1e-9)
+
+
+def test_frontiere_fournie():
+    lat, lon = generer_coordonnees(500, np.random.default_rng(4))
+    carre = np.array([[48.84, 2.33], [48.84, 2.37], [48.87, 2.37], [48.87, 2.33]])
+    cellules = calculer_cellules(lat, lon, carre)
+    assert cellules.aires.sum() == pytest.approx(aire_zone(lat, lon, carre), rel=1e-9)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from data.couverture import SEUILS, calculer_couverture, decouper_tuiles
+from data.geo import haversine
+from data.station_table import StationTable
+
+
+def test_tuiles_couvrent_la_grille_une_fois():
+    couverture = np.zeros((23, 17), dtype=np.int64)
+    for i0, i1, j0, j1 in decouper_tuiles(23, 17, taille=5):
+        couverture[i0:i1, j0:j1] += 1
+    assert (couverture == 1).all()
+
+
+def test_tuiles_comme_un_seul_calcul(flux_stations, tmp_path):
+    # Tuiles de 7 × 7 cellules (la grille n'en est pas un multiple), réparties entre deux processus
+    tuilee = calculer_couverture(flux_stations, tmp_path / "tuiles.npy", resolution=200.0, k=2, taille_tuile=7,
+                                 processus=2)
+    unique = calculer_couverture(flux_stations, tmp_path / "unique.npy", resolution=200.0, k=2,
+                                 taille_tuile=100000, processus=1)
+    raster = np.load(tmp_path / "tuiles.npy")
+    np.testing.assert_array_equal(raster, np.load(tmp_path / "unique.npy"))
+    assert {cle: v for cle, v in tuilee.items() if cle != "sortie"} == \
+        {cle: v for cle, v in unique.items() if cle != "sortie"}
+
+    grille = tuilee["grille"]
+    assert raster.shape == (grille["lignes"], grille["colonnes"], 2) and tuilee["nb_cellules"] == raster[..., 0].size
+    assert grille["lignes"] > 7 and grille["colonnes"] > 7
+
+    # Distances exactes (force brute) sur les bords de tuiles et les coins de la grille
+    table = StationTable.charger(flux_stations)
+    for i, j in [(0, 0), (6, 6), (7, 7), (6, 7), (grille["lignes"] - 1, grille["colonnes"] - 1), (13, 14)]:
+        lat = grille["nord"] - i * grille["pas_lat"]
+        lon = grille["ouest"] + j * grille["pas_lon"]
+        distances = np.sort(haversine(lat, lon, table.lat, table.lon))[:2]
+        np.testing.assert_array_equal(raster[i, j], np.rint(distances))
+
+    # La deuxième station la plus proche n'est jamais plus près que la première : couverture k = 2 ≤ k = 1
+    assert (raster[..., 1] >= raster[..., 0]).all()
+    for seuil in SEUILS:
+        assert (raster[..., 1] <= seuil).mean() <= (raster[..., 0] <= seuil).mean()
+        np.testing.assert_allclose(tuilee["part_couverte"][seuil], (raster[..., 0] <= seuil).mean())
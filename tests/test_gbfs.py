@@ -0,0 +1,77 @@
+import asyncio
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from data.gbfs import creer_session, ecrire_meta, lire_meta, rafraichir, telecharger
+from data.serveur_gbfs_local import demarrer_serveur
+
+FIXTURES = Path(__file__).parent / "fixtures" / "gbfs"
+
+
+# Serveur local servant une copie des flux de test (modifiable par le test)
+@pytest.fixture
+def serveur(tmp_path):
+    dossier = tmp_path / "serveur"
+    shutil.copytree(FIXTURES, dossier)
+    serveur, url_base = demarrer_serveur(dossier)
+    yield dossier, url_base
+    serveur.shutdown()
+    serveur.server_close()
+
+
+# Exécuter une coroutine avec une session HTTP neuve
+def executer(fonction, *args):
+    async def principale():
+        async with creer_session(delai_max=5) as session:
+            return await fonction(session, *args)
+    return asyncio.run(principale())
+
+
+def test_flux_de_test_valides():
+    decouverte = json.loads((FIXTURES / "gbfs.json").read_text(encoding="utf-8"))
+    noms = {flux["name"] for flux in decouverte["data"]["fr"]["feeds"]}
+    assert noms == {"station_information", "station_status"}
+    informations = json.loads((FIXTURES / "station_information.json").read_text(encoding="utf-8"))
+    statuts = json.loads((FIXTURES / "station_status.json").read_text(encoding="utf-8"))
+    assert ({s["station_id"] for s in informations["data"]["stations"]}
+            == {s["station_id"] for s in statuts["data"]["stations"]})
+
+
+def test_requetes_conditionnelles(serveur, tmp_path):
+    dossier_serveur, url_base = serveur
+    dossier = tmp_path / "flux"
+    dossier.mkdir()
+
+    # Premier passage : 200, les deux flux sont écrits avec leur ETag
+    mis_a_jour = executer(rafraichir, url_base, dossier)
+    assert sorted(Path(f).name for f in mis_a_jour) == ["station_informations.json", "station_status.json"]
+    statut = dossier / "station_status.json"
+    assert statut.read_bytes() == (dossier_serveur / "station_status.json").read_bytes()
+    assert lire_meta(statut)["etag"]
+    date_ecriture = statut.stat().st_mtime_ns
+
+    # Second passage : 304, rien n'est réécrit
+    assert executer(rafraichir, url_base, dossier) == []
+    assert statut.stat().st_mtime_ns == date_ecriture
+
+    # Sans ETag, If-Modified-Since suffit à obtenir un 304
+    meta = lire_meta(statut)
+    ecrire_meta(statut, {"last_modified": meta["last_modified"]})
+    assert executer(telecharger, url_base + "station_status.json", str(statut)) is False
+
+    # Flux modifié côté serveur : 200 pour ce flux seulement
+    statuts = json.loads((dossier_serveur / "station_status.json").read_text(encoding="utf-8"))
+    statuts["data"]["stations"][0]["num_docks_available"] -= 1
+    (dossier_serveur / "station_status.json").write_text(json.dumps(statuts), encoding="utf-8")
+    ecrire_meta(statut, meta)
+    assert [Path(f).name for f in executer(rafraichir, url_base, dossier)] == ["station_status.json"]
+    assert json.loads(statut.read_text(encoding="utf-8")) == statuts
+
+
+def test_flux_absent(serveur, tmp_path):
+    _, url_base = serveur
+    with pytest.raises(Exception, match="404"):
+        executer(telecharger, url_base + "inexistant.json", str(tmp_path / "inexistant.json"))
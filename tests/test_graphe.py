@@ -0,0 +1,57 @@
+import networkx as nx
+import numpy as np
+import pytest
+from scipy.spatial import Delaunay
+
+from data.geo import ponderer_aretes
+from data.graphe import analyser_graphe
+from data.station_table import StationTable
+
+
+# Deux quartiers séparés, triangulés chacun de leur côté : un graphe à deux composantes
+@pytest.fixture
+def reseau():
+    rng = np.random.default_rng(5)
+    quartiers = [rng.normal((48.85, 2.30), 0.01, size=(60, 2)), rng.normal((48.87, 2.40), 0.01, size=(40, 2))]
+    points = np.vstack(quartiers)
+    table = StationTable.depuis_stations([
+        {"station_id": 1000 + i, "name": f"Station {i}", "lat": la, "lon": lo, "capacity": 20}
+        for i, (la, lo) in enumerate(points.tolist())
+    ])
+    voisins, debut = [[] for _ in range(len(points))], 0
+    for quartier in quartiers:
+        indptr, indices = Delaunay(quartier).vertex_neighbor_vertices
+        for i in range(len(quartier)):
+            voisins[debut + i] = (indices[indptr[i]:indptr[i + 1]] + debut).tolist()
+        debut += len(quartier)
+    indptr = np.concatenate(([0], np.cumsum([len(v) for v in voisins])))
+    liste_adjacence = (table.station_id, indptr, np.concatenate(voisins))
+
+    graphe = nx.Graph()
+    graphe.add_nodes_from(range(len(table)))
+    u, v, longueurs = ponderer_aretes(liste_adjacence, table)
+    graphe.add_weighted_edges_from(zip(u.tolist(), v.tolist(), longueurs.tolist()))
+    return table, liste_adjacence, graphe
+
+
+def test_centralites_exactes_comme_networkx(reseau):
+    table, liste_adjacence, graphe = reseau
+    analyse = analyser_graphe(liste_adjacence, table, nb_sources=None, processus=1)
+    assert analyse["exact"]
+    assert sorted(np.bincount(analyse["composante"]).tolist()) == [40, 60]
+    np.testing.assert_array_equal(analyse["degre"], [graphe.degree(i) for i in range(len(table))])
+
+    intermediarite = nx.betweenness_centrality(graphe, weight="weight")
+    proximite = nx.closeness_centrality(graphe, distance="weight")
+    np.testing.assert_allclose(analyse["intermediarite"], [intermediarite[i] for i in range(len(table))],
+                               rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(analyse["proximite"], [proximite[i] for i in range(len(table))], rtol=1e-9)
+
+
+def test_pool_de_processus_identique(reseau):
+    table, liste_adjacence, _ = reseau
+    seul = analyser_graphe(liste_adjacence, table, nb_sources=30, processus=1)
+    pool = analyser_graphe(liste_adjacence, table, nb_sources=30, processus=2)
+    assert seul["nb_sources"] == pool["nb_sources"] == 30 and not pool["exact"]
+    for cle in ("proximite", "distance_moyenne_m", "intermediarite"):
+        np.testing.assert_allclose(pool[cle], seul[cle], rtol=1e-12)
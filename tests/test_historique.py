@@ -0,0 +1,92 @@
+import json
+
+import numpy as np
+import pytest
+
+from data.historique import Historique, lire_station_status
+from data.station_table import StationTable
+
+
+# Table de n stations (identifiants 100, 101...)
+def table_stations(n, premier=100):
+    return StationTable.depuis_stations([
+        {"station_id": premier + i, "name": f"Station {i}", "lat": 48.85 + i / 1000, "lon": 2.35, "capacity": 20}
+        for i in range(n)
+    ])
+
+
+# Écrire un flux station_status
+def ecrire_statuts(chemin, horodatage, statuts):
+    chemin.write_text(json.dumps({"last_updated": horodatage, "data": {"stations": statuts}}), encoding="utf-8")
+    return chemin
+
+
+def test_aller_retour(tmp_path):
+    table = table_stations(5)
+    historique = Historique.creer(tmp_path / "h", table, taille_chunk=4)
+    rng = np.random.default_rng(0)
+    temps = np.arange(11) * 60 + 1_700_000_000
+    valeurs = rng.integers(-1, 30, size=(11, 5, 3)).astype(np.int16)
+    for t, v in zip(temps, valeurs):
+        assert historique.ajouter(int(t), v)
+    assert not historique.ajouter(int(temps[-1]), valeurs[-1])  # Instantané déjà enregistré
+
+    relu = Historique.ouvrir(tmp_path / "h")
+    assert len(relu) == 11 and relu.dernier_horodatage() == temps[-1]
+    t, v = relu.tranche()
+    np.testing.assert_array_equal(t, temps)
+    np.testing.assert_array_equal(v, valeurs)
+    # Plage de temps à cheval sur plusieurs fichiers, puis une station seule
+    t, v = relu.tranche(temps[2], temps[9])
+    np.testing.assert_array_equal(t, temps[2:9])
+    np.testing.assert_array_equal(v, valeurs[2:9])
+    t, v = relu.serie(103, temps[5])
+    np.testing.assert_array_equal(v, valeurs[5:, 3])
+    # Le cache des horodatages suit les ajouts
+    historique.ajouter(int(temps[-1]) + 60, valeurs[0])
+    np.testing.assert_array_equal(historique.temps(), np.r_[temps, temps[-1] + 60])
+    relu.actualiser()
+    assert relu.temps()[-1] == temps[-1] + 60
+
+
+@pytest.mark.parametrize("statut, velos", [
+    ({"num_bikes_available": 5, "num_bikes_available_types": [{"mechanical": 2}, {"ebike": 3}]}, [2, 3]),
+    ({"num_bikes_available": 5}, [5, 0]),  # GBFS 2 sans détail par type
+    ({"num_vehicles_available": 4, "vehicle_types_available": [{"vehicle_type_id": "v", "count": 4}]}, [4, 0]),
+])
+def test_formats_station_status(tmp_path, statut, velos):
+    table = table_stations(2)
+    chemin = ecrire_statuts(tmp_path / "statuts.json", 1_700_000_000,
+                            [{"station_id": 101, "num_docks_available": 7, **statut}])
+    horodatage, valeurs = lire_station_status(chemin, table)
+    assert horodatage == 1_700_000_000
+    np.testing.assert_array_equal(valeurs, [[-1, -1, -1], velos + [7]])
+
+
+def test_nouvelles_stations(tmp_path, capsys):
+    historique = Historique.creer(tmp_path / "h", table_stations(3), taille_chunk=2)
+    statut = {"num_bikes_available": 1, "num_docks_available": 2}
+    premiers = [{"station_id": 100 + i, **statut} for i in range(3)]
+    for k in range(2):
+        historique.ajouter_fichier(ecrire_statuts(tmp_path / "s.json", 1000 + k, premiers))
+
+    # Station 103 ouverte : inconnue sans fichier des stations, ajoutée avec
+    statuts = premiers + [{"station_id": 103, **statut}]
+    historique.ajouter_fichier(ecrire_statuts(tmp_path / "s.json", 1002, statuts))
+    assert historique.stations_inconnues == {103}
+    assert "1 station(s)" in capsys.readouterr().out
+    informations = tmp_path / "informations.json"
+    informations.write_text(json.dumps({"data": {"stations": [
+        {"station_id": 100 + i, "name": f"Station {i}", "lat": 48.85 + i / 1000, "lon": 2.35} for i in range(4)
+    ]}}), encoding="utf-8")
+    for k in range(3, 7):
+        historique.ajouter_fichier(ecrire_statuts(tmp_path / "s.json", 1000 + k, statuts), informations)
+
+    relu = Historique.ouvrir(tmp_path / "h")
+    assert relu.table.station_id.tolist() == [100, 101, 102, 103]
+    t, v = relu.tranche()
+    np.testing.assert_array_equal(t, np.arange(1000, 1007))
+    # Fichier en cours élargi, fichiers précédents lus avec la station absente
+    np.testing.assert_array_equal(v[:3, 3], -1)
+    np.testing.assert_array_equal(v[3:, 3], [[1, 0, 2]] * 4)
+    np.testing.assert_array_equal(v[:, :3], [[[1, 0, 2]] * 3] * 7)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from data.cache import chemin_artefact, empreinte_fichier
+from data.geo import haversine
+from data.index_spatial import IndexSpatial, charger_index_spatial
+from data.station_table import StationTable
+
+
+# Index chargé depuis le cache, distances haversine de toutes les paires (points de requête × stations)
+@pytest.fixture
+def index(flux_stations):
+    table = StationTable.charger(flux_stations)
+    index = charger_index_spatial(flux_stations)
+    rng = np.random.default_rng(6)
+    lat = rng.uniform(table.lat.min() - 0.02, table.lat.max() + 0.02, 200)
+    lon = rng.uniform(table.lon.min() - 0.02, table.lon.max() + 0.02, 200)
+    distances = haversine(lat[:, None], lon[:, None], table.lat[None], table.lon[None])
+    return index, lat, lon, distances
+
+
+def test_plus_proches_comme_force_brute(index):
+    index, lat, lon, distances = index
+    d, lignes = index.plus_proches(lat, lon, k=5)
+    np.testing.assert_allclose(d, np.sort(distances, axis=1)[:, :5], rtol=0, atol=1e-6)
+    np.testing.assert_allclose(np.take_along_axis(distances, lignes, axis=1), d, rtol=0, atol=1e-6)
+
+    # k = 1 : tableaux à une dimension ; un seul point : nombres acceptés
+    d, lignes = index.plus_proches(lat, lon)
+    np.testing.assert_array_equal(lignes, distances.argmin(axis=1))
+    d, lignes = index.plus_proches(float(lat[0]), float(lon[0]), k=2)
+    assert d.shape == (1, 2)
+
+    # Voisins au-delà de distance_max : distance infinie et ligne -1
+    d, lignes = index.plus_proches(lat, lon, k=3, distance_max=1000.0)
+    attendu = np.sort(distances, axis=1)[:, :3]
+    np.testing.assert_array_equal(np.isinf(d), attendu > 1000.0)
+    np.testing.assert_array_equal(lignes == -1, attendu > 1000.0)
+
+
+def test_dans_rayon_comme_force_brute(index):
+    index, lat, lon, distances = index
+    rayon = 1500.0
+    indptr, lignes = index.dans_rayon(lat, lon, rayon)
+    for i in range(len(lat)):
+        # Stations à la limite du rayon (à 1e-6 m près) ignorées : les arrondis peuvent les départager
+        limite = np.abs(distances[i] - rayon) < 1e-6
+        trouvees = set(lignes[indptr[i]:indptr[i + 1]].tolist()) - set(np.flatnonzero(limite).tolist())
+        assert trouvees == set(np.flatnonzero((distances[i] < rayon) & ~limite).tolist())
+        assert list(lignes[indptr[i]:indptr[i + 1]]) == sorted(lignes[indptr[i]:indptr[i + 1]])
+    np.testing.assert_array_equal(index.compter_dans_rayon(lat, lon, rayon), np.diff(indptr))
+
+
+def test_cache(flux_stations, index):
+    index, lat, lon, _ = index
+    chemin = chemin_artefact("index_spatial", empreinte_fichier(flux_stations), extension=".pkl")
+    assert chemin.exists()
+    relu = IndexSpatial.depuis_fichier(chemin)
+    assert len(relu) == len(index)
+    for a, b in zip(relu.plus_proches(lat, lon, k=4), index.plus_proches(lat, lon, k=4)):
+        np.testing.assert_array_equal(a, b)
+    # Artefact illisible : l'index est reconstruit
+    chemin.write_bytes(b"pas un pickle")
+    assert len(charger_index_spatial(flux_stations)) == len(index)
+    assert len(IndexSpatial.depuis_fichier(chemin)) == len(index)
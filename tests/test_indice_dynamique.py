@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from data.historique import Historique
+from data.indice_dynamique import (generer_indice_dynamique, heures_locales, indice_dynamique,
+                                   statistiques_occupation)
+from data.station_table import StationTable
+
+PARIS = ZoneInfo("Europe/Paris")
+
+
+# Horodatage UNIX d'une date UTC
+def utc(*date):
+    return int(datetime(*date, tzinfo=timezone.utc).timestamp())
+
+
+def test_heures_locales_changements_d_heure():
+    # Passage à l'heure d'été (31 mars 2024) puis à l'heure d'hiver (27 octobre 2024)
+    temps = [utc(2024, 3, 31, 0, 30), utc(2024, 3, 31, 1, 30), utc(2024, 10, 27, 0, 30), utc(2024, 10, 27, 1, 30)]
+    assert heures_locales(temps, "Europe/Paris").tolist() == [1, 3, 2, 2]
+    assert heures_locales(temps).tolist() == [0, 1, 0, 1]
+    temps = np.arange(utc(2024, 10, 26), utc(2024, 10, 29), 600)
+    attendues = [datetime.fromtimestamp(t, PARIS).hour for t in temps.tolist()]
+    assert heures_locales(temps, "Europe/Paris").tolist() == attendues
+
+
+# Historique de 8 stations sur trois jours (changement d'heure compris), un instantané toutes les 20 min
+@pytest.fixture
+def historique(tmp_path):
+    rng = np.random.default_rng(4)
+    table = StationTable.depuis_stations([
+        {"station_id": 100 + i, "name": f"Station {i}", "lat": la, "lon": lo, "capacity": 10}
+        for i, (la, lo) in enumerate(rng.normal((48.85, 2.35), 0.01, size=(8, 2)).tolist())
+    ])
+    historique = Historique.creer(tmp_path / "h", table, taille_chunk=50)
+    temps = np.arange(utc(2024, 3, 30), utc(2024, 4, 2), 1200)
+    valeurs = rng.integers(0, 4, size=(len(temps), 8, 3)).astype(np.int16)
+    valeurs[rng.random((len(temps), 8)) < 0.1] = -1  # Station absente du flux
+    for t, v in zip(temps.tolist(), valeurs):
+        historique.ajouter(t, v)
+    return historique, temps, valeurs
+
+
+# Statistiques calculées instantané par instantané
+def statistiques_naives(temps, valeurs):
+    presents, vides, pleines, somme_bornes = (np.zeros((24, valeurs.shape[1])) for _ in range(4))
+    for t, v in zip(temps.tolist(), valeurs):
+        h = datetime.fromtimestamp(t, PARIS).hour
+        present = v[:, 0] >= 0
+        presents[h] += present
+        vides[h] += present & (v[:, 0] + v[:, 1] == 0)
+        pleines[h] += present & (v[:, 2] == 0)
+        somme_bornes[h] += np.where(present, v[:, 2], 0)
+    return presents, vides, pleines, somme_bornes
+
+
+@pytest.mark.parametrize("memoire_mo", [64, 1e-4])  # Un seul bloc, ou un instantané par bloc
+def test_statistiques_par_heure(historique, memoire_mo):
+    historique, temps, valeurs = historique
+    stats = statistiques_occupation(historique, fuseau="Europe/Paris", memoire_mo=memoire_mo)
+    for cle, attendu in zip(("presents", "vides", "pleines", "somme_bornes"), statistiques_naives(temps, valeurs)):
+        np.testing.assert_array_equal(stats[cle], attendu)
+    assert stats["nb_instantanes"] == len(temps)
+    # Fenêtre debut <= t < fin
+    stats = statistiques_occupation(historique, temps[10], temps[100], fuseau="Europe/Paris", memoire_mo=memoire_mo)
+    np.testing.assert_array_equal(stats["presents"], statistiques_naives(temps[10:100], valeurs[10:100])[0])
+
+
+def test_indice_par_heure(historique, tmp_path):
+    historique, temps, valeurs = historique
+    heures = generer_indice_dynamique(tmp_path / "h", tmp_path / "resultats", jours=1)
+    debut = temps[-1] - 86400 + 1
+    presents, vides, pleines, somme_bornes = statistiques_naives(temps[temps >= debut], valeurs[temps >= debut])
+    assert [h["instantanes"] for h in heures] == [3] * 24
+
+    with np.load(tmp_path / "resultats" / "indice_dynamique.npz") as npz, np.errstate(invalid="ignore"):
+        attendu = indice_dynamique(npz["voisins"], vides / presents, pleines / presents, somme_bornes / presents,
+                                   C_med=10.0)
+        np.testing.assert_allclose(npz["indice"], attendu, rtol=1e-6)
@@ -0,0 +1,27 @@
+import csv
+
+import numpy as np
+
+from data.indice_repartition import balayer_parametres, generer_balayage, indice_repartition
+from data.station_table import StationTable
+
+
+def test_balayage_comme_indice_par_couple(flux_stations):
+    table = StationTable.charger(flux_stations)
+    degres = np.random.default_rng(3).integers(2, 11, len(table))
+    alphas, voisins_cibles = np.linspace(0, 1, 5), (4, 6, 7.5)
+    cube = balayer_parametres(table, degres, alphas, voisins_cibles)
+    assert cube.shape == (len(alphas), len(voisins_cibles), len(table)) and cube.dtype == np.float32
+
+    C_med = np.median(table.capacity)
+    for a, alpha in enumerate(alphas):
+        for v, cible in enumerate(voisins_cibles):
+            attendu = [indice_repartition(nv, c, C_med, alpha, cible) for nv, c in zip(degres, table.capacity)]
+            np.testing.assert_allclose(cube[a, v], attendu, rtol=1e-6, atol=1e-6)
+
+
+def test_balayage_par_defaut(flux_stations, tmp_path):
+    lignes = generer_balayage(flux_stations, tmp_path / "analysis")
+    assert [ligne["alpha"] for ligne in lignes[::5]] == np.linspace(0, 1, 11).tolist()
+    with open(tmp_path / "analysis" / "balayage.csv", encoding="utf-8", newline="") as f:
+        assert len(list(csv.DictReader(f))) == 11 * 5
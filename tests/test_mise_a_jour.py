@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+
+from data.liste_adjacence import charger_csr, generer_liste_adjacence
+from data.mise_a_jour import ecrire_delta, mettre_a_jour
+
+
+# Voisins de chaque station, par identifiant
+def voisins_par_station(dossier):
+    ids, indptr, indices = charger_csr(dossier)
+    return {s: set(ids[indices[indptr[i]:indptr[i + 1]]].tolist()) for i, s in enumerate(ids.tolist())}
+
+
+def test_mise_a_jour_ecrit_les_lignes_modifiees(flux_stations):
+    assert mettre_a_jour(flux_stations, "csr", "deltas", "journal.jsonl") is None  # Génération complète
+    assert mettre_a_jour(flux_stations, "csr", "deltas", "journal.jsonl") is None  # Flux inchangé
+
+    flux = json.loads(flux_stations.read_text(encoding="utf-8"))
+    supprimee = flux["data"]["stations"].pop()
+    flux_stations.write_text(json.dumps(flux), encoding="utf-8")
+    resume = mettre_a_jour(flux_stations, "csr", "deltas", "journal.jsonl")
+
+    assert resume["supprimees"] == 1 and resume["ajoutees"] == 0
+    assert resume["triangulation"] == "reconstruction"
+    delta = json.loads(open(resume["delta"], encoding="utf-8").read())
+    assert delta["supprimees"] == [supprimee["station_id"]]
+    assert delta["adjacence"]  # Les anciennes voisines de la station supprimée ont changé
+    assert all(supprimee["station_id"] not in voisins for voisins in delta["adjacence"].values())
+
+
+
+def test_stations_ajoutees_inserees_dans_la_triangulation(flux_stations, tmp_path):
+    mettre_a_jour(flux_stations, "csr", "deltas", "journal.jsonl")
+    flux = json.loads(flux_stations.read_text(encoding="utf-8"))
+    stations = flux["data"]["stations"]
+    lat, lon = np.array([s["lat"] for s in stations]), np.array([s["lon"] for s in stations])
+    rng = np.random.default_rng(7)
+    # Nouvelles stations dans l'emprise du réseau et au-delà (hors de l'enveloppe convexe), insérées
+    # au milieu du flux, et une capacité modifiée
+    for k, (la, lo) in enumerate(zip(rng.uniform(lat.min() - 0.01, lat.max() + 0.01, 12).tolist(),
+                                     rng.uniform(lon.min() - 0.01, lon.max() + 0.01, 12).tolist())):
+        stations.insert(20 * k, {"station_id": 900000 + k, "name": f"Nouvelle {k}", "lat": la, "lon": lo,
+                                 "capacity": 20})
+    stations[-1]["capacity"] = stations[-1].get("capacity", 0) + 5
+    flux_stations.write_text(json.dumps(flux), encoding="utf-8")
+
+    resume = mettre_a_jour(flux_stations, "csr", "deltas", "journal.jsonl")
+    assert resume["triangulation"] == "insertion"
+    assert resume["ajoutees"] == 12 and resume["capacites"] == 1
+    # Même liste d'adjacence, dans l'ordre du flux, qu'une triangulation complète du nouveau flux
+    generer_liste_adjacence(flux_stations, tmp_path / "complet")
+    assert charger_csr("csr")[0].tolist() == [s["station_id"] for s in stations]
+    assert voisins_par_station("csr") == voisins_par_station(tmp_path / "complet")
+    delta = json.loads(open(resume["delta"], encoding="utf-8").read())
+    assert all(voisins_par_station("csr")[int(s)] == set(v) for s, v in delta["adjacence"].items())
+
+    # Capacité seule : la triangulation n'est pas touchée ; les insertions suivantes repartent des triangles mis à jour
+    stations[0]["capacity"] = 99
+    stations.append({"station_id": 910000, "name": "Encore", "lat": float(lat.mean()), "lon": float(lon.mean())})
+    flux_stations.write_text(json.dumps(flux), encoding="utf-8")
+    assert mettre_a_jour(flux_stations, "csr", "deltas", "journal.jsonl")["triangulation"] == "insertion"
+    generer_liste_adjacence(flux_stations, tmp_path / "complet")
+    assert voisins_par_station("csr") == voisins_par_station(tmp_path / "complet")
+    journal = [json.loads(ligne) for ligne in open("journal.jsonl", encoding="utf-8")]
+    assert [r["triangulation"] for r in journal] == ["insertion", "insertion"]
+
+
+def test_deltas_de_la_meme_seconde_ne_s_ecrasent_pas(tmp_path):
+    chemins = [ecrire_delta(tmp_path / "deltas", "20250101T000000", {"k": k}) for k in range(3)]
+    assert len(set(chemins)) == 3
+    assert [json.loads(c.read_text())["k"] for c in chemins] == [0, 1, 2]
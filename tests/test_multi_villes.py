@@ -0,0 +1,76 @@
+import csv
+
+import pytest
+from generer_gbfs import ecrire_flux
+
+from multi_villes import COLONNES, lire_sources, nom_ville, traiter_villes, url_station_information
+
+
+@pytest.mark.parametrize("source, nom", [
+    ("https://gbfs.velib-metropole.fr/gbfs.json", "gbfs_velib-metropole_fr"),
+    ("https://api.example.com/gbfs/Lyon/station_information.json", "lyon"),
+    ("https://api.example.com/gbfs/v3/nantes/", "nantes"),
+    ("donnees/Bordeaux Métropole", "bordeaux_métropole"),
+    ("donnees/lille/station_information.json", "lille"),
+    ("???", "ville"),
+])
+def test_nom_ville(source, nom):
+    assert nom_ville(source) == nom
+
+
+def test_lire_sources(tmp_path):
+    fichier = tmp_path / "villes.txt"
+    fichier.write_text("# Une source par ligne\n\nrennes=https://exemple.fr/rennes/gbfs.json\n  donnees/lyon\n",
+                       encoding="utf-8")
+    assert lire_sources(["paris=donnees/velib", "donnees/lille/station_information.json"], fichier) == [
+        ("paris", "donnees/velib"),
+        ("lille", "donnees/lille/station_information.json"),
+        ("rennes", "https://exemple.fr/rennes/gbfs.json"),
+        ("lyon", "donnees/lyon"),
+    ]
+    # « = » dans une URL : pas un nom
+    url = "https://exemple.fr/gbfs.json?ville=lyon"
+    assert lire_sources([url]) == [("gbfs_json_ville_lyon", url)]
+
+
+def test_lire_sources_doublons():
+    with pytest.raises(ValueError, match="lyon"):
+        lire_sources(["a/lyon", "b/lyon/station_information.json"])
+    with pytest.raises(ValueError, match="paris"):
+        lire_sources(["paris=a", "paris=b", "lyon=c"])
+    assert [nom for nom, _ in lire_sources(["a/lyon", "lyon2=b/lyon"])] == ["lyon", "lyon2"]
+
+
+def test_url_station_information():
+    url = "https://exemple.fr/station_information.json"
+    gbfs2 = {"data": {"fr": {"feeds": [{"name": "system_information", "url": "https://exemple.fr/s.json"},
+                                       {"name": "station_information", "url": url}]}}}
+    gbfs3 = {"data": {"feeds": [{"name": "station_status", "url": "https://exemple.fr/st.json"},
+                                {"name": "station_information", "url": url}]}}
+    assert url_station_information(gbfs2) == url_station_information(gbfs3) == url
+    for sans_flux in ({"data": {"feeds": []}}, {"data": {}}, {}):
+        with pytest.raises(ValueError):
+            url_station_information(sans_flux)
+
+
+def test_traiter_villes(tmp_path):
+    ecrire_flux(tmp_path / "flux" / "alpha" / "station_information.json", 150, graine=2, part_doublons=0)
+    fichier_beta = ecrire_flux(tmp_path / "flux" / "beta.json", 120, graine=3, part_doublons=0)
+    villes = [("alpha", str(tmp_path / "flux" / "alpha")), ("beta", str(fichier_beta)),
+              ("absente", str(tmp_path / "flux" / "absente"))]
+    terminees = []
+    lignes = traiter_villes(villes, tmp_path / "villes", processus=2, rappel=terminees.append)
+    assert [ligne["ville"] for ligne in lignes] == ["alpha", "beta", "absente"]
+    assert sorted(ligne["ville"] for ligne in terminees) == ["absente", "alpha", "beta"]
+
+    with open(tmp_path / "villes" / "resume_villes.csv", encoding="utf-8", newline="") as f:
+        lecteur = csv.DictReader(f)
+        assert tuple(lecteur.fieldnames) == COLONNES
+        resume = list(lecteur)
+    assert [ligne["ville"] for ligne in resume] == ["alpha", "beta", "absente"]
+    assert [ligne["statut"] for ligne in resume[:2]] == ["ok", "ok"]
+    assert resume[2]["statut"].startswith("erreur : ")
+    assert [int(ligne["nb_stations"]) for ligne in resume[:2]] == [150, 120]
+    for ligne in resume[:2]:
+        assert float(ligne["longueur_acm_km"]) > 0 and float(ligne["capacite_mediane"]) > 0
+        assert (tmp_path / "villes" / ligne["ville"] / "analysis" / "resume.json").exists()
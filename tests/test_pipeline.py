@@ -0,0 +1,54 @@
+import json
+import shutil
+
+import numpy as np
+
+from data.cache import chemin_artefact, empreinte_fichier
+from data.cellules_voronoi import CellulesVoronoi
+from pipeline import MANIFESTE, definir_etapes, run_all
+
+
+# États des étapes d'une exécution du pipeline
+def etats(resultats):
+    return {nom: etat for nom, (etat, _) in resultats.items()}
+
+
+def test_etapes_ignorees_et_reexecutees(flux_stations, tmp_path):
+    noms = [etape.nom for etape in definir_etapes(flux_stations, tmp_path / "results")]
+    assert set(etats(run_all(flux_stations, tmp_path / "results", processus=2)).values()) == {"exécutée"}
+
+    # Rien n'a changé : aucune étape exécutée
+    assert etats(run_all(flux_stations, tmp_path / "results", processus=2)) == dict.fromkeys(noms, "inchangée")
+    # --force : toutes les étapes sont réexécutées
+    assert etats(run_all(flux_stations, tmp_path / "results", processus=2, forcer=True)) == \
+        dict.fromkeys(noms, "exécutée")
+
+    # Entrée intermédiaire modifiée (cellules de Voronoi) : seules les étapes qui la lisent sont réexécutées
+    chemin = chemin_artefact("cellules", empreinte_fichier(flux_stations))
+    cellules = CellulesVoronoi.depuis_fichier(chemin)
+    CellulesVoronoi(cellules.coords, cellules.offsets, np.nextafter(cellules.aires, np.inf)).sauvegarder(chemin)
+    attendus = dict.fromkeys(noms, "inchangée")
+    attendus.update(indices="exécutée", carte_voronoi="exécutée")
+    assert etats(run_all(flux_stations, tmp_path / "results", processus=2)) == attendus
+
+
+def test_echec_annule_les_etapes_dependantes(flux_stations, tmp_path):
+    resultats = tmp_path / "results"
+    run_all(flux_stations, resultats, processus=2)
+    avant = json.loads((resultats / MANIFESTE).read_text(encoding="utf-8"))
+
+    # Le dossier de la liste d'adjacence remplacé par un fichier : l'étape adjacence échoue
+    csr = resultats / "liste_adjacence_csr"
+    shutil.rmtree(csr)
+    csr.write_text("", encoding="utf-8")
+    dependantes = {"indices", "acm", "carte_indices", "carte_voronoi"}
+    resultat = etats(run_all(flux_stations, resultats, processus=2))
+    assert resultat["adjacence"] == "échec"
+    assert {nom for nom, etat in resultat.items() if etat == "annulée"} == dependantes
+    assert {nom for nom, etat in resultat.items() if etat == "inchangée"} == \
+        set(resultat) - dependantes - {"adjacence"}
+
+    # L'étape en échec est retirée du manifeste, les étapes annulées gardent leur entrée précédente
+    apres = json.loads((resultats / MANIFESTE).read_text(encoding="utf-8"))
+    assert "adjacence" not in apres
+    assert {nom: apres[nom] for nom in dependantes} == {nom: avant[nom] for nom in dependantes}
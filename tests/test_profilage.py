@@ -0,0 +1,72 @@
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from profilage import (Profileur, compter, etape, fusionner, initialiser_processus, mesure,
+                       mesurer_processus, options_processus)
+
+
+@mesure("calcul", lambda resultat: {"elements": len(resultat)})
+def calcul(n):
+    compter(appels_internes=1)
+    return np.arange(n)
+
+
+# Tâche exécutée dans un processus du pool : retourne aussi l'état de tracemalloc
+def tache(n):
+    return len(calcul(n)), tracemalloc.is_tracing()
+
+
+def test_etapes_imbriquees(tmp_path):
+    with Profileur(tmp_path / "profil.json") as profileur:
+        with etape("externe"):
+            calcul(1000)
+            calcul(10)
+    etapes = profileur.etapes
+    assert etapes["externe/calcul"]["appels"] == 2
+    assert etapes["externe/calcul"]["compteurs"] == {"elements": 1010, "appels_internes": 2}
+    assert (tmp_path / "profil.json").exists()
+
+
+def test_mesures_des_processus_du_pool(tmp_path):
+    with Profileur(None) as profileur:
+        with etape("pool"):
+            options = options_processus()
+            with ProcessPoolExecutor(1, initializer=initialiser_processus) as executeur:
+                futurs = [executeur.submit(mesurer_processus, f"tache_{n}", options, tache, n) for n in (5, 7)]
+                for futur in futurs:
+                    (taille, suivi), mesures = futur.result()
+                    assert not suivi  # tracemalloc du parent arrêté dans le processus
+                    fusionner(mesures)
+    etapes = profileur.etapes
+    assert etapes["pool/tache_5/calcul"]["compteurs"] == {"elements": 5, "appels_internes": 1}
+    assert etapes["pool/tache_7/calcul"]["processus_enfant"]
+    assert {"cpu_s", "memoire_max_mo", "duree_s"} <= set(etapes["pool/tache_7"])
+
+
+def test_sans_profilage():
+    assert options_processus() is None
+    assert mesurer_processus("tache", None, tache, 3) == ((3, tracemalloc.is_tracing()), None)
+
+
+# Lot de deux villes : chaque étape de chaque ville a ses propres profils cProfile
+def test_profils_cprofile_du_lot(tmp_path):
+    from generer_gbfs import ecrire_flux
+    from multi_villes import traiter_villes
+
+    villes = []
+    for k, nom in enumerate("ab"):
+        villes.append((nom, str(ecrire_flux(tmp_path / nom / "station_information.json", 40, graine=k,
+                                            part_doublons=0))))
+    with Profileur(None, tmp_path / "prof") as profileur:
+        with etape("batch"):
+            traiter_villes(villes, tmp_path / "villes", processus=2)
+
+    profils = {chemin: mesures["profils"] for chemin, mesures in profileur.etapes.items() if "profils" in mesures}
+    assert {"batch/ville_a/acm", "batch/ville_b/acm"} <= set(profils)
+    assert Path(profils["batch/ville_a/acm"][0]).name.startswith("batch.ville_a.acm_")
+    tous = [Path(p) for liste in profils.values() for p in liste]
+    assert len(set(tous)) == len(tous)
+    assert sorted(tous) == sorted((tmp_path / "prof").iterdir())
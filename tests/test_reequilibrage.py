@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pytest
+from scipy.spatial import Delaunay
+
+from data.liste_adjacence import construire_adjacence
+from data.reequilibrage import Probleme, Recherche, planifier_tournees, voisines_proches
+from data.station_table import StationTable
+from data.triangulation import charger_triangulation
+
+
+# Vérifier les contraintes d'une tournée : charge entre 0 et la capacité, camion vide au retour
+def verifier_charges(quantites, capacite):
+    charges = np.cumsum([0] + list(quantites))
+    assert charges.min() >= 0 and charges.max() <= capacite
+    assert charges[-1] == 0
+
+
+def test_plan_respecte_charges_et_duree(flux_stations):
+    table = StationTable.charger(flux_stations)
+    liste_adjacence = construire_adjacence(charger_triangulation(flux_stations))
+    rng = np.random.default_rng(3)
+    velos = rng.integers(0, 30, len(table))
+    cibles = np.full(len(table), 12)
+    plan = planifier_tournees(table, liste_adjacence, velos, cibles, nb_camions=3, capacite=15,
+                              duree_max_min=90.0, duree_s=1.0, processus=1)
+
+    ecarts = dict(zip(table.station_id.tolist(), (velos - cibles).tolist()))
+    visitees = []
+    for tournee in plan["tournees"]:
+        quantites = [a["quantite"] if a["operation"] == "chargement" else -a["quantite"] for a in tournee["arrets"]]
+        verifier_charges(quantites, 15)
+        assert [a["charge"] for a in tournee["arrets"]] == np.cumsum(quantites).tolist()
+        assert tournee["duree_min"] <= 90.0
+        assert tournee["velos_charges"] == tournee["velos_deposes"]
+        for a, q in zip(tournee["arrets"], quantites):
+            # On ne charge que des vélos en trop et on ne dépose que des vélos manquants
+            assert 0 < q <= ecarts[a["station_id"]] or ecarts[a["station_id"]] <= q < 0
+            visitees.append(a["station_id"])
+    assert len(visitees) == len(set(visitees))
+
+    resume = plan["resume"]
+    assert resume["velos_deplaces"] > 0
+    assert resume["desequilibre_restant"] == resume["desequilibre_initial"] - resume["velos_deplaces"]
+
+
+# Grand problème dont la seule construction gloutonne dure plusieurs secondes
+@pytest.fixture(scope="module")
+def grand_probleme():
+    rng = np.random.default_rng(0)
+    n = 20000
+    xy = np.vstack((rng.uniform(0, 20000, (n, 2)), [[10000.0, 10000.0]]))
+    indptr, indices = Delaunay(xy[:-1]).vertex_neighbor_vertices
+    return Probleme(xy, rng.integers(-10, 11, n), voisines_proches(indptr, indices, xy[:-1]),
+                    nb_camions=20, capacite=20, duree_max=8 * 3600, vitesse=15 / 3.6, service=300, detour=1.3)
+
+
+def test_echeance_respectee_des_la_construction(grand_probleme):
+    recherche = Recherche(grand_probleme)
+    debut = time.perf_counter()
+    recherche.rechercher(debut + 0.1)
+    assert time.perf_counter() - debut < 1.0
+
+    # La solution interrompue reste valide
+    assert recherche.score()[0] > 0
+    for stations, quantites in zip(recherche.stations, recherche.quantites):
+        verifier_charges(quantites, grand_probleme.capacite)
+        assert grand_probleme.duree(grand_probleme.longueur(stations), len(stations)) <= grand_probleme.duree_max
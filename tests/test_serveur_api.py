@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import pytest
+
+from serveur_api import ErreurRequete, ServeurStations
+
+
+@pytest.fixture
+def serveur(flux_stations):
+    return ServeurStations(flux_stations)
+
+
+def requete(serveur, cible, methode="GET"):
+    return json.loads(serveur.repondre(methode, cible))
+
+
+def test_routes(serveur, flux_stations):
+    stations = json.loads(flux_stations.read_text(encoding="utf-8"))["data"]["stations"]
+    etat = requete(serveur, "/")
+    assert etat["nb_stations"] == len(stations) and etat["nb_aretes"] > 0
+
+    premiere = stations[0]
+    detail = requete(serveur, f"/stations/{premiere['station_id']}")
+    assert detail["station_id"] == premiere["station_id"] and detail["nb_voisins"] == len(detail["voisins"]) > 0
+
+    proches = requete(serveur, f"/nearest?lat={premiere['lat']}&lon={premiere['lon']}&k=3")["stations"]
+    assert len(proches) == 3 and proches[0]["station_id"] == premiere["station_id"]
+    assert proches[0]["distance_m"] <= proches[1]["distance_m"] <= proches[2]["distance_m"]
+
+    lat = sorted(s["lat"] for s in stations)
+    lon = sorted(s["lon"] for s in stations)
+    sud, nord, ouest, est = (round(x, 6) for x in (lat[50], lat[250], lon[50], lon[250]))
+    rectangle = requete(serveur, f"/bbox?sud={sud}&ouest={ouest}&nord={nord}&est={est}")
+    attendues = sorted(s["station_id"] for s in stations if sud <= s["lat"] <= nord and ouest <= s["lon"] <= est)
+    assert sorted(s["station_id"] for s in rectangle["stations"]) == attendues
+    assert rectangle["nb_stations"] == len(attendues)
+
+    indices = requete(serveur, "/indices")
+    assert [i["station_id"] for i in indices["indices"]] == [s["station_id"] for s in stations]
+    assert requete(serveur, "/indices", "HEAD") == indices
+
+
+@pytest.mark.parametrize("methode, cible, statut", [
+    ("GET", "/stations/inconnue", 404),
+    ("GET", "/route", 404),
+    ("POST", "/", 405),
+    ("GET", "/nearest?lat=48.8", 400),
+    ("GET", "/nearest?lat=48.8&lon=abc", 400),
+    ("GET", "/nearest?lat=48.8&lon=nan", 400),
+    ("GET", "/nearest?lat=48.8&lon=2.3&k=0", 400),
+    ("GET", "/bbox?sud=49&ouest=2&nord=48&est=3", 400),
+])
+def test_erreurs(serveur, methode, cible, statut):
+    with pytest.raises(ErreurRequete) as erreur:
+        serveur.repondre(methode, cible)
+    assert erreur.value.statut == statut
+
+
+def test_cache_bbox(serveur):
+    cible = "/bbox?sud=48.8&ouest=2.2&nord=48.9&est=2.4"
+    premiere = serveur.repondre("GET", cible)
+    succes = serveur.donnees.bbox.cache_info().hits
+    # Même rectangle, écrit autrement (les coordonnées sont arrondies avant la mise en cache)
+    assert serveur.repondre("GET", "/bbox?sud=48.80000001&ouest=2.2&nord=48.9&est=2.4") == premiere
+    assert serveur.donnees.bbox.cache_info().hits == succes + 1
+    assert requete(serveur, "/")["cache_bbox"]["succes"] == succes + 1
+
+
+def test_rechargement(serveur, flux_stations, capsys):
+    flux = json.loads(flux_stations.read_text(encoding="utf-8"))
+    ancienne = serveur.donnees
+
+    # Surveiller le fichier jusqu'au message de rechargement (réussi ou non) qui suit sa modification
+    async def surveiller_pendant(modifier):
+        surveillance = asyncio.ensure_future(serveur.surveiller(intervalle=0.01))
+        modifier()
+        sortie = ""
+        for _ in range(1000):
+            await asyncio.sleep(0.01)
+            sortie += capsys.readouterr().out
+            if "recharg" in sortie.lower():
+                break
+        surveillance.cancel()
+        return sortie
+
+    # Fichier en cours d'écriture (JSON invalide) : les données précédentes sont conservées
+    sortie = asyncio.run(surveiller_pendant(lambda: flux_stations.write_text('{"data": ', encoding="utf-8")))
+    assert "données précédentes sont conservées" in sortie
+    assert serveur.donnees is ancienne
+
+    # Fichier réécrit : nouvelles données
+    flux["data"]["stations"].pop()
+    sortie = asyncio.run(surveiller_pendant(lambda: flux_stations.write_text(json.dumps(flux), encoding="utf-8")))
+    assert "Données rechargées" in sortie
+    assert requete(serveur, "/")["nb_stations"] == len(flux["data"]["stations"]) != len(ancienne.table)
@@ -0,0 +1,36 @@
+import numpy as np
+from scipy.spatial import Delaunay
+
+from data.sites_candidats import evaluer_candidats
+from data.station_table import StationTable
+from data.triangulation import charger_triangulation
+
+
+# Degrés obtenus par la cavité de Bowyer-Watson, comparés à une nouvelle triangulation complète
+def test_degres_comme_une_retriangulation(flux_stations):
+    table = StationTable.charger(flux_stations)
+    tri = charger_triangulation(flux_stations)
+    rng = np.random.default_rng(2)
+    # Candidats dans l'emprise des stations et un peu au-delà (hors de l'enveloppe convexe)
+    bas, haut = tri.points.min(axis=0), tri.points.max(axis=0)
+    marge = 0.1 * (haut - bas)
+    candidats = rng.uniform(bas - marge, haut + marge, size=(60, 2))
+    evaluation = evaluer_candidats(table, tri, candidats[:, 0], candidats[:, 1], processus=1, taille_lot=16)
+    assert evaluation["hors_enveloppe"].any() and not evaluation["hors_enveloppe"].all()
+
+    degres = np.diff(tri.vertex_neighbor_vertices[0])
+    offsets = evaluation["details_offsets"]
+    for j, candidat in enumerate(candidats):
+        indptr, indices = Delaunay(np.vstack((tri.points, candidat))).vertex_neighbor_vertices
+        nouveaux = np.diff(indptr)
+        voisins = indices[indptr[-2]:indptr[-1]]
+        assert evaluation["nb_voisins"][j] == len(voisins)
+
+        lignes = slice(offsets[j], offsets[j + 1])
+        stations = evaluation["details_station"][lignes]
+        assert sorted(stations.tolist()) == sorted(voisins.tolist())
+        assert (evaluation["details_voisins_avant"][lignes] == degres[stations]).all()
+        assert (evaluation["details_voisins_apres"][lignes] == nouveaux[stations]).all()
+        # Les stations non touchées gardent leurs voisins
+        autres = np.setdiff1d(np.arange(len(degres)), stations)
+        assert (nouveaux[autres] == degres[autres]).all()